@@ -0,0 +1,86 @@
+"""Asynchronous counterpart of the network interfaces returned by `setup_network_connection`."""
+import asyncio
+
+from tx_engine import Tx
+from tx_engine.interface.interface_factory import WoCInterface, RPCInterface
+from tx_engine.interface.woc import get_url
+
+from bsv.block_header import BlockHeader, MerkleProof
+from bsv.merkle_tree import get_merkle_proof_cache
+from bsv.network import DEFAULT_TIMEOUT, MAX_CONCURRENT_REQUESTS, get_session
+from bsv.utils import broadcast_tx, tx_from_id, txs_from_ids
+
+
+class AsyncNetwork:
+    """Async wrapper of a network interface.
+
+    Blocking calls run in worker threads, where they share the pooled session of `bsv.network`. At most
+    `max_concurrency` calls are in flight at the same time, so that many overlapping operations do not trip the rate
+    limits of WoC. An instance must be used within a single event loop.
+    """
+
+    def __init__(self, network: WoCInterface | RPCInterface, max_concurrency: int = MAX_CONCURRENT_REQUESTS):
+        self.network = network
+        self.__semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def run(self, func, *args):
+        """Run the blocking call `func(*args)` in a worker thread."""
+        async with self.__semaphore:
+            return await asyncio.to_thread(func, *args)
+
+    async def tx_from_id(self, txid: str) -> Tx:
+        return await self.run(tx_from_id, txid, self.network)
+
+    async def txs_from_ids(self, txids: list[str]) -> list[Tx]:
+        return await self.run(txs_from_ids, txids, self.network)
+
+    async def broadcast_tx(self, tx: Tx):
+        return await self.run(broadcast_tx, tx, self.network)
+
+    async def get_block_header(self, block_hash: str) -> BlockHeader:
+        return await self.run(BlockHeader.get, block_hash, self.network)
+
+    async def get_block_header_at_height(self, block_height: int) -> BlockHeader:
+        if isinstance(self.network, RPCInterface):
+            block_hash = await self.run(self.network.get_block_hash, block_height)
+            return await self.get_block_header(block_hash)
+        block_header_json = await self.run(self.__get_woc_block_header_at_height, block_height)
+        return BlockHeader.from_json(block_header_json)
+
+    async def get_chain(self, tip_hash: str, n_blocks: int) -> list[BlockHeader]:
+        """Retrieve the `n_blocks` block headers ending at `tip_hash`, oldest first.
+
+        Headers are requested by height concurrently. If the chain changes while they are being retrieved, so that
+        they do not link up to `tip_hash`, the chain is walked back from `tip_hash` instead.
+        """
+        if n_blocks <= 0:
+            return []
+        if isinstance(self.network, RPCInterface):
+            # A single batched JSON-RPC request is already the fastest option
+            return await self.run(BlockHeader.get_chain, tip_hash, n_blocks, self.network)
+        tip_json = await self.run(self.network.get_block_header, tip_hash)
+        tip_height = tip_json["height"]
+        block_headers = list(await asyncio.gather(
+            *(self.get_block_header_at_height(height) for height in range(tip_height - n_blocks + 1, tip_height))
+        ))
+        block_headers.append(BlockHeader.from_json(tip_json))
+        for (prev_block_header, block_header) in zip(block_headers, block_headers[1:]):
+            if block_header.hash_prev_block != prev_block_header.hash():
+                return await self.run(BlockHeader.get_chain, tip_hash, n_blocks, self.network)
+        return block_headers
+
+    async def get_merkle_proof(self, block_hash: str, tx_id: str) -> MerkleProof:
+        return await self.run(get_merkle_proof_cache().get_merkle_proof, block_hash, tx_id, self.network)
+
+    async def get_merkle_proofs(self, block_hashes: list[str], tx_ids: list[str]) -> list[MerkleProof]:
+        return list(await asyncio.gather(
+            *(self.get_merkle_proof(block_hash, tx_id) for (block_hash, tx_id) in zip(block_hashes, tx_ids))
+        ))
+
+    def __get_woc_block_header_at_height(self, block_height: int) -> dict:
+        # The header endpoint takes a height in place of a hash, and does not return the txids of the block
+        response = get_session().get(
+            f"{get_url(self.network.is_testnet())}/block/{block_height}/header", timeout=DEFAULT_TIMEOUT
+        )
+        assert response.status_code == 200, f"Error retrieving block header at height {block_height}: {response.text}"
+        return response.json()
@@ -1,9 +1,9 @@
-
-import requests
-
 from tx_engine import hash256d
 from tx_engine.interface.interface_factory import WoCInterface, RPCInterface
 
+from bsv.network import rpc_batch, rpc_call
+
+
 class BlockHeader:
     def __init__(self, version: int, hash_prev_block: bytes, hash_merkle_root: bytes, time: int, bits: bytes, nonce: int):
         self.version = version
@@ -25,9 +25,12 @@ class BlockHeader:
     def get_target(self):
         return 256**(self.bits[-1] - 3) * int.from_bytes(self.bits[:-1], "little")
 
+    def work(self):
+        # Same as the chain work computed by the oracle, see https://github.com/bitcoin-sv/bitcoin-sv/blob/86eb5e8bdf5573c3cd844a1d81bd4fb151b909e0/src/block_index.cpp#L105
+        return 2**256 // (self.get_target() + 1)
+
     @staticmethod
-    def get(block_hash: str, connection: WoCInterface | RPCInterface):
-        block_header_json = connection.get_block_header(block_hash)
+    def from_json(block_header_json: dict):
         return BlockHeader(
             version=block_header_json["version"],
             hash_prev_block=bytes.fromhex(block_header_json["previousblockhash"])[::-1],
@@ -37,11 +40,131 @@ class BlockHeader:
             nonce=int(block_header_json["nonce"])
         )
 
+    @staticmethod
+    def get(block_hash: str, connection: WoCInterface | RPCInterface):
+        return BlockHeader.from_json(connection.get_block_header(block_hash))
+
+    @staticmethod
+    def get_chain(tip_hash: str, n_blocks: int, connection: WoCInterface | RPCInterface, rpc_batch_size: int = 500):
+        """Retrieve the `n_blocks` block headers ending at `tip_hash`, oldest first.
+
+        Over RPC, headers are retrieved with batched JSON-RPC requests of `rpc_batch_size` calls.
+        WoC has no bulk endpoint for headers, so the chain is walked back from `tip_hash`.
+        """
+        if n_blocks <= 0:
+            return []
+        if isinstance(connection, RPCInterface):
+            tip_height = connection.get_block_header(tip_hash)["height"]
+            heights = list(range(tip_height - n_blocks + 1, tip_height + 1))
+            block_headers = []
+            for i in range(0, len(heights), rpc_batch_size):
+                block_hashes = rpc_batch(connection, [("getblockhash", [height]) for height in heights[i:i + rpc_batch_size]])
+                block_headers_json = rpc_batch(connection, [("getblockheader", [block_hash]) for block_hash in block_hashes])
+                block_headers.extend(BlockHeader.from_json(block_header_json) for block_header_json in block_headers_json)
+            return block_headers
+
+        block_headers = [BlockHeader.get(tip_hash, connection)]
+        for _ in range(n_blocks - 1):
+            block_hash = block_headers[-1].hash_prev_block[::-1].hex()
+            block_headers.append(BlockHeader.get(block_hash, connection))
+        return block_headers[::-1]
+
+
+class BlockHeaderView:
+    """Read-only view over a serialised block header, exposing the same queries as `BlockHeader` without copying."""
+
+    __slots__ = ("buffer",)
+
+    def __init__(self, buffer: memoryview):
+        self.buffer = buffer
+
+    def __repr__(self):
+        return repr(self.to_block_header())
+
+    @property
+    def version(self) -> int:
+        return int.from_bytes(self.buffer[0:4], "little")
+
+    @property
+    def hash_prev_block(self) -> bytes:
+        return bytes(self.buffer[4:36])
+
+    @property
+    def hash_merkle_root(self) -> bytes:
+        return bytes(self.buffer[36:68])
+
+    @property
+    def time(self) -> int:
+        return int.from_bytes(self.buffer[68:72], "little")
+
+    @property
+    def bits(self) -> bytes:
+        return bytes(self.buffer[72:76])
+
+    @property
+    def nonce(self) -> int:
+        return int.from_bytes(self.buffer[76:80], "little")
+
+    def serialise(self) -> bytes:
+        return bytes(self.buffer)
+
+    def hash(self) -> bytes:
+        return hash256d(self.serialise())
+
+    def get_target(self) -> int:
+        return 256**(self.buffer[75] - 3) * int.from_bytes(self.buffer[72:75], "little")
+
+    def work(self) -> int:
+        return 2**256 // (self.get_target() + 1)
+
+    def to_block_header(self) -> BlockHeader:
+        return BlockHeader(self.version, self.hash_prev_block, self.hash_merkle_root, self.time, self.bits, self.nonce)
+
+
+def validate_chain(
+    block_headers: list[BlockHeader | BlockHeaderView],
+    tip: BlockHeader | BlockHeaderView | None = None,
+    tip_chain_work: int = 0,
+) -> tuple[int, list[int]]:
+    """Validate `block_headers` as a chain extending `tip`, with the same checks as the oracle:
+    - every header is built on top of the previous one
+    - every hash is below the target of its header
+    - every target is within half and double the target of the previous header
+
+    If `tip` is not given, the linkage and the target bounds of the first header are not checked.
+    Returns the number of headers in the longest valid prefix of `block_headers`, together with the cumulative chain
+    work of each of them, starting from `tip_chain_work`.
+    """
+    serialisations = [block_header.serialise() for block_header in block_headers]
+    hashes = [hash256d(serialisation) for serialisation in serialisations]
+    buffer = memoryview(b"".join(serialisations))
+
+    prev_hash = tip.hash() if tip is not None else None
+    prev_target = tip.get_target() if tip is not None else None
+    chain_work = tip_chain_work
+    chain_works = []
+    for (i, block_hash) in enumerate(hashes):
+        offset = 80 * i
+        target = 256**(buffer[offset + 75] - 3) * int.from_bytes(buffer[offset + 72:offset + 75], "little")
+        if prev_hash is not None and buffer[offset + 4:offset + 36] != prev_hash:
+            break
+        if int.from_bytes(block_hash, "little") >= target:
+            break
+        if prev_target is not None and not prev_target // 2 <= target <= prev_target * 2:
+            break
+        chain_work += 2**256 // (target + 1)
+        chain_works.append(chain_work)
+        prev_hash, prev_target = block_hash, target
+
+    return len(chain_works), chain_works
+
+
 class MerkleProof:
 
     def __init__(self, index: int, nodes: list[bytes]):
         self.index = index
         self.nodes = nodes
+        self.__positions = None
         
     def __repr__(self):
         return f"MerkleProof(\nindex={self.index},\nnodes=[{"".join([f"\n\t{node.hex()}," if node != '*' else '*,' for node in self.nodes])}\n])"
@@ -52,13 +175,7 @@ class MerkleProof:
         if isinstance(connection, WoCInterface):
             merkle_proof_json = connection.get_merkle_proof(block_hash, tx_id)[0]
         else:
-            payload = {
-                        "method": "getmerkleproof2",
-                        "params": [block_hash, tx_id],
-                        "jsonrpc": "2.0",
-                        "id": 1
-            }
-            merkle_proof_json = requests.post("http://" + connection.address, json=payload, auth=(connection.user, connection.password)).json()["result"]
+            merkle_proof_json = rpc_call(connection, "getmerkleproof2", [block_hash, tx_id])
         index = merkle_proof_json["index"]
         nodes = [bytes.fromhex(node)[::-1] if node != '*' else '*' for node in merkle_proof_json["nodes"]]
         return MerkleProof(index, nodes)
@@ -68,31 +185,29 @@ class MerkleProof:
         if isinstance(connection, WoCInterface):
             merkle_proof_json = connection.get_merkle_proof(block_hash, tx_id)[0]
         else:
-            payload = {
-                        "method": "getmerkleproof2",
-                        "params": [block_hash, tx_id],
-                        "jsonrpc": "2.0",
-                        "id": 1
-            }
-            merkle_proof_json = requests.post("http://" + connection.address, json=payload, auth=(connection.user, connection.password)).json()["result"]
+            merkle_proof_json = rpc_call(connection, "getmerkleproof2", [block_hash, tx_id])
         index = merkle_proof_json["index"]
         nodes = []
         hash = bytes.fromhex(tx_id)[::-1]
+        position = index
         for node in merkle_proof_json["nodes"]:
-            if node == '*':
-                nodes.append(hash)
-                hash = hash256d(hash+hash)
-            else:
-                nodes.append(bytes.fromhex(node)[::-1])
+            # A duplicated node is the node on the path to the root itself
+            node = hash if node == '*' else bytes.fromhex(node)[::-1]
+            nodes.append(node)
+            hash = hash256d(node + hash) if position & 1 else hash256d(hash + node)
+            position >>= 1
         return MerkleProof(index, nodes)
     
-    def positions(self) -> list[int]:
-        out = []
-        index = self.index
-        for _ in range(len(self.nodes)):
-            out.append(index & 1)
-            index >>= 1
-        return out
+    def positions(self) -> tuple[int, ...]:
+        # Positions only depend on the index and on the depth of the proof, so they are computed once
+        if self.__positions is None or self.__positions[0] != (self.index, len(self.nodes)):
+            out = []
+            index = self.index
+            for _ in range(len(self.nodes)):
+                out.append(index & 1)
+                index >>= 1
+            self.__positions = ((self.index, len(self.nodes)), tuple(out))
+        return self.__positions[1]
     
     def validate(self, tx_id: str, target: bytes):
         # Use positions to mimic what happens in Move
@@ -104,3 +219,31 @@ class MerkleProof:
             else:
                 hash = hash256d(hash + self.nodes[i])
         return hash == target
+
+    @staticmethod
+    def validate_many(proofs: list["MerkleProof"], tx_ids: list[str], targets: list[bytes]) -> list[bool]:
+        """Validate `proofs[i]` for `tx_ids[i]` against the Merkle root `targets[i]`, for all `i` at once.
+
+        The proofs are walked up level by level together. Proofs of transactions in the same block share their upper
+        nodes, so each distinct pair of children is hashed only once per level. Duplicated nodes ('*') are supported.
+        """
+        assert len(proofs) == len(tx_ids) == len(targets), "Proofs, txids and Merkle roots must have the same length"
+        hashes = [bytes.fromhex(tx_id)[::-1] for tx_id in tx_ids]
+        indexes = [proof.index for proof in proofs]
+        depth = max((len(proof.nodes) for proof in proofs), default=0)
+        for level in range(depth):
+            digests = {}
+            for (i, proof) in enumerate(proofs):
+                if level >= len(proof.nodes):
+                    continue
+                node = proof.nodes[level]
+                if node == '*':
+                    node = hashes[i]
+                preimage = node + hashes[i] if indexes[i] & 1 else hashes[i] + node
+                digest = digests.get(preimage)
+                if digest is None:
+                    digest = hash256d(preimage)
+                    digests[preimage] = digest
+                hashes[i] = digest
+                indexes[i] >>= 1
+        return [hash == target for (hash, target) in zip(hashes, targets)]
@@ -0,0 +1,95 @@
+"""Client for the serve mode of the Sui bridge client."""
+import atexit
+from collections import deque
+import json
+import subprocess
+import threading
+from pathlib import Path
+
+SUI_CLIENT_PATH = Path(__file__).parent.parent / "sui"
+SERVE_COMMAND = ["cargo", "run", "--", "serve"]
+# Number of lines of the standard error of the process kept to report why it exited
+STDERR_TAIL_LINES = 50
+
+
+class BridgeClient:
+    """Send commands to a long-lived Sui bridge client (`cargo run -- serve`).
+
+    The process is started on the first command and kept alive, so the Sui client and the keystore are set up once
+    rather than once per command. Each command names its sender, so there is no need to switch the active address of
+    the Sui CLI in between.
+    """
+
+    def __init__(self, path: Path = SUI_CLIENT_PATH):
+        self.path = path
+        self.process = None
+        self.next_id = 0
+        self.lock = threading.Lock()
+        self.stderr_tail = deque(maxlen=STDERR_TAIL_LINES)
+        self.stderr_reader = None
+
+    def __start(self):
+        if self.process is None or self.process.poll() is not None:
+            self.process = subprocess.Popen(
+                SERVE_COMMAND,
+                cwd=self.path,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True,
+                bufsize=1,
+            )
+            # Drain the standard error (cargo output, logs, panics), so the process never blocks on a full pipe
+            self.stderr_tail = deque(maxlen=STDERR_TAIL_LINES)
+            self.stderr_reader = threading.Thread(target=self.stderr_tail.extend, args=(self.process.stderr,), daemon=True)
+            self.stderr_reader.start()
+
+    def run(self, command: str, sender: str | None = None, format: str = "binary") -> str | None:
+        """Run `command` (e.g., "pegin-with-chunks") on the data in its config file in `format`, sending the
+        transactions from `sender` (default: the active address). Return the message reported by the command, if any."""
+        with self.lock:
+            self.__start()
+            self.next_id += 1
+            request = {"id": self.next_id, "command": command, "format": format, "sender": sender}
+            self.process.stdin.write(json.dumps(request) + "\n")
+            self.process.stdin.flush()
+
+            # Skip the logs of the command until its response
+            for line in self.process.stdout:
+                if not line.startswith("{"):
+                    continue
+                try:
+                    response = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if isinstance(response, dict) and response.get("id") == self.next_id:
+                    break
+            else:
+                self.process.wait()
+                self.stderr_reader.join(timeout=1)
+                self.process = None
+                stderr = "".join(self.stderr_tail)
+                raise AssertionError(f"Bridge client exited while running {command}:\n{stderr}")
+
+        assert response["ok"], f"Error running {command}: {response['error']}"
+        return response["result"]
+
+    def close(self):
+        """Stop the bridge client process, if running."""
+        with self.lock:
+            if self.process is not None and self.process.poll() is None:
+                self.process.stdin.close()
+                self.process.wait()
+            self.process = None
+
+
+_bridge_client = None
+
+
+def get_bridge_client() -> BridgeClient:
+    """Return the bridge client shared by the whole process."""
+    global _bridge_client
+    if _bridge_client is None:
+        _bridge_client = BridgeClient()
+        atexit.register(_bridge_client.close)
+    return _bridge_client
@@ -0,0 +1,115 @@
+"""In-memory and on-disk caches."""
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+
+class LRUCache:
+    """Thread-safe in-memory cache holding at most `max_size` entries, evicting the least recently used one."""
+
+    def __init__(self, max_size: int = 256):
+        self.max_size = max_size
+        self.__entries = OrderedDict()
+        self.__lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self.__lock:
+            if key not in self.__entries:
+                return default
+            self.__entries.move_to_end(key)
+            return self.__entries[key]
+
+    def put(self, key, value):
+        with self.__lock:
+            self.__entries[key] = value
+            self.__entries.move_to_end(key)
+            while len(self.__entries) > self.max_size:
+                self.__entries.popitem(last=False)
+
+    def __contains__(self, key) -> bool:
+        with self.__lock:
+            return key in self.__entries
+
+    def __len__(self) -> int:
+        with self.__lock:
+            return len(self.__entries)
+
+
+class DiskCache:
+    """Directory of binary blobs addressed by a hex key.
+
+    Blobs are stored at `path/<key[:2]>/<key>` and written atomically, so concurrent readers never see partial
+    entries. If `max_entries` is set, the least recently read entries are evicted once the cache grows past it.
+    """
+
+    def __init__(self, path: Path, max_entries: int | None = None):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.__lock = threading.Lock()
+        self.__size = None
+
+    def __entry_path(self, key: str) -> Path:
+        return self.path / key[:2] / key
+
+    def get(self, key: str) -> bytes | None:
+        entry_path = self.__entry_path(key)
+        try:
+            with open(entry_path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        if self.max_entries is not None:
+            # Record the access for eviction
+            try:
+                os.utime(entry_path)
+            except FileNotFoundError:
+                pass
+        return data
+
+    def put(self, key: str, data: bytes):
+        entry_path = self.__entry_path(key)
+        if entry_path.exists():
+            return
+        entry_path.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=entry_path.parent, delete=False) as f:
+            f.write(data)
+        os.replace(f.name, entry_path)
+
+        if self.max_entries is not None:
+            with self.__lock:
+                if self.__size is None:
+                    self.__size = len(self.__entries())
+                else:
+                    self.__size += 1
+                if self.__size > self.max_entries:
+                    self.__evict()
+
+        return
+
+    def delete(self, key: str):
+        entry_path = self.__entry_path(key)
+        if entry_path.exists():
+            entry_path.unlink(missing_ok=True)
+            if self.__size is not None:
+                with self.__lock:
+                    self.__size -= 1
+
+        return
+
+    def __contains__(self, key: str) -> bool:
+        return self.__entry_path(key).exists()
+
+    def __entries(self) -> list[Path]:
+        if not self.path.exists():
+            return []
+        return [entry for entry in self.path.glob("*/*") if not entry.name.startswith("tmp")]
+
+    def __evict(self):
+        """Drop the least recently used entries, bringing the cache down to 3/4 of `max_entries`."""
+        entries = sorted(self.__entries(), key=lambda entry: entry.stat().st_mtime)
+        target = self.max_entries * 3 // 4
+        for entry in entries[:max(len(entries) - target, 0)]:
+            entry.unlink(missing_ok=True)
+        self.__size = min(len(entries), target)
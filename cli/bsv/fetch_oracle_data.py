@@ -1,10 +1,14 @@
 import argparse
-from block_header import BlockHeader
 from pathlib import Path
 import subprocess
+import sys
 import time
 import toml
-from utils import setup_network_connection
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from bsv.block_header import BlockHeader
+from bsv.utils import setup_network_connection
 
 def main():
     parser = argparse.ArgumentParser(description='Fetch block header data for oracle Sui smart contract.')
@@ -0,0 +1,104 @@
+"""Selection of funding UTXOs by value, and sizing of the transactions that split them."""
+import json
+import math
+import os
+import time
+from pathlib import Path
+
+from tx_engine.interface.blockchain_interface import BlockchainInterface
+
+from bsv.utils import txs_from_ids
+
+# A refill creates enough outputs for the operations expected in this many seconds, within the bounds below
+REFILL_HORIZON = 3600
+MIN_SPLIT_COUNT = 10
+MAX_SPLIT_COUNT = 200
+# A denomination is refilled when fewer outputs than this are left
+LOW_WATER_MARK = 2
+# Number of recent uses kept per user and denomination to estimate the operation rate
+RATE_WINDOW = 64
+
+
+def _outpoint_key(outpoint) -> tuple[str, int]:
+    return (outpoint.prev_tx, outpoint.prev_index)
+
+
+class FundingPool:
+    """Amounts of funding UTXOs, and rate at which the outputs of each denomination are used up.
+
+    Amounts are read from the transaction store (which holds every transaction broadcast by the cli) and remembered.
+    The times of the last uses of each user and denomination are kept in the JSON file `stats_path`, if set, so that
+    the rate is observed across commands.
+    """
+
+    def __init__(self, network: BlockchainInterface, stats_path: Path | None = None):
+        self.network = network
+        self.stats_path = stats_path
+        self.amounts = {}
+        self.stats = {}
+
+    def amounts_of(self, outpoints: list) -> list[int]:
+        """Return the amounts of `outpoints`, retrieving the transactions of the unknown ones in bulk."""
+        missing = [outpoint for outpoint in outpoints if _outpoint_key(outpoint) not in self.amounts]
+        if missing:
+            txs = txs_from_ids([outpoint.prev_tx for outpoint in missing], self.network)
+            for (outpoint, tx) in zip(missing, txs):
+                self.amounts[_outpoint_key(outpoint)] = tx.tx_outs[outpoint.prev_index].amount
+        return [self.amounts[_outpoint_key(outpoint)] for outpoint in outpoints]
+
+    def select(self, outpoints: list, minimum: int, maximum: int | None = None, exclude: tuple[int, ...] = ()) -> int | None:
+        """Return the position of the smallest UTXO in `outpoints` holding between `minimum` and `maximum` satoshis,
+        skipping those holding exactly an amount in `exclude`. Return None if there is none."""
+        candidates = [
+            (amount, position)
+            for (position, amount) in enumerate(self.amounts_of(outpoints))
+            if minimum <= amount and (maximum is None or amount <= maximum) and amount not in exclude
+        ]
+        return min(candidates)[1] if candidates else None
+
+    def largest(self, outpoints: list, exclude: tuple[int, ...] = ()) -> int | None:
+        """Return the position of the largest UTXO in `outpoints`, preferring those not holding exactly an amount in
+        `exclude`. Return None if `outpoints` is empty."""
+        amounts = self.amounts_of(outpoints)
+        candidates = [(amount not in exclude, amount, position) for (position, amount) in enumerate(amounts)]
+        return max(candidates)[2] if candidates else None
+
+    def count(self, outpoints: list, minimum: int, maximum: int) -> int:
+        """Return the number of UTXOs in `outpoints` holding between `minimum` and `maximum` satoshis."""
+        return sum(minimum <= amount <= maximum for amount in self.amounts_of(outpoints))
+
+    def __load_stats(self) -> dict:
+        if self.stats_path is None:
+            return self.stats
+        try:
+            with open(self.stats_path, "r") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def __save_stats(self, stats: dict):
+        if self.stats_path is None:
+            self.stats = stats
+            return
+        tmp_path = f"{self.stats_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(stats, f)
+        os.replace(tmp_path, self.stats_path)
+
+    def record_use(self, name: str, denomination: int):
+        """Record that `name` used up an output of `denomination` satoshis now."""
+        stats = self.__load_stats()
+        uses = stats.setdefault(name, {}).setdefault(str(denomination), [])
+        uses.append(time.time())
+        del uses[:-RATE_WINDOW]
+        self.__save_stats(stats)
+
+    def split_count(self, name: str, denomination: int) -> int:
+        """Return the number of outputs of `denomination` satoshis to create for `name`: enough for the operations
+        expected in the next `REFILL_HORIZON` seconds at the rate observed over the last uses."""
+        uses = self.__load_stats().get(name, {}).get(str(denomination), [])
+        if len(uses) < 2:
+            return MIN_SPLIT_COUNT
+        elapsed = max(time.time() - uses[0], 1)
+        rate = (len(uses) - 1) / elapsed
+        return max(MIN_SPLIT_COUNT, min(MAX_SPLIT_COUNT, math.ceil(rate * REFILL_HORIZON)))
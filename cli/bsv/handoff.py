@@ -0,0 +1,75 @@
+"""Binary handoff format for the payloads passed to the Sui client.
+
+A handoff file starts with the magic `TCPB` and a version byte, followed by the fields of the payload in the order
+given by its schema: integers are little-endian `u32` or `u64`, byte strings are a `u32` length followed by the raw
+bytes, and lists are a `u32` number of elements followed by the elements. Byte strings are written raw, so large
+payloads (e.g., the burning transaction) are half the size they are in TOML and need no hex parsing.
+
+The format is read by `cli/sui/src/handoff.rs`, and the schemas below must match the `FromHandoff` implementations
+there.
+"""
+from pathlib import Path
+import struct
+
+MAGIC = b"TCPB"
+VERSION = 1
+HANDOFF_EXTENSION = ".bin"
+
+# Schemas: (field, type), with type one of "u32", "u64", "bytes", "u32_list", "bytes_list", a nested schema, or a list
+# [schema] of nested schemas
+BLOCK_HEADER_SERIALISATION = (("ser", "bytes"),)
+BLOCK_HEADER_SERIALISATIONS = (("sers", "bytes_list"),)
+FORKED_CHAIN = (("fork_index", "u64"), ("sers", "bytes_list"))
+BRIDGE_ENTRY = (("genesis_txid", "bytes"), ("genesis_index", "u32"), ("pegout_txid", "bytes"), ("pegout_index", "u32"))
+BRIDGE_ENTRIES = (("entries", [BRIDGE_ENTRY]),)
+ELAPSED_BRIDGE_ENTRY = (("genesis_txid", "bytes"), ("genesis_index", "u32"))
+PEGIN = (("genesis_txid", "bytes"), ("genesis_index", "u32"), ("pegin_amount", "u64"))
+PEGINS = (("pegins", [PEGIN]),)
+MERKLE_PROOF = (("positions", "u32_list"), ("hashes", "bytes_list"))
+PEGOUT = (
+    ("genesis_txid", "bytes"),
+    ("genesis_index", "u32"),
+    ("burning_tx", "bytes"),
+    ("block_height", "u64"),
+    ("merkle_proof", MERKLE_PROOF),
+)
+
+
+def _write(out: list, field_type, value):
+    match field_type:
+        case "u32":
+            out.append(struct.pack("<I", value))
+        case "u64":
+            out.append(struct.pack("<Q", value))
+        case "bytes":
+            assert isinstance(value, (bytes, bytearray, memoryview)), f"Expected bytes, got {type(value).__name__}"
+            out.append(struct.pack("<I", len(value)))
+            out.append(value)
+        case "u32_list":
+            out.append(struct.pack(f"<I{len(value)}I", len(value), *value))
+        case "bytes_list":
+            out.append(struct.pack("<I", len(value)))
+            for element in value:
+                _write(out, "bytes", element)
+        case [element_type] if isinstance(field_type, list):
+            out.append(struct.pack("<I", len(value)))
+            for element in value:
+                _write(out, element_type, element)
+        case _:
+            for (field, nested_type) in field_type:
+                _write(out, nested_type, value[field])
+
+
+def serialise(data: dict, schema: tuple) -> bytes:
+    """Serialise `data`, whose fields are described by `schema`."""
+    out = [MAGIC, VERSION.to_bytes(1)]
+    _write(out, schema, data)
+    return b"".join(out)
+
+
+def dump(data: dict, schema: tuple, path: Path) -> Path:
+    """Write `data`, whose fields are described by `schema`, to `path` with the handoff extension."""
+    path = Path(path).with_suffix(HANDOFF_EXTENSION)
+    with open(path, "wb") as file:
+        file.write(serialise(data, schema))
+    return path
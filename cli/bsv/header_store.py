@@ -0,0 +1,185 @@
+"""Local store of the block headers held by the oracle."""
+import mmap
+import os
+import struct
+from pathlib import Path
+
+from tx_engine import hash256d
+
+from bsv.block_header import BlockHeader, BlockHeaderView
+
+HEADER_STORE_PATH = Path(__file__).parent.parent / "header_index"
+HEADER_SIZE = 80
+# Base height (u64), number of headers (u64), chain work of the base block (u256, big endian)
+STORE_HEADER_FORMAT = "<QQ32s"
+STORE_HEADER_SIZE = struct.calcsize(STORE_HEADER_FORMAT)
+
+
+class HeaderStore:
+    """Chain of block headers starting at `base_height`, in an append-only file of 80-byte records.
+
+    The file starts with the base height, the number of headers in the chain, and the chain work of the base block.
+    Records are memory mapped, so headers are read as `BlockHeaderView`s without copies. The height of a header is
+    given by its position in the file, and a hash -> height index and the cumulative chain works are rebuilt when the
+    store is opened. Hashes are in internal byte order.
+
+    Dropping headers after a reorg only lowers the number of headers in the file: stale records are overwritten by
+    the next appends, so the file never shrinks under a live mapping.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.base_height = None
+        self.base_chain_work = None
+        self.n_headers = 0
+        self.chain_works = []
+        self.heights = {}
+        self.__file = None
+        self.__mmap = None
+        if self.path.exists():
+            self.load()
+
+    @staticmethod
+    def for_network(network: str) -> "HeaderStore":
+        return HeaderStore(HEADER_STORE_PATH / f"{network}.headers")
+
+    def load(self):
+        self.__open()
+        self.__file.seek(0)
+        self.base_height, self.n_headers, base_chain_work = struct.unpack(
+            STORE_HEADER_FORMAT, self.__file.read(STORE_HEADER_SIZE)
+        )
+        self.base_chain_work = int.from_bytes(base_chain_work, "big")
+        self.chain_works, self.heights = [], {}
+        for i in range(self.n_headers):
+            view = self.view(self.base_height + i)
+            self.heights[view.hash()] = self.base_height + i
+            self.chain_works.append(self.base_chain_work if i == 0 else self.chain_works[-1] + view.work())
+
+        return
+
+    def save(self):
+        """Flush the store to disk."""
+        if self.__file is not None:
+            self.__file.flush()
+            os.fsync(self.__file.fileno())
+
+        return
+
+    def is_empty(self) -> bool:
+        return self.n_headers == 0
+
+    @property
+    def tip_height(self) -> int:
+        return self.base_height + self.n_headers - 1
+
+    @property
+    def tip_hash(self) -> bytes:
+        return self.view(self.tip_height).hash()
+
+    @property
+    def tip_chain_work(self) -> int:
+        return self.chain_works[-1]
+
+    def __contains__(self, height: int) -> bool:
+        return not self.is_empty() and self.base_height <= height <= self.tip_height
+
+    def view(self, height: int) -> BlockHeaderView:
+        """Return a view over the header at `height`."""
+        assert height in self, f"Height {height} is not in the store"
+        offset = STORE_HEADER_SIZE + (height - self.base_height) * HEADER_SIZE
+        return BlockHeaderView(memoryview(self.__mapping())[offset:offset + HEADER_SIZE])
+
+    def hash_at(self, height: int) -> bytes | None:
+        if height not in self:
+            return None
+        return self.view(height).hash()
+
+    def height_of(self, block_hash: bytes) -> int | None:
+        return self.heights.get(block_hash)
+
+    def chain_work_at(self, height: int) -> int | None:
+        if height not in self:
+            return None
+        return self.chain_works[height - self.base_height]
+
+    def reset(self, base_height: int, block_header: BlockHeader, chain_work: int):
+        """Restart the store from `block_header`, at height `base_height` with chain work `chain_work`."""
+        self.__close()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "wb") as f:
+            f.write(struct.pack(STORE_HEADER_FORMAT, base_height, 0, chain_work.to_bytes(32, "big")))
+        self.__open()
+        self.base_height = base_height
+        self.base_chain_work = chain_work
+        self.n_headers = 0
+        self.chain_works, self.heights = [], {}
+        self.__append([block_header])
+
+        return
+
+    def extend(self, block_headers: list[BlockHeader]):
+        """Append `block_headers` to the tip of the store."""
+        tip_hash = self.tip_hash
+        for block_header in block_headers:
+            assert block_header.hash_prev_block == tip_hash, f"Block {block_header.hash()[::-1].hex()} does not extend the tip of the store"
+            tip_hash = block_header.hash()
+        self.__append(block_headers)
+
+        return
+
+    def truncate(self, height: int):
+        """Drop the headers above `height`."""
+        assert height in self, f"Height {height} is not in the store"
+        for dropped_height in range(height + 1, self.tip_height + 1):
+            del self.heights[self.view(dropped_height).hash()]
+        self.n_headers = height - self.base_height + 1
+        del self.chain_works[self.n_headers:]
+        self.__write_n_headers()
+
+        return
+
+    def __append(self, block_headers: list[BlockHeader]):
+        serialisations = [block_header.serialise() for block_header in block_headers]
+        self.__file.seek(STORE_HEADER_SIZE + self.n_headers * HEADER_SIZE)
+        self.__file.write(b"".join(serialisations))
+        for serialisation in serialisations:
+            block_hash = hash256d(serialisation)
+            self.heights[block_hash] = self.base_height + self.n_headers
+            self.n_headers += 1
+            if len(self.chain_works) == 0:
+                self.chain_works.append(self.base_chain_work)
+            else:
+                self.chain_works.append(self.chain_works[-1] + BlockHeaderView(memoryview(serialisation)).work())
+        self.__write_n_headers()
+        # The mapping no longer covers the whole file
+        self.__mmap = None
+
+        return
+
+    def __write_n_headers(self):
+        self.__file.seek(struct.calcsize("<Q"))
+        self.__file.write(struct.pack("<Q", self.n_headers))
+        self.__file.flush()
+
+        return
+
+    def __open(self):
+        if self.__file is None:
+            self.__file = open(self.path, "r+b")
+
+        return
+
+    def __close(self):
+        # Views handed out keep their own reference to the mapping, so it is released rather than closed
+        self.__mmap = None
+        if self.__file is not None:
+            self.__file.close()
+            self.__file = None
+
+        return
+
+    def __mapping(self) -> mmap.mmap:
+        if self.__mmap is None:
+            self.__mmap = mmap.mmap(self.__file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self.__mmap
@@ -0,0 +1,115 @@
+"""Merkle trees of blocks, and the proofs of inclusion served from them."""
+from pathlib import Path
+
+from tx_engine import hash256d
+from tx_engine.interface.interface_factory import WoCInterface, RPCInterface
+from tx_engine.interface.woc import get_url
+
+from bsv.block_header import MerkleProof
+from bsv.cache import DiskCache, LRUCache
+from bsv.network import DEFAULT_TIMEOUT, get_session
+
+MERKLE_CACHE_PATH = Path(__file__).parent.parent / "merkle_cache"
+
+
+class MerkleTree:
+    """Merkle tree of a block, built once from the full list of its txids.
+
+    Every level of the tree is kept, so the proof of any transaction in the block is read off the cached levels.
+    Hashes are in internal byte order. Levels are not padded: the missing sibling of the last node of a level with an
+    odd number of nodes is the node itself.
+    """
+
+    def __init__(self, txids: list[str]):
+        assert len(txids) != 0, "A block contains at least one transaction"
+        self.indexes = {txid: i for (i, txid) in enumerate(txids)}
+        level = [bytes.fromhex(txid)[::-1] for txid in txids]
+        self.levels = [level]
+        while len(level) > 1:
+            level = [
+                hash256d(level[i] + (level[i + 1] if i + 1 < len(level) else level[i]))
+                for i in range(0, len(level), 2)
+            ]
+            self.levels.append(level)
+
+    def root(self) -> bytes:
+        return self.levels[-1][0]
+
+    def __contains__(self, txid: str) -> bool:
+        return txid in self.indexes
+
+    def get_merkle_proof(self, txid: str) -> MerkleProof:
+        """Return the proof of inclusion of `txid`, in the format of `MerkleProof.get_merkle_proof`."""
+        assert txid in self.indexes, f"Transaction {txid} is not in the block"
+        index = self.indexes[txid]
+        nodes = []
+        position = index
+        for level in self.levels[:-1]:
+            sibling = position ^ 1
+            nodes.append(level[sibling] if sibling < len(level) else level[position])
+            position >>= 1
+        return MerkleProof(index, nodes)
+
+    @staticmethod
+    def get(block_hash: str, connection: WoCInterface | RPCInterface) -> "MerkleTree":
+        """Build the Merkle tree of `block_hash` from its txids, and check it against the Merkle root of the block."""
+        block_json = connection.get_block(block_hash)
+        txids = list(block_json["tx"])
+        # WoC only lists the transactions of large blocks in pages
+        if isinstance(connection, WoCInterface) and block_json.get("pages"):
+            for uri in block_json["pages"]["uri"]:
+                response = get_session().get(get_url(connection.is_testnet()) + uri, timeout=DEFAULT_TIMEOUT)
+                assert response.status_code == 200, f"Failed to retrieve the transactions of block {block_hash}"
+                txids.extend(response.json())
+        merkle_tree = MerkleTree(txids)
+        assert merkle_tree.root() == bytes.fromhex(block_json["merkleroot"])[::-1], f"The txids of block {block_hash} do not match its Merkle root"
+        return merkle_tree
+
+
+class MerkleProofCache:
+    """Proofs of inclusion keyed by (block hash, txid).
+
+    Proofs are kept in memory and on disk. A proof that is not cached is read off the Merkle tree of its block, which
+    is built once per block and kept in memory, so proving many transactions of the same block costs a single
+    retrieval of the txids of the block.
+    """
+
+    def __init__(self, path: Path = MERKLE_CACHE_PATH, max_trees: int = 4, max_proofs: int = 1024):
+        self.trees = LRUCache(max_trees)
+        self.proofs = LRUCache(max_proofs)
+        self.disk = DiskCache(path)
+
+    def get_merkle_proof(self, block_hash: str, txid: str, connection: WoCInterface | RPCInterface) -> MerkleProof:
+        key = txid + block_hash
+        merkle_proof = self.proofs.get(key)
+        if merkle_proof is not None:
+            return merkle_proof
+
+        serialised = self.disk.get(key)
+        if serialised is not None:
+            merkle_proof = MerkleProof(
+                int.from_bytes(serialised[:4], "little"),
+                [serialised[i:i + 32] for i in range(4, len(serialised), 32)],
+            )
+        else:
+            merkle_tree = self.trees.get(block_hash)
+            if merkle_tree is None:
+                merkle_tree = MerkleTree.get(block_hash, connection)
+                self.trees.put(block_hash, merkle_tree)
+            merkle_proof = merkle_tree.get_merkle_proof(txid)
+            self.disk.put(key, merkle_proof.index.to_bytes(4, "little") + b"".join(merkle_proof.nodes))
+
+        self.proofs.put(key, merkle_proof)
+
+        return merkle_proof
+
+
+_merkle_proof_cache = None
+
+
+def get_merkle_proof_cache() -> MerkleProofCache:
+    """Return the Merkle proof cache shared by the whole process."""
+    global _merkle_proof_cache
+    if _merkle_proof_cache is None:
+        _merkle_proof_cache = MerkleProofCache()
+    return _merkle_proof_cache
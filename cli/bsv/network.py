@@ -0,0 +1,221 @@
+"""Networking layer shared by all the BSV traffic of the cli.
+
+All requests go through a single `requests.Session`, which keeps connections alive and pools them per host, so that
+WoC and RPC calls do not pay for a new TCP (and TLS) connection each time. Transient failures are retried with
+exponential backoff, honouring the `Retry-After` header of rate-limited responses. POST requests, which include the
+broadcasts, are only retried when the connection could not be made, unless they only read data (see `get_session`).
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from tx_engine.interface.interface_factory import WoCInterface, RPCInterface
+from tx_engine.interface.rpc_interface import RPCReturnInfo
+from tx_engine.interface.woc import get_url
+
+DEFAULT_TIMEOUT = 30
+POOL_SIZE = 16
+MAX_RETRIES = 5
+BACKOFF_FACTOR = 0.5
+# Maximum number of txids accepted by the WoC bulk endpoint `/txs/hex`
+WOC_BULK_TX_LIMIT = 20
+MAX_CONCURRENT_REQUESTS = 8
+
+# WoC answers 429 when rate limiting, and 5xx on transient failures
+WOC_RETRY = Retry(
+    total=MAX_RETRIES,
+    backoff_factor=BACKOFF_FACTOR,
+    status_forcelist=(429, 500, 502, 503, 504),
+    respect_retry_after_header=True,
+    raise_on_status=False,
+)
+# The node reports JSON-RPC errors with a 500, which must not be retried
+RPC_RETRY = Retry(
+    total=MAX_RETRIES,
+    backoff_factor=BACKOFF_FACTOR,
+    status_forcelist=(429, 502, 503, 504),
+    respect_retry_after_header=True,
+    raise_on_status=False,
+)
+
+_sessions = {}
+_session_lock = threading.Lock()
+
+
+def get_session(read_only: bool = False) -> requests.Session:
+    """Return the HTTP session shared by the whole process. By default, a POST that fails after reaching the server
+    is not retried, as it may have been executed (e.g., a broadcast). With `read_only`, POSTs are retried like GETs:
+    use it for requests that only read data."""
+    with _session_lock:
+        if read_only not in _sessions:
+            allowed_methods = Retry.DEFAULT_ALLOWED_METHODS | {"POST"} if read_only else Retry.DEFAULT_ALLOWED_METHODS
+            session = requests.Session()
+            session.mount("https://", HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE, max_retries=WOC_RETRY.new(allowed_methods=allowed_methods)))
+            session.mount("http://", HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE, max_retries=RPC_RETRY.new(allowed_methods=allowed_methods)))
+            _sessions[read_only] = session
+    return _sessions[read_only]
+
+
+def rpc_call(connection: RPCInterface, method: str, params: list):
+    """Execute the JSON-RPC call `method(*params)` on the node of `connection`."""
+    return rpc_batch(connection, [(method, params)])[0]
+
+
+def rpc_batch(connection: RPCInterface, calls: list[tuple[str, list]]) -> list:
+    """Execute `calls`, a list of (method, params), as a single batched JSON-RPC request. The calls must only read
+    data, as the request is retried on failures."""
+    if len(calls) == 0:
+        return []
+    payload = [
+        {"method": method, "params": params, "jsonrpc": "2.0", "id": i}
+        for (i, (method, params)) in enumerate(calls)
+    ]
+    responses = get_session(read_only=True).post(
+        "http://" + connection.address,
+        json=payload,
+        auth=(connection.user, connection.password),
+        timeout=DEFAULT_TIMEOUT,
+    ).json()
+    responses = sorted(responses, key=lambda response: response["id"])
+    for response in responses:
+        assert response.get("error") is None, f"Error in RPC call {calls[response['id']][0]}: {response['error']}"
+    return [response["result"] for response in responses]
+
+
+def get_bulk_tx_data(txids: list[str], network: WoCInterface | RPCInterface) -> requests.Response:
+    """Retrieve the data of `txids` (hex and block information) with the WoC bulk endpoint `/txs/hex`."""
+    network_str = "test" if network.is_testnet() else "main"
+    api_request = f"https://api.whatsonchain.com/v1/bsv/{network_str}/txs/hex"
+    payload = { "txids": txids }
+    return get_session(read_only=True).post(url=api_request, json=payload, timeout=DEFAULT_TIMEOUT)
+
+
+def get_raw_transactions(txids: list[str], network: WoCInterface | RPCInterface) -> dict[str, str]:
+    """Retrieve the hex serialisations of `txids`, in as few round trips as possible.
+
+    Over RPC, all the transactions are requested in a single batched JSON-RPC request. Over WoC, they are requested
+    with the bulk endpoint in chunks of `WOC_BULK_TX_LIMIT`, sent concurrently.
+    """
+    if len(txids) == 0:
+        return {}
+    if isinstance(network, RPCInterface):
+        return dict(zip(txids, rpc_batch(network, [("getrawtransaction", [txid]) for txid in txids])))
+    if isinstance(network, WoCInterface):
+        chunks = [txids[i:i + WOC_BULK_TX_LIMIT] for i in range(0, len(txids), WOC_BULK_TX_LIMIT)]
+        with ThreadPoolExecutor(max_workers=min(len(chunks), MAX_CONCURRENT_REQUESTS)) as executor:
+            responses = list(executor.map(lambda chunk: get_bulk_tx_data(chunk, network), chunks))
+        raw_txs = {}
+        for response in responses:
+            assert response.status_code == 200, f"Error retrieving transactions: {response.text}"
+            for tx_data in response.json():
+                assert tx_data.get("hex"), f"Error retrieving transaction {tx_data.get('txid')}: {tx_data.get('error')}"
+                raw_txs[tx_data["txid"]] = tx_data["hex"]
+        return raw_txs
+    return {txid: network.get_raw_transaction(txid) for txid in txids}
+
+
+def broadcast_raw_transactions(raw_txs: list[str], network: WoCInterface | RPCInterface) -> list:
+    """Broadcast the hex serialisations `raw_txs` in order, so that a transaction may spend the outputs of the ones
+    before it. Return a response with a `status_code` for each of them.
+
+    Over RPC, all the transactions are sent in a single batched JSON-RPC request, which the node executes in order.
+    Otherwise, they are sent one after the other through the shared session.
+    """
+    if len(raw_txs) == 0:
+        return []
+    if not isinstance(network, RPCInterface):
+        return [network.broadcast_tx(raw_tx) for raw_tx in raw_txs]
+    payload = [
+        {"method": "sendrawtransaction", "params": [raw_tx], "jsonrpc": "2.0", "id": i}
+        for (i, raw_tx) in enumerate(raw_txs)
+    ]
+    responses = get_session().post(
+        "http://" + network.address,
+        json=payload,
+        auth=(network.user, network.password),
+        timeout=DEFAULT_TIMEOUT,
+    ).json()
+    api_returns = []
+    for response in sorted(responses, key=lambda response: response["id"]):
+        if response.get("error") is not None:
+            api_return = RPCReturnInfo(response["error"]["message"])
+            api_return.status_code = response["error"]["code"]
+        else:
+            api_return = RPCReturnInfo(response["result"])
+            api_return.status_code = 200
+        api_returns.append(api_return)
+    return api_returns
+
+
+class PooledWoCInterface(WoCInterface):
+    """WoC interface sending its high-frequency requests through the shared session."""
+
+    def __get(self, path: str):
+        response = get_session().get(f"{get_url(self.is_testnet())}{path}", timeout=DEFAULT_TIMEOUT)
+        if response.status_code != 200:
+            return None
+        return response.json()
+
+    def _get_chain_info(self):
+        return self.__get("/chain/info")
+
+    def get_merkle_proof(self, block_hash: str, tx_id: str):
+        return self.__get(f"/tx/{tx_id}/proof/tsc")
+
+    def get_transaction(self, txid: str):
+        return self.__get(f"/tx/hash/{txid}")
+
+    def get_raw_transaction(self, txid: str) -> str | None:
+        response = get_session().get(f"{get_url(self.is_testnet())}/tx/{txid}/hex", timeout=DEFAULT_TIMEOUT)
+        if response.status_code != 200:
+            return None
+        return response.text
+
+    def broadcast_tx(self, transaction: str):
+        return get_session().post(f"{get_url(self.is_testnet())}/tx/raw", json={"txhex": transaction}, timeout=DEFAULT_TIMEOUT)
+
+    def get_block(self, blockhash: str):
+        return self.__get(f"/block/hash/{blockhash}")
+
+    def get_block_header(self, blockhash: str):
+        return self.__get(f"/block/{blockhash}/header")
+
+
+class PooledRPCInterface(RPCInterface):
+    """RPC interface sending its high-frequency requests through the shared session."""
+
+    def _get_chain_info(self):
+        return rpc_call(self, "getblockchaininfo", [])
+
+    def get_block_count(self):
+        return rpc_call(self, "getblockcount", [])
+
+    def get_raw_transaction(self, txid: str) -> str:
+        return rpc_call(self, "getrawtransaction", [txid])
+
+    def broadcast_tx(self, hexstring: str):
+        response = get_session().post(
+            "http://" + self.address,
+            json={"method": "sendrawtransaction", "params": [hexstring], "jsonrpc": "2.0", "id": 0},
+            auth=(self.user, self.password),
+            timeout=DEFAULT_TIMEOUT,
+        ).json()
+        if response.get("error") is not None:
+            api_return = RPCReturnInfo(response["error"]["message"])
+            api_return.status_code = response["error"]["code"]
+        else:
+            api_return = RPCReturnInfo(response["result"])
+            api_return.status_code = 200
+        return api_return
+
+    def get_block_hash(self, index: int) -> str:
+        return rpc_call(self, "getblockhash", [index])
+
+    def get_block(self, hash: str):
+        return rpc_call(self, "getblock", [hash])
+
+    def get_block_header(self, block_hash: str):
+        return rpc_call(self, "getblockheader", [block_hash])
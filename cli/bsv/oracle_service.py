@@ -1,49 +1,153 @@
 import argparse
-from block_header import BlockHeader
+import asyncio
 from pathlib import Path
-import subprocess
+import sys
 import time
-import toml
-from utils import setup_network_connection
 
-BLOCK_HEADER_SERIALISATION = "config_files/config_update_chain.toml"
-UPDATE_CHAIN_COMMAND = "cargo run -- update-chain"
+sys.path.append(str(Path(__file__).parent.parent))
+
+from bsv import handoff
+from bsv.async_network import AsyncNetwork
+from bsv.block_header import BlockHeader, validate_chain
+from bsv.bridge_client import get_bridge_client
+from bsv.header_store import HeaderStore
+from bsv.utils import setup_network_connection
+
+BLOCK_HEADERS_SERIALISATION = "config_files/config_update_chain_batch"
+UPDATE_CHAIN_BATCH_COMMAND = "update-chain-batch"
+REORG_CHAIN_SERIALISATION = "config_files/config_reorg_chain"
+REORG_CHAIN_COMMAND = "reorg-chain"
+DEFAULT_BATCH_SIZE = 100
+DEFAULT_POLL_INTERVAL = 10
+
+def update_chain_batch(block_headers: list[BlockHeader]):
+    """Add `block_headers` to the oracle in a single Sui transaction."""
+    handoff.dump(
+        {"sers": [block_header.serialise() for block_header in block_headers]},
+        handoff.BLOCK_HEADER_SERIALISATIONS,
+        Path(__file__).parent.parent / "sui" / BLOCK_HEADERS_SERIALISATION,
+    )
+    get_bridge_client().run(UPDATE_CHAIN_BATCH_COMMAND)
+
+def reorg_chain(fork_height: int, block_headers: list[BlockHeader]):
+    """Replace the blocks of the oracle above `fork_height` with `block_headers`."""
+    handoff.dump(
+        {"fork_index": fork_height, "sers": [block_header.serialise() for block_header in block_headers]},
+        handoff.FORKED_CHAIN,
+        Path(__file__).parent.parent / "sui" / REORG_CHAIN_SERIALISATION,
+    )
+    get_bridge_client().run(REORG_CHAIN_COMMAND)
+
+def get_chain(bsv, tip_hash: str, n_blocks: int) -> list[BlockHeader]:
+    """Retrieve the `n_blocks` block headers ending at `tip_hash`, oldest first, with concurrent requests."""
+    async def get_chain_async():
+        return await AsyncNetwork(bsv).get_chain(tip_hash, n_blocks)
+    return asyncio.run(get_chain_async())
+
+def seed_store(bsv, store: HeaderStore, block_height: int) -> list[BlockHeader]:
+    """Restart `store` from the block at `block_height`, the tip of the oracle.
+
+    Returns the headers of the best chain after `block_height`.
+    """
+    tip_hash = bsv.get_best_block_hash()
+    tip_height = bsv.get_block_header(tip_hash)["height"]
+    assert block_height <= tip_height, f"Block height {block_height} is above the current tip {tip_height}"
+    block_headers = get_chain(bsv, tip_hash, tip_height - block_height + 1)
+    chain_work = int(bsv.get_block_header(block_headers[0].hash()[::-1].hex())["chainwork"], 16)
+    store.reset(block_height, block_headers[0], chain_work)
+    store.save()
+    return block_headers[1:]
+
+def fetch_new_headers(bsv, store: HeaderStore) -> tuple[int, list[BlockHeader]]:
+    """Compare the best chain with `store`.
+
+    Returns the height of the last block shared by the best chain and the store, together with the headers of
+    the best chain after it.
+    """
+    tip_hash = bsv.get_best_block_hash()
+    if bytes.fromhex(tip_hash)[::-1] == store.tip_hash:
+        return store.tip_height, []
+    tip_height = bsv.get_block_header(tip_hash)["height"]
+    block_headers = get_chain(bsv, tip_hash, max(tip_height - store.tip_height, 1))
+    # Walk back until the best chain connects to the store
+    while (fork_height := store.height_of(block_headers[0].hash_prev_block)) is None:
+        assert tip_height - len(block_headers) > store.base_height, "The best chain forks below the first block of the local header store"
+        block_headers.insert(0, BlockHeader.get(block_headers[0].hash_prev_block[::-1].hex(), bsv))
+    return fork_height, block_headers
+
+def sync(store: HeaderStore, fork_height: int, block_headers: list[BlockHeader], batch_size: int):
+    """Bring the oracle and `store` to the chain ending with `block_headers`, which forks from `store` at `fork_height`."""
+    if len(block_headers) == 0:
+        return
+    # Pre-validate the headers locally rather than paying for transactions the oracle would ignore or abort
+    n_valid, chain_works = validate_chain(block_headers, store.view(fork_height), store.chain_work_at(fork_height))
+    if n_valid < len(block_headers):
+        print(f"Block {block_headers[n_valid].hash()[::-1].hex()} is not valid: only the {n_valid} blocks before it are added")
+    if fork_height < store.tip_height:
+        assert n_valid == len(block_headers), "The forked chain contains invalid blocks"
+        if chain_works[-1] <= store.tip_chain_work:
+            print("The forked chain has less chain work than the chain held by the oracle: ignoring it")
+            return
+        print(f"Reorg detected: replacing {store.tip_height - fork_height} blocks above height {fork_height}")
+        reorg_chain(fork_height, block_headers)
+        store.truncate(fork_height)
+        store.extend(block_headers)
+        store.save()
+        print(f"Blocks {block_headers[0].hash()[::-1].hex()} to {block_headers[-1].hash()[::-1].hex()} added to the oracle")
+        return
+    block_headers = block_headers[:n_valid]
+    for i in range(0, len(block_headers), batch_size):
+        batch = block_headers[i:i + batch_size]
+        update_chain_batch(batch)
+        store.extend(batch)
+        store.save()
+        print(f"Blocks {batch[0].hash()[::-1].hex()} to {batch[-1].hash()[::-1].hex()} added to the oracle")
 
 def main():
     parser = argparse.ArgumentParser(description='Oracle service updating BSV oracle smart contract.')
     parser.add_argument('--block_height', type=int, 
-                        help='Specify the block_height to start the service from')
+                        help='Specify the block_height to start the service from. If omitted, the service resumes from the local header store')
     parser.add_argument('--network', choices=['regtest', 'testnet', 'mainnet'], 
                         help='Specify the network to connect to: regtest, testnet, or mainnet.')
+    parser.add_argument('--batch_size', type=int, default=DEFAULT_BATCH_SIZE,
+                        help=f'Specify the number of block headers added to the oracle in each Sui transaction (default: {DEFAULT_BATCH_SIZE})')
+    parser.add_argument('--follow', action='store_true',
+                        help='Keep running, adding new blocks to the oracle as they are mined')
+    parser.add_argument('--poll_interval', type=float, default=DEFAULT_POLL_INTERVAL,
+                        help=f'Specify the number of seconds between checks for new blocks in follow mode (default: {DEFAULT_POLL_INTERVAL})')
 
     args = parser.parse_args()
+    assert args.batch_size > 0, "The batch size must be positive"
 
     print(f"Connecting to the {args.network}...")
     bsv = setup_network_connection(args.network)
 
-    prev_block_height = args.block_height
-
-    current_block_height = bsv.get_block_count()
-    current_block_hash = bsv.get_best_block_hash()
-    if prev_block_height != current_block_height:
-        block_headers = [BlockHeader.get(current_block_hash, bsv)]
-        for _ in range(prev_block_height, current_block_height-1):
-            block_hash = block_headers[-1].hash_prev_block[::-1].hex()
-            block_headers.append(BlockHeader.get(block_hash, bsv))
-        for (i, block_header) in enumerate(block_headers[::-1]):
-            with open(Path(__file__).parent.parent / "sui" / BLOCK_HEADER_SERIALISATION, "w") as file:
-                toml.dump({"ser": block_header.serialise().hex()}, file)
-            subprocess.run(
-                f"cd {Path(__file__).parent.parent / "sui"} && {UPDATE_CHAIN_COMMAND}",
-                shell=True,
-                check=True,
-                text=True,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE)
-            print(f"Block {block_header.hash()[::-1].hex()} added to the oracle")
-            if i == len(block_headers):
-                print(f"Oracle up to date. Last block added at height: {block_header.height}")
+    store = HeaderStore.for_network(args.network)
+    if args.block_height is not None:
+        block_headers = seed_store(bsv, store, args.block_height)
+        sync(store, args.block_height, block_headers, args.batch_size)
+    else:
+        assert not store.is_empty(), "No local header store found: specify --block_height"
+    sync(store, *fetch_new_headers(bsv, store), args.batch_size)
+    print(f"Oracle up to date. Last block added at height: {store.tip_height}")
+
+    if not args.follow:
+        return
+
+    try:
+        while True:
+            time.sleep(args.poll_interval)
+            try:
+                fork_height, block_headers = fetch_new_headers(bsv, store)
+                if len(block_headers) != 0:
+                    sync(store, fork_height, block_headers, args.batch_size)
+                    print(f"Oracle up to date. Last block added at height: {store.tip_height}")
+            except Exception as e:
+                # Keep following: the next poll retries from the last block saved in the store
+                print(f"Failed to update the oracle: {e}")
+    except KeyboardInterrupt:
+        print("Oracle service stopped")
 
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,33 @@
+"""Timing of the stages of multi-step operations."""
+from contextlib import contextmanager
+import threading
+import time
+
+
+class StageTimer:
+    """Wall-clock duration of named stages, which may run in different threads."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.durations = {}
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - start
+            with self.lock:
+                self.durations[name] = self.durations.get(name, 0) + duration
+
+    def timed(self, name: str, function, *args, **kwargs):
+        """Call `function(*args, **kwargs)` as the stage `name`."""
+        with self.stage(name):
+            return function(*args, **kwargs)
+
+    def report(self) -> str:
+        total = time.perf_counter() - self.start
+        lines = [f"\t{name}: {duration:.2f}s" for (name, duration) in self.durations.items()]
+        return "\n".join(["Stage timings:", *lines, f"\ttotal (wall-clock): {total:.2f}s"])
@@ -0,0 +1,102 @@
+"""Client for the zk_engine prover service."""
+import json
+import socket
+import subprocess
+import threading
+from pathlib import Path
+
+import toml
+
+ZK_ENGINE_PATH = Path(__file__).parent.parent.parent / "zk_engine"
+PROVER_SOCKET_PATH = ZK_ENGINE_PATH / "data/prover.sock"
+PROVE_CONFIG_PATHS = {
+    "tcp": ZK_ENGINE_PATH / "data/tcp_engine/configs/prove.toml",
+    "pob": ZK_ENGINE_PATH / "data/pob_engine/configs/prove.toml",
+}
+PROVE_COMMANDS = {
+    "tcp": "cargo run --release -- tcp-engine prove",
+    "pob": "cargo run --release -- pob-engine prove",
+}
+# The fallback writes a shared `prove.toml` per engine and builds in a shared target directory, so it runs one job
+# at a time across the whole process
+_CARGO_LOCK = threading.Lock()
+
+
+class ProverClient:
+    """Submit proving jobs to the zk_engine.
+
+    If the prover service (`cargo run --release -- serve`) is listening on `socket_path`, jobs are sent to it and
+    proven with the keys it holds in memory. Otherwise, the client falls back to writing `prove.toml` and running
+    `cargo run --release -- <ENGINE> prove`, which reloads the keys for every proof and runs one job at a time.
+    """
+
+    def __init__(self, socket_path: Path = PROVER_SOCKET_PATH):
+        self.socket_path = socket_path
+
+    def __connect(self) -> socket.socket:
+        """Connect to the prover service. Raise `FileNotFoundError` or `ConnectionRefusedError` if it is not running."""
+        connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            connection.connect(str(self.socket_path))
+        except OSError:
+            connection.close()
+            raise
+        return connection
+
+    def is_running(self) -> bool:
+        """Check whether the prover service is accepting connections."""
+        try:
+            self.__connect().close()
+            return True
+        except (FileNotFoundError, ConnectionRefusedError):
+            return False
+
+    def max_concurrent_jobs(self, requested: int) -> int:
+        """Return the number of jobs worth submitting at the same time: `requested` if the service is running, 1
+        otherwise, as the fallback proves one job at a time."""
+        return requested if self.is_running() else 1
+
+    def prove(self, engine: str, data: dict):
+        """Generate a proof with `engine` ("tcp" or "pob") for `data`, which has the structure of `prove.toml`."""
+        # The job goes over the first connection: there is no separate probe for the service
+        try:
+            connection = self.__connect()
+        except (FileNotFoundError, ConnectionRefusedError):
+            self.__prove_with_cargo(engine, data)
+            return
+        with connection:
+            self.__prove_with_service(connection, engine, data)
+
+        return
+
+    def prove_tcp(self, data: dict):
+        self.prove("tcp", data)
+
+    def prove_pob(self, data: dict):
+        self.prove("pob", data)
+
+    def __prove_with_service(self, connection: socket.socket, engine: str, data: dict):
+        connection.sendall((json.dumps({"engine": engine, "data": data}) + "\n").encode())
+        with connection.makefile("r") as responses:
+            response = json.loads(responses.readline())
+
+        assert response["ok"], f"Error generating {engine} proof: {response['error']}"
+
+        return
+
+    def __prove_with_cargo(self, engine: str, data: dict):
+        with _CARGO_LOCK:
+            # Write data
+            with open(PROVE_CONFIG_PATHS[engine], "w") as f:
+                toml.dump(data, f)
+            # Generate proof
+            subprocess.run(
+                f"cd {ZK_ENGINE_PATH} && {PROVE_COMMANDS[engine]}",
+                shell=True,
+                check=True,
+                text=True,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE
+            )
+
+        return
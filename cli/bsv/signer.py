@@ -0,0 +1,133 @@
+"""Transaction signing with keys prepared once per wallet."""
+import hashlib
+
+import ecdsa
+from ecdsa.rfc6979 import generate_k
+from tx_engine import SIGHASH, Script, Tx, Wallet, hash256d
+
+from bsv.cache import LRUCache
+
+GENERATOR = ecdsa.SECP256k1.generator
+GROUP_ORDER = ecdsa.SECP256k1.order
+
+# Length of a signature, DER encoding plus sighash flag
+SIG_LEN = 0x48
+# DER signatures of 71 bytes (72 with the sighash flag) need a 33-byte r and a 32-byte s
+MIN_HIGH_R = 2**255
+MIN_S = 2**248
+
+
+class Signer:
+    """ECDSA signer for the key of a `Wallet`.
+
+    The private and public keys are extracted once, and nonces are derived deterministically as in RFC6979, so signing
+    does not rebuild key objects nor depend on a random number generator. Signatures are ground to a fixed length of
+    `SIG_LEN` bytes: nonces are drawn (with an increasing extra entropy) until r needs 33 bytes, which only costs a
+    point multiplication per attempt, and s is normalised to low-S.
+    """
+
+    def __init__(self, wallet: Wallet):
+        self.wallet = wallet
+        self.private_key = wallet.to_int()
+        self.public_key = bytes.fromhex(wallet.get_public_key_as_hexstr())
+
+    def sign_digest(self, digest: bytes, flag: SIGHASH = SIGHASH.ALL_FORKID) -> bytes:
+        """Sign the 32-byte `digest`, returning the DER signature followed by `flag`."""
+        z = int.from_bytes(digest)
+        counter = 0
+        while True:
+            extra_entropy = counter.to_bytes(32, "little") if counter else b""
+            k = generate_k(GROUP_ORDER, self.private_key, hashlib.sha256, digest, extra_entropy=extra_entropy)
+            counter += 1
+            r = (GENERATOR * k).x() % GROUP_ORDER
+            if r < MIN_HIGH_R:
+                continue
+            s = pow(k, -1, GROUP_ORDER) * (z + r * self.private_key) % GROUP_ORDER
+            s = min(s, GROUP_ORDER - s)
+            if s < MIN_S:
+                continue
+            return ecdsa.util.sigencode_der(r, s, GROUP_ORDER) + flag.to_bytes()
+
+    def sign(self, prev_tx: Tx, tx: Tx, index: int, flag: SIGHASH = SIGHASH.ALL_FORKID) -> bytes:
+        """Sign `tx.tx_ins[index]`, which spends an output of `prev_tx`."""
+        return SigningContext(tx).sign_inputs([prev_tx], [index], [self.wallet], flag)[0]
+
+
+class SigningContext:
+    """Sighashes of the inputs of `tx`, computed as in BIP143 (FORKID).
+
+    The hashes of the outpoints, of the sequences and of the outputs are shared by all the inputs, so they are computed
+    once per transaction rather than once per input. FORKID sighashes do not commit to unlocking scripts, so the
+    context stays valid while the unlocking scripts of `tx` are filled in.
+    """
+
+    def __init__(self, tx: Tx):
+        tx_ins = tx.tx_ins
+        self.version = tx.version.to_bytes(4, "little")
+        self.locktime = tx.locktime.to_bytes(4, "little")
+        self.outpoints = [bytes.fromhex(tx_in.prev_tx)[::-1] + tx_in.prev_index.to_bytes(4, "little") for tx_in in tx_ins]
+        self.prev_indices = [tx_in.prev_index for tx_in in tx_ins]
+        self.sequences = [tx_in.sequence.to_bytes(4, "little") for tx_in in tx_ins]
+        self.outputs = [tx_out.amount.to_bytes(8, "little") + tx_out.script_pubkey.serialize() for tx_out in tx.tx_outs]
+        self.hash_prevouts = hash256d(b"".join(self.outpoints))
+        self.hash_sequence = hash256d(b"".join(self.sequences))
+        self.hash_outputs = hash256d(b"".join(self.outputs))
+
+    def sig_hash(self, index: int, prev_locking_script: Script, prev_amount: int, flag: SIGHASH = SIGHASH.ALL_FORKID) -> bytes:
+        """Return the sighash of the input at position `index`, which spends `prev_amount` locked by `prev_locking_script`."""
+        assert flag & SIGHASH.FORKID and not flag & SIGHASH.CHRONICLE, f"Unsupported sighash flag {flag}"
+        base_flag = flag & 0x1f
+        anyone_can_pay = flag & SIGHASH.ANYONECANPAY
+        hash_prevouts = bytes(32) if anyone_can_pay else self.hash_prevouts
+        hash_sequence = bytes(32) if anyone_can_pay or base_flag in (SIGHASH.NONE, SIGHASH.SINGLE) else self.hash_sequence
+        if base_flag not in (SIGHASH.NONE, SIGHASH.SINGLE):
+            hash_outputs = self.hash_outputs
+        elif base_flag == SIGHASH.SINGLE and index < len(self.outputs):
+            hash_outputs = hash256d(self.outputs[index])
+        else:
+            hash_outputs = bytes(32)
+
+        preimage = b"".join([
+            self.version,
+            hash_prevouts,
+            hash_sequence,
+            self.outpoints[index],
+            prev_locking_script.serialize(),
+            prev_amount.to_bytes(8, "little"),
+            self.sequences[index],
+            hash_outputs,
+            self.locktime,
+            int(flag).to_bytes(4, "little"),
+        ])
+        return hash256d(preimage)
+
+    def sign_inputs(
+        self, prev_txs: list[Tx], indices: list[int], wallets: list[Wallet], flag: SIGHASH = SIGHASH.ALL_FORKID
+    ) -> list[bytes]:
+        """Sign the inputs `indices`, which spend outputs of `prev_txs`, with the keys of `wallets`."""
+        sigs = []
+        for (prev_tx, index, wallet) in zip(prev_txs, indices, wallets):
+            prev_output = prev_tx.tx_outs[self.prev_indices[index]]
+            digest = self.sig_hash(index, prev_output.script_pubkey, prev_output.amount, flag)
+            sigs.append(get_signer(wallet).sign_digest(digest, flag))
+        return sigs
+
+
+_signers = LRUCache(64)
+
+
+def get_signer(wallet: Wallet) -> Signer:
+    """Return the signer of `wallet`, creating it on first use."""
+    key = wallet.get_public_key_as_hexstr()
+    signer = _signers.get(key)
+    if signer is None:
+        signer = Signer(wallet)
+        _signers.put(key, signer)
+    return signer
+
+
+def sign_inputs(
+    prev_txs: list[Tx], tx: Tx, indices: list[int], wallets: list[Wallet], flag: SIGHASH = SIGHASH.ALL_FORKID
+) -> list[bytes]:
+    """Sign the inputs `indices` of `tx`, which spend outputs of `prev_txs`, with the keys of `wallets`."""
+    return SigningContext(tx).sign_inputs(prev_txs, indices, wallets, flag)
@@ -0,0 +1,93 @@
+"""Registry of the tokens held by the users of a wallet, indexed by genesis txid, current token outpoint and owner."""
+
+
+class TokenRecord:
+    """A token: the outpoint of its genesis, the outpoint currently holding it, its pegout UTXO (None until it is
+    generated), the path of its latest zk proof, and the index of its owner in the wallet."""
+
+    __slots__ = ("genesis", "token", "pegout", "zk_proof_path", "owner")
+
+    def __init__(self, genesis, token, pegout, zk_proof_path: str, owner: int):
+        self.genesis = genesis
+        self.token = token
+        self.pegout = pegout
+        self.zk_proof_path = zk_proof_path
+        self.owner = owner
+
+    @property
+    def token_id(self) -> str:
+        """The id of the token, i.e., its genesis txid."""
+        return self.genesis.prev_tx
+
+    def __repr__(self):
+        return f"Token {self.token_id}: token: {self.token}, pegout: {self.pegout}, owner: {self.owner}"
+
+
+def _outpoint_key(outpoint) -> tuple[str, int]:
+    return (outpoint.prev_tx, outpoint.prev_index)
+
+
+class TokenRegistry:
+    """Token records with O(1) lookup by genesis txid, by current token outpoint and by owner.
+
+    The genesis output of a token is always output 0 of its genesis transaction, so the genesis txid identifies the
+    token. The records of an owner are kept in the order they were received.
+    """
+
+    def __init__(self):
+        self.by_genesis = {}
+        self.by_token = {}
+        self.by_owner = {}
+
+    def __len__(self):
+        return len(self.by_genesis)
+
+    def __contains__(self, token_id: str):
+        return token_id in self.by_genesis
+
+    def add(self, record: TokenRecord) -> TokenRecord:
+        """Add `record` to the registry."""
+        assert record.token_id not in self.by_genesis, f"Token {record.token_id} already in the registry"
+        self.by_genesis[record.token_id] = record
+        self.by_token[_outpoint_key(record.token)] = record
+        self.by_owner.setdefault(record.owner, {})[record.token_id] = record
+        return record
+
+    def get(self, token_id: str) -> TokenRecord:
+        """Return the record of the token with genesis txid `token_id`."""
+        record = self.by_genesis.get(token_id)
+        assert record is not None, f"Unknown token {token_id}"
+        return record
+
+    def find_by_token(self, outpoint) -> TokenRecord | None:
+        """Return the record of the token currently held at `outpoint`, if any."""
+        return self.by_token.get(_outpoint_key(outpoint))
+
+    def owned_by(self, owner: int) -> list[TokenRecord]:
+        """Return the records of the tokens of `owner`, in the order they were received."""
+        return list(self.by_owner.get(owner, {}).values())
+
+    def resolve(self, owner: int, token_id: str) -> TokenRecord:
+        """Return the record of the token `token_id`, checking that it is owned by `owner`."""
+        record = self.get(token_id)
+        assert record.owner == owner, f"Token {token_id} is not owned by user {owner}"
+        return record
+
+    def move(self, token_id: str, token, owner: int) -> TokenRecord:
+        """Record that the token `token_id` is now held at the outpoint `token` by `owner`."""
+        record = self.get(token_id)
+        del self.by_token[_outpoint_key(record.token)]
+        del self.by_owner[record.owner][token_id]
+        record.token = token
+        record.owner = owner
+        self.by_token[_outpoint_key(token)] = record
+        self.by_owner.setdefault(owner, {})[token_id] = record
+        return record
+
+    def remove(self, token_id: str) -> TokenRecord:
+        """Remove the token `token_id` from the registry and return its record."""
+        record = self.by_genesis.pop(token_id, None)
+        assert record is not None, f"Unknown token {token_id}"
+        del self.by_token[_outpoint_key(record.token)]
+        del self.by_owner[record.owner][token_id]
+        return record
@@ -0,0 +1,73 @@
+"""Streaming serialisation of transactions."""
+from tx_engine import TxOut, hash256d
+
+
+def _varint(n: int) -> bytes:
+    if n < 0xfd:
+        return n.to_bytes(1, "little")
+    if n <= 0xffff:
+        return b"\xfd" + n.to_bytes(2, "little")
+    if n <= 0xffffffff:
+        return b"\xfe" + n.to_bytes(4, "little")
+    return b"\xff" + n.to_bytes(8, "little")
+
+
+class TxBuffer:
+    """Serialisation of a transaction, written once into a buffer preallocated to its exact size.
+
+    Broadcasting, hashing and storing the transaction all read the same buffer, so large transactions (e.g., the
+    burning transaction, whose unlocking script is ~300KB) are not serialised again for each of them.
+    """
+
+    def __init__(self, size: int):
+        self.buffer = bytearray(size)
+        self.__view = memoryview(self.buffer)
+        self.__offset = 0
+
+    def write(self, data: bytes):
+        self.__view[self.__offset:self.__offset + len(data)] = data
+        self.__offset += len(data)
+
+        return
+
+    @staticmethod
+    def serialise(
+        version: int,
+        inputs: list[tuple[str, int, bytes, int]],
+        outputs: list[TxOut],
+        locktime: int,
+    ) -> "TxBuffer":
+        """Serialise the transaction with `inputs`, given as (prev txid, prev index, unlocking script, sequence) with
+        the unlocking scripts as raw bytes, and `outputs`."""
+        output_scripts = [output.script_pubkey.raw_serialize() for output in outputs]
+        size = 4 + len(_varint(len(inputs))) + len(_varint(len(outputs))) + 4
+        size += sum(36 + len(_varint(len(script))) + len(script) + 4 for (_, _, script, _) in inputs)
+        size += sum(8 + len(_varint(len(script))) + len(script) for script in output_scripts)
+
+        tx_buffer = TxBuffer(size)
+        tx_buffer.write(version.to_bytes(4, "little"))
+        tx_buffer.write(_varint(len(inputs)))
+        for (prev_txid, prev_index, script, sequence) in inputs:
+            tx_buffer.write(bytes.fromhex(prev_txid)[::-1])
+            tx_buffer.write(prev_index.to_bytes(4, "little"))
+            tx_buffer.write(_varint(len(script)))
+            tx_buffer.write(script)
+            tx_buffer.write(sequence.to_bytes(4, "little"))
+        tx_buffer.write(_varint(len(outputs)))
+        for (output, script) in zip(outputs, output_scripts):
+            tx_buffer.write(output.amount.to_bytes(8, "little"))
+            tx_buffer.write(_varint(len(script)))
+            tx_buffer.write(script)
+        tx_buffer.write(locktime.to_bytes(4, "little"))
+        assert tx_buffer.__offset == size, "Transaction size mismatch"
+
+        return tx_buffer
+
+    def __len__(self) -> int:
+        return len(self.buffer)
+
+    def txid(self) -> str:
+        return hash256d(bytes(self.buffer))[::-1].hex()
+
+    def hex(self) -> str:
+        return self.buffer.hex()
@@ -0,0 +1,100 @@
+"""Store of transactions keyed by txid, shared by all the commands of the cli."""
+from pathlib import Path
+
+from tx_engine import Tx, hash256d
+from tx_engine.interface.blockchain_interface import BlockchainInterface
+
+from bsv.cache import DiskCache, LRUCache
+from bsv.network import get_raw_transactions
+
+TX_CACHE_PATH = Path(__file__).parent.parent / "tx_cache"
+
+
+def txid_from_bytes(raw_tx: bytes) -> str:
+    """Compute the txid of the serialised transaction `raw_tx`."""
+    return hash256d(raw_tx)[::-1].hex()
+
+
+class TxStore:
+    """Parsed transactions in an in-memory LRU, in front of a content-addressed directory of raw transactions.
+
+    A txid commits to the whole serialisation of a transaction, so an entry can never go stale: raw transactions are
+    checked against their txid before being stored, and are kept forever.
+    """
+
+    def __init__(self, path: Path = TX_CACHE_PATH, max_size: int = 256):
+        self.memory = LRUCache(max_size)
+        self.disk = DiskCache(path)
+
+    def get(self, txid: str) -> Tx | None:
+        """Return the transaction `txid` if it is in the store."""
+        tx = self.memory.get(txid)
+        if tx is not None:
+            return tx
+        raw_tx = self.disk.get(txid)
+        if raw_tx is None:
+            return None
+        tx = Tx.parse(raw_tx)
+        self.memory.put(txid, tx)
+        return tx
+
+    def get_raw(self, txid: str) -> bytes | None:
+        """Return the serialisation of the transaction `txid` if it is in the store, without parsing it."""
+        return self.disk.get(txid)
+
+    def fetch_raw(self, txid: str, network: BlockchainInterface) -> bytes:
+        """Return the serialisation of the transaction `txid`, retrieving it from `network` if it is not in the store."""
+        raw_tx = self.get_raw(txid)
+        if raw_tx is None:
+            raw_tx = bytes.fromhex(network.get_raw_transaction(txid))
+            self.put_raw(raw_tx, txid)
+        return raw_tx
+
+    def put(self, tx: Tx) -> str:
+        """Add `tx` to the store and return its txid."""
+        txid = tx.id()
+        self.memory.put(txid, tx)
+        self.disk.put(txid, tx.serialize())
+        return txid
+
+    def put_raw(self, raw_tx: bytes, txid: str | None = None) -> str:
+        """Add the serialised transaction `raw_tx` to the store and return its txid."""
+        computed_txid = txid_from_bytes(raw_tx)
+        assert txid is None or txid == computed_txid, f"Transaction does not match txid {txid}"
+        self.disk.put(computed_txid, raw_tx)
+        return computed_txid
+
+    def fetch(self, txid: str, network: BlockchainInterface) -> Tx:
+        """Return the transaction `txid`, retrieving it from `network` if it is not in the store."""
+        tx = self.get(txid)
+        if tx is not None:
+            return tx
+        raw_tx = bytes.fromhex(network.get_raw_transaction(txid))
+        self.put_raw(raw_tx, txid)
+        tx = Tx.parse(raw_tx)
+        self.memory.put(txid, tx)
+        return tx
+
+    def fetch_many(self, txids: list[str], network: BlockchainInterface) -> list[Tx]:
+        """Return the transactions `txids`, retrieving those that are not in the store from `network` in bulk."""
+        txs = {txid: self.get(txid) for txid in dict.fromkeys(txids)}
+        missing = [txid for (txid, tx) in txs.items() if tx is None]
+        for (txid, raw_tx) in get_raw_transactions(missing, network).items():
+            raw_tx = bytes.fromhex(raw_tx)
+            self.put_raw(raw_tx, txid)
+            txs[txid] = Tx.parse(raw_tx)
+            self.memory.put(txid, txs[txid])
+        for txid in missing:
+            assert txs[txid] is not None, f"Transaction {txid} not found"
+        return [txs[txid] for txid in txids]
+
+
+_tx_store = None
+
+
+def get_tx_store() -> TxStore:
+    """Return the transaction store shared by the whole process."""
+    global _tx_store
+    if _tx_store is None:
+        _tx_store = TxStore()
+    return _tx_store
@@ -1,19 +1,23 @@
 """Utilies to facilitate interaction with the blockchain."""
-from random import randint
-
-import ecdsa
-from tx_engine import SIGHASH, Script, Tx, TxIn, TxOut, Wallet, sig_hash
+from tx_engine import SIGHASH, Script, Tx, TxIn, TxOut, Wallet
 from tx_engine.interface.blockchain_interface import BlockchainInterface
-from tx_engine.interface.interface_factory import InterfaceFactory
 
-GROUP_ORDER = ecdsa.curves.SECP256k1.order
+from bsv.network import PooledRPCInterface, PooledWoCInterface, broadcast_raw_transactions
+from bsv.signer import SIG_LEN, get_signer, sign_inputs
+from bsv.tx_buffer import TxBuffer
+from bsv.tx_store import get_tx_store
+
+PUBLIC_KEY_LEN = 33
+# Unlocking scripts once signed: <sig> for P2PK, <sig> <public key> for P2PKH
+P2PK_UNLOCKING_SCRIPT_LEN = 1 + SIG_LEN
+P2PKH_UNLOCKING_SCRIPT_LEN = 1 + SIG_LEN + 1 + PUBLIC_KEY_LEN
 
-SIG_LEN = 0x48
 
 def setup_network_connection(network):
-    """Setup network connection."""
+    """Setup network connection. The returned interface sends its requests through the shared pooled session."""
     if network == "regtest":
-        return InterfaceFactory().set_config({
+        interface = PooledRPCInterface()
+        interface.set_config({
             'interface_type': "rpc",
             'user': 'bitcoin',
             'password': 'bitcoin',
@@ -21,7 +25,10 @@ def setup_network_connection(network):
             'address': 'localhost:18332',
             'broadcast_tx': True}
         )
-    return InterfaceFactory().set_config({"interface_type": "woc", "network_type": network})
+        return interface
+    interface = PooledWoCInterface()
+    interface.set_config({"interface_type": "woc", "network_type": network})
+    return interface
 
 
 def tx_to_input(tx: Tx, index: int, unlocking_script: Script, sequence=0) -> TxIn:
@@ -29,27 +36,46 @@ def tx_to_input(tx: Tx, index: int, unlocking_script: Script, sequence=0) -> TxI
     return TxIn(prev_tx=tx.id(), prev_index=index, script=unlocking_script, sequence=sequence)
 
 
-def update_tx_balance(
-    tx: Tx,
+def varint_len(n: int) -> int:
+    """Length of the varint encoding of `n`."""
+    if n < 0xfd:
+        return 1
+    if n <= 0xffff:
+        return 3
+    if n <= 0xffffffff:
+        return 5
+    return 9
+
+
+def estimate_tx_size(unlocking_script_lens: list[int], outputs: list[TxOut]) -> int:
+    """Serialised size of a transaction with inputs whose unlocking scripts are `unlocking_script_lens` bytes long and
+    with `outputs`, computed from the lengths of its components."""
+    size = 4 + varint_len(len(unlocking_script_lens)) + varint_len(len(outputs)) + 4
+    for script_len in unlocking_script_lens:
+        # Outpoint, script, sequence
+        size += 36 + varint_len(script_len) + script_len + 4
+    for output in outputs:
+        script_len = len(output.script_pubkey.raw_serialize())
+        size += 8 + varint_len(script_len) + script_len
+    return size
+
+
+def pay_fee(
+    outputs: list[TxOut],
     index: int,
     fee_rate: int,  # Quoted in satoshis / kB
-) -> Tx:
-    """Update the amount of tx.tx_outs[index] according to the fee rate."""
-    tx_size = len(tx.serialize())
-    fee = (tx_size * fee_rate // 1024)
-
-    assert tx.tx_outs[index].amount > fee, f"Not enough funds. Fee: {fee}, amount: {tx.tx_outs[index].amount}"
-
-    new_tx_outs = []
-    for i, output in enumerate(tx.tx_outs):
-        new_tx_outs.append(
-            TxOut(
-                amount=output.amount - fee * (i == index),
-                script_pubkey=output.script_pubkey,
-            )
-        )
+    unlocking_script_lens: list[int],
+) -> list[TxOut]:
+    """Deduct from outputs[index] the fee of a transaction with `outputs` and inputs whose final unlocking scripts are
+    `unlocking_script_lens` bytes long."""
+    fee = estimate_tx_size(unlocking_script_lens, outputs) * fee_rate // 1024
 
-    return Tx(version=tx.version, tx_ins=tx.tx_ins, tx_outs=new_tx_outs, locktime=tx.locktime)
+    assert outputs[index].amount > fee, f"Not enough funds. Fee: {fee}, amount: {outputs[index].amount}"
+
+    return [
+        output if i != index else TxOut(amount=output.amount - fee, script_pubkey=output.script_pubkey)
+        for (i, output) in enumerate(outputs)
+    ]
 
 
 def bytes_to_script(data: list[bytes]):
@@ -67,9 +93,7 @@ def prepend_signature(
     flag: SIGHASH = SIGHASH.ALL_FORKID,
 ) -> Tx:
     """Prepend signature to a the input at position `index` in `tx`."""
-    sig = sign_tx_with_random_k(prev_tx, tx, index, public_key, flag)
-    while len(sig) != SIG_LEN:
-        sig = sign_tx_with_random_k(prev_tx, tx, index, public_key, flag)
+    sig = get_signer(public_key).sign(prev_tx, tx, index, flag)
     new_tx_ins = []
     for i, txin in enumerate(tx.tx_ins):
         new_tx_ins.append(
@@ -84,6 +108,22 @@ def prepend_signature(
     return Tx(version=tx.version, tx_ins=new_tx_ins, tx_outs=tx.tx_outs, locktime=tx.locktime)
 
 
+def prepend_signatures(tx: Tx, sigs: list[bytes]) -> Tx:
+    """Prepend `sigs[i]` to the unlocking script of the input at position `i` in `tx`."""
+    new_tx_ins = []
+    for i, txin in enumerate(tx.tx_ins):
+        new_tx_ins.append(
+            TxIn(
+                prev_tx=txin.prev_tx,
+                prev_index=txin.prev_index,
+                script=bytes_to_script(sigs[i]) + txin.script_sig if i < len(sigs) else txin.script_sig,
+                sequence=txin.sequence,
+            )
+        )
+
+    return Tx(version=tx.version, tx_ins=new_tx_ins, tx_outs=tx.tx_outs, locktime=tx.locktime)
+
+
 def spend_utxo(
     tx: Tx,
     index: int,
@@ -97,15 +137,10 @@ def spend_utxo(
 
     NOTE: It requires knowledge of the unlocking script needed to spend tx.tx_outs[index].
     """
+    outputs = pay_fee(outputs, index_output, fee_rate, [len(unlocking_script.raw_serialize())])
     spending_tx = Tx(version=1, tx_ins=[tx_to_input(tx, index, unlocking_script)], tx_outs=outputs, locktime=0)
 
-    spending_tx = update_tx_balance(
-        spending_tx,
-        index_output,
-        fee_rate,
-    )
-
-    return spending_tx, network.broadcast_tx(spending_tx.serialize().hex())
+    return spending_tx, broadcast_tx(spending_tx, network)
 
 
 def spend_p2pk(
@@ -130,24 +165,38 @@ def spend_p2pk(
         network (BlockchainInterface): The connection to the blockchain.
         flag (SIGHASH): The sighash flag used to create the signatures. Defaults to `SIGHASH.ALL_FORKID`.
     """
+    outputs = pay_fee(outputs, index_output, fee_rate, [P2PK_UNLOCKING_SCRIPT_LEN] * len(txs))
     inputs = [tx_to_input(tx, index, Script()) for (index, tx) in zip(indices, txs)]
     spending_tx = Tx(version=1, tx_ins=inputs, tx_outs=outputs, locktime=0)
-    spending_tx = update_tx_balance(
-        tx=spending_tx,
-        index=index_output,
-        fee_rate=fee_rate,
-    )
-
-    for i, (tx, pub_key) in enumerate(zip(txs, public_keys)):
-        spending_tx = prepend_signature(
-            prev_tx=tx,
-            tx=spending_tx,
-            index=i,
-            public_key=pub_key,
-            flag=flag,
-        )
 
-    return spending_tx, network.broadcast_tx(spending_tx.serialize().hex())
+    # FORKID signatures do not commit to the unlocking scripts, so all the inputs are signed against the same tx
+    sigs = sign_inputs(txs, spending_tx, list(range(len(txs))), public_keys, flag)
+    spending_tx = prepend_signatures(spending_tx, sigs)
+
+    return spending_tx, broadcast_tx(spending_tx, network)
+
+
+def sign_p2pkh(
+    txs: list[Tx],
+    indices: list[int],
+    outputs: list[TxOut],
+    index_output: int,
+    public_keys: list[Wallet],
+    fee_rate: int,
+    flag: SIGHASH = SIGHASH.ALL_FORKID,
+) -> Tx:
+    """Build and sign the transaction spending a list of P2PKH UTXOs, without broadcasting it. The arguments are as in
+    `spend_p2pkh`."""
+    inputs = [
+        tx_to_input(tx, index, bytes_to_script(bytes.fromhex(pub_key.get_public_key_as_hexstr())))
+        for (index, tx, pub_key) in zip(indices, txs, public_keys)
+    ]
+    outputs = pay_fee(outputs, index_output, fee_rate, [P2PKH_UNLOCKING_SCRIPT_LEN] * len(txs))
+    spending_tx = Tx(version=1, tx_ins=inputs, tx_outs=outputs, locktime=0)
+
+    # FORKID signatures do not commit to the unlocking scripts, so all the inputs are signed against the same tx
+    sigs = sign_inputs(txs, spending_tx, list(range(len(txs))), public_keys, flag)
+    return prepend_signatures(spending_tx, sigs)
 
 
 def spend_p2pkh(
@@ -172,27 +221,9 @@ def spend_p2pkh(
         network (BlockchainInterface): The connection to the blockchain.
         flag (SIGHASH): The sighash flag used to create the signatures. Defaults to `SIGHASH.ALL_FORKID`.
     """
-    inputs = [
-        tx_to_input(tx, index, bytes_to_script(bytes.fromhex(pub_key.get_public_key_as_hexstr())))
-        for (index, tx, pub_key) in zip(indices, txs, public_keys)
-    ]
-    spending_tx = Tx(version=1, tx_ins=inputs, tx_outs=outputs, locktime=0)
-    spending_tx = update_tx_balance(
-        spending_tx,
-        index_output,
-        fee_rate,
-    )
-
-    for i, (tx, pub_key) in enumerate(zip(txs, public_keys)):
-        spending_tx = prepend_signature(
-            prev_tx=tx,
-            tx=spending_tx,
-            index=i,
-            public_key=pub_key,
-            flag=flag,
-        )
+    spending_tx = sign_p2pkh(txs, indices, outputs, index_output, public_keys, fee_rate, flag)
 
-    return spending_tx, network.broadcast_tx(spending_tx.serialize().hex())
+    return spending_tx, broadcast_tx(spending_tx, network)
 
 
 def p2pk_script(public_key: Wallet) -> Script:
@@ -220,33 +251,42 @@ def p2pkh(public_key: Wallet, amount: int, data_payload: None | bytes = None) ->
 
 
 def tx_from_id(txid: str, network: BlockchainInterface) -> Tx:
-    """Retrieve `txid` from the Blockchain and convert it to an instance of `Tx`."""
-    return Tx.parse_hexstr(network.get_raw_transaction(txid))
+    """Retrieve `txid` from the transaction store, or from the Blockchain if it is not stored yet."""
+    return get_tx_store().fetch(txid, network)
 
 
-def sign_tx_with_random_k(
-    prev_tx: Tx, tx: Tx, index: int, public_key: Wallet, flag: SIGHASH = SIGHASH.ALL_FORKID
-) -> list[bytes]:
-    """Sign `tx.tx_ins[index]` with a random ephemeral key.
+def raw_tx_from_id(txid: str, network: BlockchainInterface) -> bytes:
+    """Retrieve the serialisation of `txid` from the transaction store, or from the Blockchain if it is not stored yet."""
+    return get_tx_store().fetch_raw(txid, network)
 
-    Args:
-        prev_tx (Tx): The transaction generating the output being spent by `tx.tx_ins[index]`.
-        tx (Tx): The transaction to be signed.
-        index (int): The index of the input of `tx` to be signed.
-        public_key (Wallet): The key required to sign `tx.tx_ins[index]`.
-        flag (SIGHASH): The sighash flag used to sign `tx.tx_ins[index]`. Defaults to `SIGHASH.ALL_FORKID`.
-    """
-    # Convert private key
-    priv_key_int = public_key.to_int()
-    generator = ecdsa.SECP256k1.generator
-    pub_key = ecdsa.ecdsa.Public_key(generator, generator * priv_key_int)
-    priv_key = ecdsa.ecdsa.Private_key(pub_key, priv_key_int)
-    # Generate sighash
-    prev_locking_script = prev_tx.tx_outs[tx.tx_ins[index].prev_index].script_pubkey
-    prev_amount = prev_tx.tx_outs[tx.tx_ins[index].prev_index].amount
-    msg = int.from_bytes(sig_hash(tx, index, prev_locking_script, prev_amount, sighash_flags=flag))
-    # Generate signature
-    random_k = randint(2, GROUP_ORDER - 1)  # noqa: S311
-    sig = priv_key.sign(msg, random_k)
-    der = ecdsa.util.sigencode_der_canonize(sig.r, sig.s, GROUP_ORDER)
-    return der + flag.to_bytes()
+
+def txs_from_ids(txids: list[str], network: BlockchainInterface) -> list[Tx]:
+    """Retrieve `txids` from the transaction store, fetching the ones that are not stored yet in bulk."""
+    return get_tx_store().fetch_many(txids, network)
+
+
+def broadcast_raw_tx(tx_buffer: TxBuffer, network: BlockchainInterface):
+    """Broadcast the serialised transaction in `tx_buffer` and, if the broadcast succeeds, add it to the transaction
+    store."""
+    response = network.broadcast_tx(tx_buffer.hex())
+    if response is not None and response.status_code == 200:
+        get_tx_store().put_raw(bytes(tx_buffer.buffer), tx_buffer.txid())
+    return response
+
+
+def broadcast_txs(txs: list[Tx], network: BlockchainInterface) -> list:
+    """Broadcast `txs` in order, in as few round trips as possible, and add those that are accepted to the transaction
+    store. Return the response of each broadcast."""
+    responses = broadcast_raw_transactions([tx.serialize().hex() for tx in txs], network)
+    for (tx, response) in zip(txs, responses):
+        if response is not None and response.status_code == 200:
+            get_tx_store().put(tx)
+    return responses
+
+
+def broadcast_tx(tx: Tx, network: BlockchainInterface):
+    """Broadcast `tx` and, if the broadcast succeeds, add it to the transaction store."""
+    response = network.broadcast_tx(tx.serialize().hex())
+    if response is not None and response.status_code == 200:
+        get_tx_store().put(tx)
+    return response
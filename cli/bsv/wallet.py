@@ -1,14 +1,24 @@
 
 import sys
 import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from pathlib import Path
-import subprocess
-import toml
+import sqlite3
+import threading
 
 sys.path.append(str(Path(__file__).parent.parent.parent / "zkscript_package"))
 
-from bsv.utils import bytes_to_script, prepend_signature, tx_to_input, tx_from_id, p2pkh, spend_p2pkh, p2pkh
-from bsv.zk_utils import load_and_process_vk, generate_pob_utxo
+from bsv.funding_pool import LOW_WATER_MARK, FundingPool
+from bsv.utils import P2PKH_UNLOCKING_SCRIPT_LEN, broadcast_raw_tx, broadcast_txs, bytes_to_script, estimate_tx_size, sign_p2pkh, tx_to_input, tx_from_id, txs_from_ids, p2pkh, spend_p2pkh, p2pkh
+from bsv.zk_utils import load_and_process_vk, generate_pob_utxo_for_genesis
+from bsv.prover_client import ProverClient
+from bsv.signer import SigningContext
+from bsv.token_registry import TokenRecord, TokenRegistry
+from bsv.tx_buffer import TxBuffer
+from bsv.wallet_lock import WalletLocks, get_wallet_locks
+from bsv.wallet_store import WalletStore, is_wallet_store
 
 from elliptic_curves.instantiations.mnt4_753.mnt4_753 import MNT4_753, ProofMnt4753
 from src.zkscript.groth16.mnt4_753.mnt4_753 import mnt4_753
@@ -20,19 +30,14 @@ from tx_engine.interface.interface_factory import WoCInterface, RPCInterface
 ScalarFieldMNT4 = MNT4_753.scalar_field
 
 
-SETUP_INDEX = -1 # Funding index for setup
-BURNING_FUNDING_INDEX = -2 # Funding index for burning is second to last
 BALLPARK_TRANSACTION_SIZE = 300
 BALLPARK_TRANSACTION_FEE = BALLPARK_TRANSACTION_SIZE * 50 // 1000 # 50 satoshis per kB
+# Proofs generated at the same time by `transfer_tokens`
+MAX_CONCURRENT_PROOFS = 4
 BALLPARK_BURNING_TX_SIZE = 300000
 BALLPARK_BURNING_TX_FEE = BALLPARK_BURNING_TX_SIZE * 50 // 1000 # 50 satoshis per kB
-TRANSFER_ZK_PROOF = "cargo run --release -- tcp-engine prove"
-BURNING_ZK_PROOF = "cargo run --release -- pob-engine prove"
-
-"""
-The structure of the WalletManager assumes that genesis & pegout are added in order. So, if genesis_1 and genesis_2 are created,
-then pegout_1 and pegout_2 must be added in this order. If not, the structure will be messed up.
-"""
+# Transfers and burns spend a whole funding UTXO as fee: the pool keeps outputs of these denominations for them
+FUNDING_DENOMINATIONS = (BALLPARK_TRANSACTION_FEE, BALLPARK_BURNING_TX_FEE)
 
 class Outpoint:
 
@@ -80,10 +85,7 @@ class WalletManager:
             names: list[str],
             bsv_wallets: list[Wallet],
             sui_addresses: list[bytes],
-            genesis_utxos: list[list[Outpoint]],
-            token_utxos: list[list[Outpoint]],
-            pegout_utxos: list[list[Outpoint]],
-            zk_proof_paths: list[str],
+            tokens: TokenRegistry,
             funding_utxos: list[list[Outpoint]],
             burnt_tokens: list[BurntToken],
             network: BlockchainInterface,
@@ -91,13 +93,15 @@ class WalletManager:
         self.names = names
         self.bsv_wallets = bsv_wallets
         self.sui_addresses = sui_addresses
-        self.genesis_utxos = genesis_utxos
-        self.token_utxos = token_utxos
-        self.pegout_utxos = pegout_utxos
-        self.zk_proof_paths = zk_proof_paths
+        self.tokens = tokens
         self.funding_utxos = funding_utxos
         self.burnt_tokens = burnt_tokens
         self.network = network
+        self.prover = ProverClient()
+        self.wallet_path = None
+        self.store = None
+        self.pool = None
+        self.sync_lock = threading.RLock()
 
 
     def clear_wallet(self):
@@ -105,24 +109,21 @@ class WalletManager:
             names = self.names,
             bsv_wallets=self.bsv_wallets,
             sui_addresses=self.sui_addresses,
-            genesis_utxos=[[]] * len(self.bsv_wallets),
-            token_utxos=[[]] * len(self.bsv_wallets),
-            pegout_utxos=[[]] * len(self.bsv_wallets),
-            zk_proof_paths=[[]] * len(self.bsv_wallets),
+            tokens=TokenRegistry(),
             funding_utxos=[[]] * len(self.bsv_wallets),
             burnt_tokens=[[]] * len(self.bsv_wallets),
             network=self.network,
         )
 
     @staticmethod
-    def load_wallet(wallet_path: str, network: WoCInterface | RPCInterface):
+    def from_dict(data: dict, network: WoCInterface | RPCInterface):
         """
-        Load a wallet from a JSON file.
+        Build a wallet manager from its data.
 
-        [
+        {
             "name" : {
-                "bsv_wallet": [],
-                "sui_address": [],
+                "bsv_wallet": str,
+                "sui_address": str,
                 "genesis_utxos": [],
                 "token_utxos": [],
                 "pegout_utxos": [],
@@ -130,10 +131,10 @@ class WalletManager:
                 "funding_utxos": [],
                 "burnt_tokens": [],
             }
-        ]
+        }
 
-        Args:
-            wallet_path (str): The path to the wallet configuration file.
+        The i-th entries of "genesis_utxos", "token_utxos" and "zk_proof_paths" describe the same token, as does the
+        i-th entry of "pegout_utxos" if there is one: tokens whose pegout UTXO is not generated yet come last.
         """
         if isinstance(network, RPCInterface):
             network_str = "BSV_Testnet"
@@ -142,86 +143,334 @@ class WalletManager:
                 network_str = "BSV_Testnet"
             else:
                 network_str = "BSV_Mainnet"
+        wallet_manager = WalletManager([], [], [], TokenRegistry(), [], [], network)
+        for (i, name) in enumerate(data.keys()):
+            wallet_manager.names.append(name)
+            wallet_manager.bsv_wallets.append(Wallet.from_hexstr(network_str, data[name]["bsv_wallet"]))
+            wallet_manager.sui_addresses.append(bytes.fromhex(data[name]["sui_address"]))
+            wallet_manager.funding_utxos.append([])
+            wallet_manager.burnt_tokens.append([])
+            wallet_manager.__load_user(i, data[name])
+        return wallet_manager
+
+
+    def __load_user(self, wallet_index: int, user_data: dict):
+        """Replace the tokens, funding UTXOs and burnt tokens of wallet_index with those in `user_data`."""
+        for record in self.tokens.owned_by(wallet_index):
+            self.tokens.remove(record.token_id)
+        pegout_utxos = user_data["pegout_utxos"]
+        for (i, (genesis_utxo, token_utxo, zk_proof_path)) in enumerate(
+            zip(user_data["genesis_utxos"], user_data["token_utxos"], user_data["zk_proof_paths"], strict=True)
+        ):
+            genesis = Outpoint.from_hexstr(genesis_utxo)
+            # The token may have moved here from a user whose data is older in memory
+            if genesis.prev_tx in self.tokens:
+                self.tokens.remove(genesis.prev_tx)
+            self.tokens.add(TokenRecord(
+                genesis=genesis,
+                token=Outpoint.from_hexstr(token_utxo),
+                pegout=Outpoint.from_hexstr(pegout_utxos[i]) if i < len(pegout_utxos) else None,
+                zk_proof_path=zk_proof_path,
+                owner=wallet_index,
+            ))
+        self.funding_utxos[wallet_index] = [Outpoint.from_hexstr(outpoint) for outpoint in user_data["funding_utxos"]]
+        self.burnt_tokens[wallet_index] = [BurntToken.from_hexstr(burnt_token) for burnt_token in user_data["burnt_tokens"]]
+
+        return
+
+
+    def __user_to_dict(self, wallet_index: int) -> dict:
+        data = {}
+        data["bsv_wallet"] = self.bsv_wallets[wallet_index].to_hex()
+        data["sui_address"] = self.sui_addresses[wallet_index].hex()
+        # Tokens without a pegout UTXO go last, so that the pegout UTXOs line up with the other lists
+        records = sorted(self.tokens.owned_by(wallet_index), key=lambda record: record.pegout is None)
+        data["genesis_utxos"] = [record.genesis.to_hexstr() for record in records]
+        data["token_utxos"] = [record.token.to_hexstr() for record in records]
+        data["pegout_utxos"] = [record.pegout.to_hexstr() for record in records if record.pegout is not None]
+        data["zk_proof_paths"] = [record.zk_proof_path for record in records]
+        data["funding_utxos"] = [utxo.to_hexstr() for utxo in self.funding_utxos[wallet_index]]
+        data["burnt_tokens"] = [utxo.to_hexstr() for utxo in self.burnt_tokens[wallet_index]]
+        return data
+
+
+    def to_dict(self) -> dict:
+        """Return the data of the wallet manager, with the structure described in `from_dict`."""
+        return {name: self.__user_to_dict(i) for (i, name) in enumerate(self.names)}
+
+
+    @staticmethod
+    def load_wallet(wallet_path: str, network: WoCInterface | RPCInterface):
+        """
+        Load a wallet from a JSON file, or from a wallet store if `wallet_path` ends in `.db`, `.sqlite` or `.sqlite3`
+        (see `bsv.wallet_store`). The data has the structure described in `from_dict`.
+
+        Args:
+            wallet_path (str): The path to the wallet configuration file.
+        """
         try:
-            names = []
-            bsv_wallets = []
-            sui_addresses = []
-            genesis_utxos = []
-            token_utxos = []
-            pegout_utxos = []
-            zk_proof_paths = []
-            funding_utxos = []
-            burnt_tokens = []
-            with open(wallet_path, 'r') as file:
-                data = json.load(file)
-                for name in data.keys():
-                    names.append(name)
-                    bsv_wallets.append(Wallet.from_hexstr(network_str, data[name]["bsv_wallet"]))
-                    sui_addresses.append(bytes.fromhex(data[name]["sui_address"]))
-                    genesis_utxos_to_add = []
-                    token_utxos_to_add = []
-                    pegout_utxos_to_add = []
-                    zk_proof_paths_to_add = []
-                    funding_utxos_to_add = []
-                    burnt_tokens_to_add = []
-                    for outpoint in data[name]["genesis_utxos"]:
-                        genesis_utxos_to_add.append(Outpoint.from_hexstr(outpoint))
-                    for outpoint in data[name]["token_utxos"]:
-                        token_utxos_to_add.append(Outpoint.from_hexstr(outpoint))
-                    for outpoint in data[name]["pegout_utxos"]:
-                        pegout_utxos_to_add.append(Outpoint.from_hexstr(outpoint))
-                    for path in data[name]["zk_proof_paths"]:
-                        zk_proof_paths_to_add.append(path)
-                    for outpoint in data[name]["funding_utxos"]:
-                        funding_utxos_to_add.append(Outpoint.from_hexstr(outpoint))
-                    for outpoint in data[name]["burnt_tokens"]:
-                        burnt_tokens_to_add.append(BurntToken.from_hexstr(outpoint))
-                    genesis_utxos.append(genesis_utxos_to_add)
-                    token_utxos.append(token_utxos_to_add)
-                    pegout_utxos.append(pegout_utxos_to_add)
-                    zk_proof_paths.append(zk_proof_paths_to_add)
-                    funding_utxos.append(funding_utxos_to_add)
-                    burnt_tokens.append(burnt_tokens_to_add)
-            return WalletManager(names, bsv_wallets, sui_addresses, genesis_utxos, token_utxos, pegout_utxos, zk_proof_paths, funding_utxos, burnt_tokens, network)
-
-        except (FileNotFoundError, json.JSONDecodeError, ValueError) as e:
+            store = None
+            if is_wallet_store(wallet_path):
+                store = WalletStore(wallet_path)
+                data = store.load()
+            else:
+                with open(wallet_path, 'r') as file:
+                    data = json.load(file)
+            wallet_manager = WalletManager.from_dict(data, network)
+            wallet_manager.wallet_path = wallet_path
+            wallet_manager.store = store
+            return wallet_manager
+
+        except (FileNotFoundError, json.JSONDecodeError, ValueError, sqlite3.Error) as e:
             print(f"Error loading wallet data: {e}")
             return None
-        
 
-    def save_wallet(self, wallet_path: str):
+
+    def __read_wallet(self, names: list[str] | None = None) -> dict | None:
+        """Return the data in the wallet file, or None if there is none. A wallet store only reads the users
+        `names` (all of them if None)."""
+        if self.wallet_path is None:
+            return None
+        if self.store is not None:
+            return self.store.load(names)
+        try:
+            with open(self.wallet_path, 'r') as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return None
+
+
+    def __write_wallet(self, data: dict, wallet_path: str):
+        if is_wallet_store(wallet_path):
+            if self.store is not None and self.store.path == Path(wallet_path):
+                self.store.save(data)
+                return
+            store = WalletStore(wallet_path)
+            store.remove([name for name in store.load() if name not in data])
+            store.save(data)
+            store.close()
+            return
+
+        # Write the whole file aside and swap it in, so that a crash never leaves a truncated wallet
+        tmp_path = f"{wallet_path}.tmp"
+        with open(tmp_path, 'w') as file:
+            json.dump(data, file, indent=4)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, wallet_path)
+
+        return
+
+
+    def save_wallet(self, wallet_path: str | None = None):
         """
-        Save the wallet data to a JSON file.
+        Save the wallet data to a JSON file, or to a wallet store if `wallet_path` ends in `.db`, `.sqlite` or
+        `.sqlite3`. A wallet store only writes the records changed since the last load or save, in one transaction.
+
+        When saving to the file the wallet was loaded from, only the users whose lock is held by the calling thread
+        (see `locked`) are written, with the users missing from the file: the other users are left as they are in the
+        file, as other threads or processes may be changing them in the meantime. With a JSON wallet, which is
+        rewritten whole, they are also reloaded from it unless another thread holds their lock.
 
         Args:
-            wallet_path (str): The path to save the wallet configuration file.
+            wallet_path (str | None): The path to save the wallet configuration file. Defaults to the path the
+                wallet was loaded from.
         """
-        data = {}
-        for (i, name) in enumerate(self.names):
-            bsv_priv_key_hex = self.bsv_wallets[i].to_hex()
-            sui_address_hex = self.sui_addresses[i].hex()
-            genesis_utxos_hex = [utxo.to_hexstr() for utxo in self.genesis_utxos[i]]
-            token_utxos_hex = [utxo.to_hexstr() for utxo in self.token_utxos[i]]
-            pegout_utxos_hex = [utxo.to_hexstr() for utxo in self.pegout_utxos[i]]
-            zk_proof_path_str = [path for path in self.zk_proof_paths[i]]
-            funding_utxos_hex = [utxo.to_hexstr() for utxo in self.funding_utxos[i]]
-            burnt_tokens_hex = [utxo.to_hexstr() for utxo in self.burnt_tokens[i]]
-            data[name] = {}
-            data[name]["bsv_wallet"] = bsv_priv_key_hex
-            data[name]["sui_address"] = sui_address_hex
-            data[name]["genesis_utxos"] = genesis_utxos_hex
-            data[name]["token_utxos"] = token_utxos_hex
-            data[name]["pegout_utxos"] = pegout_utxos_hex
-            data[name]["zk_proof_paths"] = zk_proof_path_str
-            data[name]["funding_utxos"] = funding_utxos_hex
-            data[name]["burnt_tokens"] = burnt_tokens_hex
-
-        with open(wallet_path, 'w') as file:
-            json.dump(data, file, indent=4)
+        if wallet_path is not None and wallet_path != self.wallet_path:
+            self.__write_wallet(self.to_dict(), wallet_path)
+            return
+        assert self.wallet_path is not None, "No path to save the wallet to"
+
+        if self.store is not None:
+            with self.sync_lock, self.locks.file:
+                self.store.save({
+                    name: self.__user_to_dict(i)
+                    for (i, name) in enumerate(self.names)
+                    if self.locks.user(name).is_held() or name not in self.store.saved
+                })
+            return
+
+        with self.sync_lock, self.locks.file:
+            saved = self.__read_wallet()
+            data = {}
+            for (i, name) in enumerate(self.names):
+                lock = self.locks.user(name)
+                if saved is None or name not in saved or lock.is_held():
+                    data[name] = self.__user_to_dict(i)
+                else:
+                    data[name] = saved[name]
+                    # Users in the middle of an operation of another thread are written by that thread when it ends
+                    if not lock.is_locked():
+                        self.__load_user(i, saved[name])
+            self.__write_wallet(data, self.wallet_path)
+
+        return
+
+
+    def refresh(self, wallet_indices: list[int]):
+        """Reload the data of wallet_indices from the wallet file, discarding the changes not saved yet."""
+        with self.sync_lock, self.locks.file:
+            saved = self.__read_wallet([self.names[wallet_index] for wallet_index in wallet_indices])
+            if saved is None:
+                return
+            for wallet_index in wallet_indices:
+                name = self.names[wallet_index]
+                if name in saved:
+                    self.__load_user(wallet_index, saved[name])
+
+        return
+
+
+    @property
+    def locks(self) -> WalletLocks:
+        return get_wallet_locks(self.wallet_path)
+
+
+    @contextmanager
+    def locked(self, *wallet_indices: int):
+        """
+        Hold the locks of the users `wallet_indices` for an operation, so that the operations on other users can run
+        at the same time, in other threads or in other processes using the same wallet file.
+
+        On entry, the data of the users is reloaded from the wallet file. On exit, the changes are saved or, if the
+        operation raises, discarded. The locks are re-entrant, but an operation should take the locks of all its
+        users in one call: the locks are then taken in the same order by everyone, which rules out deadlocks.
+        """
+        with self.locks.hold([self.names[i] for i in wallet_indices]) as acquired:
+            acquired_indices = [self.names.index(name) for name in acquired]
+            if not acquired_indices:
+                yield
+                return
+            self.refresh(acquired_indices)
+            try:
+                yield
+            except BaseException:
+                self.refresh(acquired_indices)
+                raise
+            if self.wallet_path is not None:
+                self.save_wallet()
+
+
+    def checkpoint(self):
+        """Save the changes of the current operation (see `locked`) now, so that they are kept even if the rest of
+        the operation raises. Used once transactions are broadcast, as they can no longer be taken back."""
+        if self.wallet_path is not None:
+            self.save_wallet()
 
         return
 
 
+    @property
+    def funding_pool(self) -> FundingPool:
+        if self.pool is None:
+            stats_path = Path(f"{self.wallet_path}.funding.json") if self.wallet_path is not None else None
+            self.pool = FundingPool(self.network, stats_path)
+        return self.pool
+
+
+    def __take_funding(self, wallet_index: int, position: int | None, needed: str) -> Outpoint:
+        assert self.locks.user(self.names[wallet_index]).is_held(), f"Funding of user {wallet_index} reserved without its lock"
+        assert position is not None, f"User {wallet_index} has no funding UTXO holding {needed}"
+        return self.funding_utxos[wallet_index].pop(position)
+
+
+    def reserve_funding(self, wallet_index: int, minimum: int) -> Outpoint:
+        """Take the smallest funding UTXO of wallet_index holding at least `minimum` satoshis out of the wallet for the
+        current operation, which spends it with a change output. Outputs kept for transfers and burns (see
+        `FUNDING_DENOMINATIONS`) are only taken if there is no other choice.
+
+        The caller must hold the lock of wallet_index (see `locked`): the UTXO can no longer be picked by other
+        operations once the lock is released, and it is given back if the operation raises."""
+        outpoints = self.funding_utxos[wallet_index]
+        position = self.funding_pool.select(outpoints, minimum, exclude=FUNDING_DENOMINATIONS)
+        if position is None:
+            position = self.funding_pool.select(outpoints, minimum)
+        return self.__take_funding(wallet_index, position, f"{minimum} satoshis")
+
+
+    def reserve_denomination(self, wallet_index: int, denomination: int) -> Outpoint:
+        """Take a funding UTXO of wallet_index holding `denomination` satoshis (or up to twice as much) out of the
+        wallet for the current operation, which spends it whole. The outputs of this denomination are refilled by
+        `refill_funding` when they run out or, on a best effort basis, when they run low. Same locking as
+        `reserve_funding`."""
+        outpoints = self.funding_utxos[wallet_index]
+        position = self.funding_pool.select(outpoints, denomination, 2 * denomination)
+        if position is None:
+            self.refill_funding(wallet_index, denomination)
+            position = self.funding_pool.select(outpoints, denomination, 2 * denomination)
+        funding = self.__take_funding(wallet_index, position, f"{denomination} satoshis")
+
+        name = self.names[wallet_index]
+        with self.locks.file:
+            self.funding_pool.record_use(name, denomination)
+        if self.funding_pool.count(outpoints, denomination, 2 * denomination) < LOW_WATER_MARK:
+            # Topping up is best effort: the operation already has its funding
+            kept = list(outpoints)
+            try:
+                self.refill_funding(wallet_index, denomination)
+            except Exception as e:
+                # Give back the UTXO taken by the failed split
+                self.funding_utxos[wallet_index] = kept
+                print(f"Failed to refill the funding UTXOs of {denomination} satoshis of {name}: {e}")
+
+        return funding
+
+
+    def refill_funding(self, wallet_index: int, denomination: int):
+        """Split a funding UTXO of wallet_index into outputs of `denomination` satoshis, as many as the operations
+        expected at the rate observed so far (see `FundingPool.split_count`)."""
+        with self.locks.file:
+            count = self.funding_pool.split_count(self.names[wallet_index], denomination)
+        self.split_funding(wallet_index, {denomination: count})
+
+        return
+
+
+    def split_funding(self, wallet_index: int, denominations: dict[int, int]):
+        """Split the largest funding UTXO of wallet_index in a single transaction, creating `count` outputs of
+        `denomination` satoshis for each entry of `denominations`, and a change output. If the UTXO cannot fund all
+        the outputs, the counts are reduced."""
+        with self.locked(wallet_index):
+            outpoints = self.funding_utxos[wallet_index]
+            position = self.funding_pool.largest(outpoints, exclude=FUNDING_DENOMINATIONS)
+            funding = self.__take_funding(wallet_index, position, "any amount")
+            funding_tx = tx_from_id(funding.prev_tx, self.network)
+            amount = funding_tx.tx_outs[funding.prev_index].amount
+
+            # Fee for all the requested outputs, which is an upper bound if some are dropped
+            outputs = [
+                p2pkh(self.bsv_wallets[wallet_index], denomination)
+                for (denomination, count) in denominations.items()
+                for _ in range(count)
+            ]
+            change = p2pkh(self.bsv_wallets[wallet_index], amount)
+            fee = estimate_tx_size([P2PKH_UNLOCKING_SCRIPT_LEN], [*outputs, change]) * 50 // 1024 + 1
+            available = amount - fee - 1
+            outputs = []
+            for (denomination, count) in denominations.items():
+                count = max(0, min(count, available // denomination))
+                outputs.extend(p2pkh(self.bsv_wallets[wallet_index], denomination) for _ in range(count))
+                available -= count * denomination
+            assert outputs, f"Not enough funds to split: {amount} satoshis"
+            change = p2pkh(self.bsv_wallets[wallet_index], amount - sum(output.amount for output in outputs))
+
+            (spending_tx, response) = spend_p2pkh(
+                [funding_tx],
+                [funding.prev_index],
+                [*outputs, change],
+                len(outputs),
+                [self.bsv_wallets[wallet_index]],
+                50,
+                self.network
+            )
+
+            assert response.status_code == 200, f"Error spending UTXO: {response.content}"
+
+            self.funding_utxos[wallet_index].extend(Outpoint(spending_tx.id(), i) for i in range(len(spending_tx.tx_outs)))
+
+            return
+
+
     def get_funding(self, wallet_index: int):
         assert isinstance(self.network, RPCInterface), "get_funding is supported only for regtest"
 
@@ -245,234 +494,294 @@ class WalletManager:
 
 
     def setup(self, wallet_index: int):
-        """Split funds for wallet_index into 10 smaller denominations.
-        
-        To be called only at the beginning of the DEMO. It uses `SETUP_INDEX` to perform the setup."""
-        funding_tx = tx_from_id(self.funding_utxos[wallet_index][SETUP_INDEX].prev_tx, self.network)
-        amount = funding_tx.tx_outs[self.funding_utxos[wallet_index][SETUP_INDEX].prev_index].amount
-        split_amount = BALLPARK_TRANSACTION_FEE
-        remaning_amount = amount - split_amount * 10 - BALLPARK_BURNING_TX_FEE
-
-        outputs = [p2pkh(self.bsv_wallets[wallet_index], split_amount) for _ in range(10)]
-        outputs.append(p2pkh(self.bsv_wallets[wallet_index], BALLPARK_BURNING_TX_FEE))
-        outputs.append(p2pkh(self.bsv_wallets[wallet_index], remaning_amount))
-
-        (spending_tx, response) = spend_p2pkh(
-            [funding_tx],
-            [self.funding_utxos[wallet_index][0].prev_index],
-            outputs,
-            11,
-            [self.bsv_wallets[wallet_index]],
-            50,
-            self.network
-        )
-
-        assert response.status_code == 200, f"Error spending UTXO: {response.content}"
+        """Split the funds of wallet_index into outputs for transfers and one output for burning, in one transaction.
+
+        The outputs for transfers and burns are refilled automatically afterwards, so this only needs to be called at
+        the beginning of the DEMO."""
+        with self.locked(wallet_index):
+            name = self.names[wallet_index]
+            with self.locks.file:
+                count = self.funding_pool.split_count(name, BALLPARK_TRANSACTION_FEE)
+            self.split_funding(wallet_index, {BALLPARK_TRANSACTION_FEE: count, BALLPARK_BURNING_TX_FEE: 1})
+
+            return
+
+
+    def broadcast_genesis_for_pegin(self, wallet_index: int) -> str:
+        """Broadcast the genesis transaction for pegin and record the new token, whose proof is generated separately
+        by `prove_genesis`. Return the genesis txid.
+
+        Uses the smallest funding UTXO that can pay for the genesis transaction."""
+        with self.locked(wallet_index):
+            funding = self.reserve_funding(wallet_index, 1 + BALLPARK_TRANSACTION_FEE)
+            funding_tx = tx_from_id(funding.prev_tx, self.network)
+            funding_index = funding.prev_index
+            genesis = p2pkh(self.bsv_wallets[wallet_index], 1)
+            change = p2pkh(self.bsv_wallets[wallet_index], funding_tx.tx_outs[funding_index].amount - 1)
+
+            (spending_tx, response) = spend_p2pkh(
+                [funding_tx],
+                [funding_index],
+                [genesis, change],
+                1,
+                [self.bsv_wallets[wallet_index]],
+                50,
+                self.network
+            )
 
-        self.funding_utxos[wallet_index] = []
-        to_add = []
-        for i, _ in enumerate(spending_tx.tx_outs):
-            to_add.append(Outpoint(spending_tx.id(), i))
-        self.funding_utxos[wallet_index].extend(to_add)
+            assert response.status_code == 200, f"Error spending UTXO: {response.content}"
 
-        return
+            self.tokens.add(TokenRecord(
+                genesis=Outpoint(spending_tx.id(), 0),
+                token=Outpoint(spending_tx.id(), 0),
+                pegout=None,
+                zk_proof_path=f"proof_{spending_tx.id()}",
+                owner=wallet_index,
+            ))
+            self.funding_utxos[wallet_index].append(Outpoint(spending_tx.id(), 1))
 
+            return spending_tx.id()
 
-    def generate_genesis_for_pegin(self, wallet_index: int):
-        """Generate genesis for pegin.
-        
-        Uses last funding UTXO as that is the one with most funds by design."""
-        funding_tx = tx_from_id(self.funding_utxos[wallet_index][-1].prev_tx, self.network)
-        funding_index = self.funding_utxos[wallet_index][-1].prev_index
-        genesis = p2pkh(self.bsv_wallets[wallet_index], 1)
-        change = p2pkh(self.bsv_wallets[wallet_index], funding_tx.tx_outs[funding_index].amount - 1)
-
-        (spending_tx, response) = spend_p2pkh(
-            [funding_tx],
-            [funding_index],
-            [genesis, change],
-            1,
-            [self.bsv_wallets[wallet_index]],
-            50,
-            self.network
-        )
-
-        assert response.status_code == 200, f"Error spending UTXO: {response.content}"
 
+    def prove_genesis(self, genesis_txid: str):
+        """Generate the proof of the token created in `genesis_txid`. It only depends on the genesis txid, so it can
+        run concurrently with the other steps of the pegin."""
         data = {
-            "proof_name": f"proof_{spending_tx.id()}",
+            "proof_name": f"proof_{genesis_txid}",
             "chain_parameters" : {
                 "input_index": 1,
                 "output_index": 0,
             },
             "public_inputs" : {
-                "outpoint_txid": spending_tx.id(),
-                "genesis_txid": spending_tx.id(),
+                "outpoint_txid": genesis_txid,
+                "genesis_txid": genesis_txid,
             },
             "witness" : {
                 "tx": "",
                 "prior_proof_path": ""
             }
         }
-        # Write data
-        with open(str(Path(__file__).parent.parent.parent / "zk_engine/data/tcp_engine/configs/prove.toml"), "w") as f:
-            toml.dump(data, f)
-            f.close()
-        # Generate proof
-        subprocess.run(
-            f"cd {Path(__file__).parent.parent.parent / "zk_engine"} && {TRANSFER_ZK_PROOF}",
-            shell=True,
-            check=True,
-            text=True,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE
-        )
-
-        self.genesis_utxos[wallet_index].append(Outpoint(spending_tx.id(), 0))
-        self.zk_proof_paths[wallet_index].append(f"proof_{spending_tx.id()}")
-        self.token_utxos[wallet_index].append(Outpoint(spending_tx.id(), 0))
-        self.funding_utxos[wallet_index].pop(-1)
-        self.funding_utxos[wallet_index].append(Outpoint(spending_tx.id(), 1))
+        self.prover.prove_tcp(data)
 
         return
 
 
-    def generate_pegout(self, wallet_index: int, issuer_index: int, token_index: int):
-        funding_tx = tx_from_id(self.funding_utxos[issuer_index][-1].prev_tx, self.network)
-        funding_index = self.funding_utxos[issuer_index][-1].prev_index
+    def generate_pegout(self, wallet_index: int, issuer_index: int, token_id: str):
+        self.generate_pegouts(wallet_index, issuer_index, [token_id])
 
-        genesis_tx = tx_from_id(self.genesis_utxos[wallet_index][token_index].prev_tx, self.network)
+        return
 
-        vk, _, prepared_vk = load_and_process_vk(genesis_tx.hash())
-        pegout = generate_pob_utxo(vk, prepared_vk)
-        change = p2pkh(self.bsv_wallets[issuer_index], funding_tx.tx_outs[funding_index].amount)
 
-        (spending_tx, response) = spend_p2pkh(
-            [funding_tx],
-            [funding_index],
-            [pegout, change],
-            1,
-            [self.bsv_wallets[issuer_index]],
-            50,
-            self.network
-        )
+    def generate_pegouts(self, wallet_index: int, issuer_index: int, token_ids: list[str]):
+        """Generate the pegout UTXOs for the tokens `token_ids` of `wallet_index`, all in one transaction funded by
+        `issuer_index`. The pegout UTXO of token_ids[i] is at output i."""
+        with self.locked(wallet_index, issuer_index):
+            records = [self.tokens.resolve(wallet_index, token_id) for token_id in token_ids]
+            pegouts = [
+                generate_pob_utxo_for_genesis(bytes.fromhex(record.token_id)[::-1])
+                for record in records
+            ]
+            # The PoB locking scripts are large, so the fee is sized from the actual outputs
+            fee = estimate_tx_size([P2PKH_UNLOCKING_SCRIPT_LEN], [*pegouts, p2pkh(self.bsv_wallets[issuer_index], 0)]) * 50 // 1024
+            funding = self.reserve_funding(issuer_index, len(pegouts) + fee + 1)
+            funding_tx = tx_from_id(funding.prev_tx, self.network)
+            funding_index = funding.prev_index
+
+            change = p2pkh(self.bsv_wallets[issuer_index], funding_tx.tx_outs[funding_index].amount - sum(pegout.amount for pegout in pegouts))
+
+            (spending_tx, response) = spend_p2pkh(
+                [funding_tx],
+                [funding_index],
+                [*pegouts, change],
+                len(pegouts),
+                [self.bsv_wallets[issuer_index]],
+                50,
+                self.network
+            )
 
-        assert response.status_code == 200, f"Error spending UTXO: {response.content}"
+            assert response.status_code == 200, f"Error spending UTXO: {response.content}"
 
-        self.pegout_utxos[wallet_index].append(Outpoint(spending_tx.id(), 0))
-        self.funding_utxos[issuer_index].pop(-1)
-        self.funding_utxos[issuer_index].append(Outpoint(spending_tx.id(), 1))
+            for (i, record) in enumerate(records):
+                record.pegout = Outpoint(spending_tx.id(), i)
+            self.funding_utxos[issuer_index].append(Outpoint(spending_tx.id(), len(pegouts)))
 
-        return
+            return
 
 
-    def add_pegout(self, wallet_index: int, pegout: Outpoint):
-        self.pegout_utxos[wallet_index].append(pegout)
+    def add_pegout(self, token_id: str, pegout: Outpoint):
+        with self.locked(self.tokens.get(token_id).owner):
+            self.tokens.get(token_id).pegout = pegout
         
         return
 
 
+    def get_burnt_token(self, wallet_index: int, token_id: str) -> BurntToken:
+        """Return the token `token_id` burnt by wallet_index."""
+        for burnt_token in self.burnt_tokens[wallet_index]:
+            if burnt_token.genesis_txid == token_id:
+                return burnt_token
+        assert False, f"Token {token_id} was not burnt by user {wallet_index}"
+
+
     def add_funding(self, wallet_index: int, funding: Outpoint):
-        self.funding_utxos[wallet_index].append(funding)
+        with self.locked(wallet_index):
+            self.funding_utxos[wallet_index].append(funding)
         return
 
 
-    def __generate_transfer_zk_proof(self, spending_tx: Tx, wallet_index: int, token_index: int):
+    def __generate_transfer_zk_proof(self, spending_tx: Tx, record: TokenRecord):
         data = {
-            "proof_name": self.zk_proof_paths[wallet_index][token_index],
+            "proof_name": record.zk_proof_path,
             "chain_parameters" : {
                 "input_index": 1,
                 "output_index": 0,
             },
             "public_inputs" : {
                 "outpoint_txid": spending_tx.id(),
-                "genesis_txid": self.genesis_utxos[wallet_index][token_index].prev_tx
+                "genesis_txid": record.token_id
             },
             "witness" : {
                 "tx": spending_tx.serialize().hex(),
-                "prior_proof_path": self.zk_proof_paths[wallet_index][token_index]
+                "prior_proof_path": record.zk_proof_path
             }
         }
-        # Write data
-        with open(str(Path(__file__).parent.parent.parent / "zk_engine/data/tcp_engine/configs/prove.toml"), "w") as f:
-            toml.dump(data, f)
-            f.close()
         # Generate proof
-        subprocess.run(
-            f"cd {Path(__file__).parent.parent.parent / "zk_engine"} && {TRANSFER_ZK_PROOF}",
-            shell=True,
-            check=True,
-            text=True,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE
-        )
+        self.prover.prove_tcp(data)
 
         return
 
 
-    def __generate_burning_zk_proof(self, wallet_index: int, spending_tx: Tx, token_index: int):
+    def __generate_burning_zk_proof(self, spending_tx: Tx, record: TokenRecord):
         data = {
-            "genesis_txid" : self.genesis_utxos[wallet_index][token_index].prev_tx,
+            "genesis_txid" : record.token_id,
             "spending_tx": spending_tx.serialize().hex(),
-            "tcp_proof_name": self.zk_proof_paths[wallet_index][token_index],
+            "tcp_proof_name": record.zk_proof_path,
             "prev_amount": 1,
         }
-        # Write data
-        with open(str(Path(__file__).parent.parent.parent / "zk_engine/data/pob_engine/configs/prove.toml"), "w") as f:
-            toml.dump(data, f)
-            f.close()
         # Generate proof
-        subprocess.run(
-            f"cd {Path(__file__).parent.parent.parent / "zk_engine"} && {BURNING_ZK_PROOF}",
-            shell=True,
-            check=True,
-            text=True,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE
-        )
+        self.prover.prove_pob(data)
 
         return
 
 
-    def transfer_token(self, sender_index: int, receiver_index: int, token_index: int = 0):
-        """Transfer the token from sender_index to receiver_index."""
-        token_tx = tx_from_id(self.token_utxos[sender_index][token_index].prev_tx, self.network)
-        token_tx_index = self.token_utxos[sender_index][token_index].prev_index
-        funding_tx = tx_from_id(self.funding_utxos[receiver_index][0].prev_tx, self.network)
-        funding_tx_index = self.funding_utxos[receiver_index][0].prev_index
+    def transfer_token(self, sender_index: int, receiver_index: int, token_id: str):
+        """Transfer the token `token_id` from sender_index to receiver_index."""
+        with self.locked(sender_index, receiver_index):
+            record = self.tokens.resolve(sender_index, token_id)
+            funding = self.reserve_denomination(receiver_index, BALLPARK_TRANSACTION_FEE)
+            token_tx, funding_tx = txs_from_ids([record.token.prev_tx, funding.prev_tx], self.network)
+            token_tx_index = record.token.prev_index
+            funding_tx_index = funding.prev_index
+
+            token_output = p2pkh(self.bsv_wallets[receiver_index], 1)
+
+            (spending_tx, response) = spend_p2pkh(
+                [funding_tx, token_tx],
+                [funding_tx_index, token_tx_index],
+                [token_output],
+                0, # dummy
+                [self.bsv_wallets[receiver_index], self.bsv_wallets[sender_index]],
+                0,
+                self.network
+            )
 
-        token_output = p2pkh(self.bsv_wallets[receiver_index], 1)
+            assert response.status_code == 200, f"Error spending UTXO: {response.content}"
 
-        (spending_tx, response) = spend_p2pkh(
-            [funding_tx, token_tx],
-            [funding_tx_index, token_tx_index],
-            [token_output],
-            0, # dummy
-            [self.bsv_wallets[receiver_index], self.bsv_wallets[sender_index]],
-            0,
-            self.network
-        )
+            self.tokens.move(token_id, Outpoint(spending_tx.id(), 0), receiver_index)
+            self.checkpoint()
 
-        assert response.status_code == 200, f"Error spending UTXO: {response.content}"
+            self.__generate_transfer_zk_proof(spending_tx, record)
 
-        self.__generate_transfer_zk_proof(spending_tx, sender_index, token_index)
+            return
 
-        self.token_utxos[sender_index].pop(token_index)
-        self.funding_utxos[receiver_index].pop(0)
 
-        genesis_utxo = self.genesis_utxos[sender_index].pop(token_index)
-        pegout_utxo = self.pegout_utxos[sender_index].pop(token_index)
-        zk_proof_path = self.zk_proof_paths[sender_index].pop(token_index)
-        
-        self.genesis_utxos[receiver_index].append(genesis_utxo)
-        self.pegout_utxos[receiver_index].append(pegout_utxo)
-        self.token_utxos[receiver_index].append(Outpoint(spending_tx.id(), 0))
-        self.zk_proof_paths[receiver_index].append(zk_proof_path)
+    def transfer_tokens(self, moves: list[tuple[int, int, str]], max_workers: int = MAX_CONCURRENT_PROOFS) -> tuple[list[str | None], dict[str, str]]:
+        """Transfer tokens for each (sender_index, receiver_index, token_id) in `moves`, in order. Return the txid of
+        each transfer, or None for the transfers that were rejected, and the error of each token whose proofs failed.
+
+        The inputs of all the transfers are retrieved in bulk, and the transactions are built, signed and broadcast
+        in a single batch. Successive moves of the same token spend the output of the previous one. The moves and
+        the spent fundings are saved as soon as the batch is broadcast. Proofs are then generated by at most
+        `max_workers` workers (one if the prover service is not running), one token at a time per worker, as each
+        proof builds on the previous proof of its token. A failed proof does not undo the transfers.
+        """
+        users = {index for (sender_index, receiver_index, _) in moves for index in (sender_index, receiver_index)}
+        with self.locked(*users):
+            # Check the moves against the current owners, then reserve the funding of each transfer
+            owners = {}
+            for (sender_index, receiver_index, token_id) in moves:
+                if token_id not in owners:
+                    owners[token_id] = self.tokens.get(token_id).owner
+                assert owners[token_id] == sender_index, f"Token {token_id} is not owned by user {sender_index}"
+                owners[token_id] = receiver_index
+            fundings = [
+                self.reserve_denomination(receiver_index, BALLPARK_TRANSACTION_FEE)
+                for (_, receiver_index, _) in moves
+            ]
+
+            # Retrieve all the inputs at once
+            tokens = {token_id: self.tokens.get(token_id).token for token_id in owners}
+            prev_txids = [token.prev_tx for token in tokens.values()] + [funding.prev_tx for funding in fundings]
+            prev_txs = dict(zip(prev_txids, txs_from_ids(prev_txids, self.network)))
+
+            # Build and sign all the transfers, chaining the moves of each token
+            tokens = {token_id: (prev_txs[token.prev_tx], token.prev_index) for (token_id, token) in tokens.items()}
+            spending_txs = []
+            for ((sender_index, receiver_index, token_id), funding) in zip(moves, fundings):
+                (token_tx, token_tx_index) = tokens[token_id]
+                spending_tx = sign_p2pkh(
+                    [prev_txs[funding.prev_tx], token_tx],
+                    [funding.prev_index, token_tx_index],
+                    [p2pkh(self.bsv_wallets[receiver_index], 1)],
+                    0, # dummy
+                    [self.bsv_wallets[receiver_index], self.bsv_wallets[sender_index]],
+                    0,
+                )
+                tokens[token_id] = (spending_tx, 0)
+                spending_txs.append(spending_tx)
+
+            responses = broadcast_txs(spending_txs, self.network)
+
+            # A rejected transfer leaves its funding unspent, and the later moves of its token invalid
+            txids = []
+            chains = {}
+            failed = set()
+            for ((_, receiver_index, token_id), funding, spending_tx, response) in zip(moves, fundings, spending_txs, responses):
+                if token_id in failed or response is None or response.status_code != 200:
+                    failed.add(token_id)
+                    self.funding_utxos[receiver_index].append(funding)
+                    txids.append(None)
+                    continue
+                chains.setdefault(token_id, []).append((spending_tx, receiver_index))
+                txids.append(spending_tx.id())
+
+            # The broadcast transactions cannot be taken back: record them before proving
+            for (token_id, chain) in chains.items():
+                (spending_tx, receiver_index) = chain[-1]
+                self.tokens.move(token_id, Outpoint(spending_tx.id(), 0), receiver_index)
+            self.checkpoint()
+
+            proof_errors = {}
+            with ThreadPoolExecutor(max_workers=self.prover.max_concurrent_jobs(max_workers)) as executor:
+                proofs = {
+                    token_id: executor.submit(self.__prove_transfers, self.tokens.get(token_id), chain)
+                    for (token_id, chain) in chains.items()
+                }
+                for (token_id, proof) in proofs.items():
+                    if (error := proof.exception()) is not None:
+                        proof_errors[token_id] = str(error)
+
+        return txids, proof_errors
+
+
+    def __prove_transfers(self, record: TokenRecord, chain: list[tuple[Tx, int]]):
+        for (spending_tx, _) in chain:
+            self.__generate_transfer_zk_proof(spending_tx, record)
 
         return
-    
 
-    def __generate_pegout_unlocking_script(self, wallet_index: int, token_index: int):
+
+    def __generate_pegout_unlocking_script(self, record: TokenRecord):
         with open(str(Path(__file__).parent.parent.parent / "zk_engine/data/pob_engine/proofs/proof_of_burn.bin"), "rb") as f:
             proof_bytes = list(f.read())
             proof = ProofMnt4753.deserialise(proof_bytes[8:])
@@ -485,8 +794,8 @@ class WalletManager:
             #   [total length of bytestring] [2 as u64] [genesis_txid as element in MNT4_753.scalar_field] [integrity tag = sighash]
             input = [ScalarFieldMNT4.deserialise(processed_input_bytes[16 + length :]).to_int()]
 
-        genesis_tx = tx_from_id(self.genesis_utxos[wallet_index][token_index].prev_tx, self.network)
-        _, cache_vk, _ = load_and_process_vk(genesis_tx.hash())
+        genesis_txid = bytes.fromhex(record.token_id)[::-1]
+        _, cache_vk, _ = load_and_process_vk(genesis_txid)
 
         # Prepare the proof
         prepared_proof = proof.prepare_for_zkscript(cache_vk, input)
@@ -514,75 +823,73 @@ class WalletManager:
         return unlock_key.to_unlocking_script(mnt4_753)
 
 
-    def burn_token(self, wallet_index: int, token_index: int):
-        """Burn the token at token_index owned by the address at wallet_index."""
-
-        token_tx = tx_from_id(self.token_utxos[wallet_index][token_index].prev_tx, self.network)
-        token_tx_index = self.token_utxos[wallet_index][token_index].prev_index
-        pegout_tx = tx_from_id(self.pegout_utxos[wallet_index][token_index].prev_tx, self.network)
-        pegout_tx_index = self.pegout_utxos[wallet_index][token_index].prev_index
-        funding_tx = tx_from_id(self.funding_utxos[wallet_index][BURNING_FUNDING_INDEX].prev_tx, self.network)
-        funding_tx_index = self.funding_utxos[wallet_index][BURNING_FUNDING_INDEX].prev_index
-
-        output_script = Script.parse_string("OP_0 OP_RETURN")
-        extended_address = bytes.fromhex("00") * (32 - len(self.sui_addresses[wallet_index])) + self.sui_addresses[wallet_index]
-        output_script.append_pushdata(extended_address)
-
-        spending_tx = Tx(
-            version=1,
-            tx_ins=[
-                tx_to_input(pegout_tx, pegout_tx_index, Script()),
-                tx_to_input(token_tx, token_tx_index, Script()),
-                tx_to_input(funding_tx, funding_tx_index, Script())
-            ],
-            tx_outs=[
-                TxOut(amount=0, script_pubkey=output_script)
-            ],
-            locktime=0,
-        )
-
-        self.__generate_burning_zk_proof(wallet_index, spending_tx, token_index)
-
-        pegout_unlocking_script = self.__generate_pegout_unlocking_script(wallet_index, token_index)
-
-        inputs = [
-            tx_to_input(pegout_tx, pegout_tx_index, pegout_unlocking_script),
-            tx_to_input(token_tx, token_tx_index, bytes_to_script(bytes.fromhex(self.bsv_wallets[wallet_index].get_public_key_as_hexstr()))),
-            tx_to_input(funding_tx, funding_tx_index, bytes_to_script(bytes.fromhex(self.bsv_wallets[wallet_index].get_public_key_as_hexstr()))),
-        ]
+    def burn_token(self, wallet_index: int, token_id: str):
+        """Burn the token `token_id` owned by the address at wallet_index."""
+        with self.locked(wallet_index):
+            record = self.tokens.resolve(wallet_index, token_id)
+            assert record.pegout is not None, f"Token {token_id} has no pegout UTXO"
+            funding = self.reserve_denomination(wallet_index, BALLPARK_BURNING_TX_FEE)
+
+            token_tx, pegout_tx, funding_tx = txs_from_ids(
+                [
+                    record.token.prev_tx,
+                    record.pegout.prev_tx,
+                    funding.prev_tx,
+                ],
+                self.network,
+            )
+            token_tx_index = record.token.prev_index
+            pegout_tx_index = record.pegout.prev_index
+            funding_tx_index = funding.prev_index
+
+            output_script = Script.parse_string("OP_0 OP_RETURN")
+            extended_address = bytes.fromhex("00") * (32 - len(self.sui_addresses[wallet_index])) + self.sui_addresses[wallet_index]
+            output_script.append_pushdata(extended_address)
+
+            spending_tx = Tx(
+                version=1,
+                tx_ins=[
+                    tx_to_input(pegout_tx, pegout_tx_index, Script()),
+                    tx_to_input(token_tx, token_tx_index, Script()),
+                    tx_to_input(funding_tx, funding_tx_index, Script())
+                ],
+                tx_outs=[
+                    TxOut(amount=0, script_pubkey=output_script)
+                ],
+                locktime=0,
+            )
 
-        spending_tx = Tx(
-            version=1,
-            tx_ins=inputs,
-            tx_outs=spending_tx.tx_outs,
-            locktime=0,
-        )
+            self.__generate_burning_zk_proof(spending_tx, record)
 
-        spending_tx = prepend_signature(
-            token_tx,
-            spending_tx,
-            1,
-            self.bsv_wallets[wallet_index],
-        )
+            # Sign against the unsigned tx: FORKID sighashes do not commit to the unlocking scripts
+            token_sig, funding_sig = SigningContext(spending_tx).sign_inputs(
+                [token_tx, funding_tx],
+                [1, 2],
+                [self.bsv_wallets[wallet_index], self.bsv_wallets[wallet_index]],
+            )
 
-        spending_tx = prepend_signature(
-            funding_tx,
-            spending_tx,
-            2,
-            self.bsv_wallets[wallet_index],
-        )
+            pegout_unlocking_script = self.__generate_pegout_unlocking_script(record)
+            public_key = bytes.fromhex(self.bsv_wallets[wallet_index].get_public_key_as_hexstr())
+
+            # Serialise the burning tx once: broadcasting, hashing and storing it all use the same buffer
+            raw_spending_tx = TxBuffer.serialise(
+                version=1,
+                inputs=[
+                    (pegout_tx.id(), pegout_tx_index, pegout_unlocking_script.raw_serialize(), 0),
+                    (token_tx.id(), token_tx_index, (bytes_to_script(token_sig) + bytes_to_script(public_key)).raw_serialize(), 0),
+                    (funding_tx.id(), funding_tx_index, (bytes_to_script(funding_sig) + bytes_to_script(public_key)).raw_serialize(), 0),
+                ],
+                outputs=spending_tx.tx_outs,
+                locktime=0,
+            )
 
+            response = broadcast_raw_tx(raw_spending_tx, self.network)
+            assert response.status_code == 200, f"Error burning pegout: {response.content}"
 
-        response = self.network.broadcast_tx(spending_tx.serialize().hex())
-        assert response.status_code == 200, f"Error burning pegout: {response.content}"
-        
-        genesis_txid = self.genesis_utxos[wallet_index].pop(token_index)
-        self.token_utxos[wallet_index].pop(token_index)
-        self.pegout_utxos[wallet_index].pop(token_index)
-        self.zk_proof_paths[wallet_index].pop(token_index)
-        self.burnt_tokens[wallet_index].append(BurntToken(
-            genesis_txid.prev_tx,
-            spending_tx.id(),
-        ))
+            self.tokens.remove(token_id)
+            self.burnt_tokens[wallet_index].append(BurntToken(
+                token_id,
+                raw_spending_tx.txid(),
+            ))
 
-        return
+            return
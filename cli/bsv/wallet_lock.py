@@ -0,0 +1,113 @@
+"""Locks on the users of a wallet, shared by the threads of a process and by the processes using the same wallet."""
+import fcntl
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+
+class UserLock:
+    """Re-entrant lock: a thread lock and, while it is held, an exclusive `flock` on a lock file (if `path` is set),
+    so that it excludes both the other threads of the process and the other processes."""
+
+    def __init__(self, path: Path | None):
+        self.path = path
+        self.__lock = threading.RLock()
+        self.__owner = None
+        self.__count = 0
+        self.__file = None
+
+    def acquire(self) -> bool:
+        """Acquire the lock, and return whether it was not already held by the calling thread."""
+        self.__lock.acquire()
+        self.__count += 1
+        if self.__count > 1:
+            return False
+        self.__owner = threading.get_ident()
+        if self.path is not None:
+            self.__file = open(self.path, "a")
+            fcntl.flock(self.__file, fcntl.LOCK_EX)
+        return True
+
+    def release(self):
+        self.__count -= 1
+        if self.__count == 0:
+            self.__owner = None
+            if self.__file is not None:
+                fcntl.flock(self.__file, fcntl.LOCK_UN)
+                self.__file.close()
+                self.__file = None
+        self.__lock.release()
+
+    def is_held(self) -> bool:
+        """Check whether the calling thread holds the lock."""
+        return self.__owner == threading.get_ident()
+
+    def is_locked(self) -> bool:
+        """Check whether a thread of the process holds the lock."""
+        return self.__owner is not None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *args):
+        self.release()
+
+
+class WalletLocks:
+    """Locks of the users of the wallet at `wallet_path`, and of the wallet file itself.
+
+    Lock files live in the directory `<wallet_path>.locks`. If `wallet_path` is None, the locks only exclude the
+    threads of the process. To avoid deadlocks, the locks of the users of an operation are taken at once by `hold`,
+    always in the same order, and the lock of the wallet file is only held briefly, while reading or writing it.
+    """
+
+    def __init__(self, wallet_path: str | None):
+        self.directory = None
+        if wallet_path is not None:
+            self.directory = Path(f"{wallet_path}.locks")
+            self.directory.mkdir(exist_ok=True)
+        self.file = UserLock(self.__lock_path("wallet"))
+        self.__users = {}
+        self.__guard = threading.Lock()
+
+    def __lock_path(self, name: str) -> Path | None:
+        return self.directory / f"{name}.lock" if self.directory is not None else None
+
+    def user(self, name: str) -> UserLock:
+        """Return the lock of the user `name`."""
+        with self.__guard:
+            if name not in self.__users:
+                self.__users[name] = UserLock(self.__lock_path(f"user_{name}"))
+            return self.__users[name]
+
+    @contextmanager
+    def hold(self, names: list[str]):
+        """Hold the locks of the users `names`, taken in sorted order. Yield the names whose lock was not already held
+        by the calling thread."""
+        taken = []
+        acquired = []
+        try:
+            for name in sorted(set(names)):
+                lock = self.user(name)
+                if lock.acquire():
+                    acquired.append(name)
+                taken.append(lock)
+            yield acquired
+        finally:
+            for lock in reversed(taken):
+                lock.release()
+
+
+_wallet_locks = {}
+_wallet_locks_guard = threading.Lock()
+
+
+def get_wallet_locks(wallet_path: str | None) -> WalletLocks:
+    """Return the locks of the wallet at `wallet_path`, shared by the whole process: `flock` locks are held per open
+    file, so two lock files opened by the same process for the same user would block each other."""
+    key = str(Path(wallet_path).resolve()) if wallet_path is not None else None
+    with _wallet_locks_guard:
+        if key not in _wallet_locks:
+            _wallet_locks[key] = WalletLocks(wallet_path)
+        return _wallet_locks[key]
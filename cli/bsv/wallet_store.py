@@ -0,0 +1,200 @@
+"""SQLite store of the data of a `WalletManager`."""
+from pathlib import Path
+import sqlite3
+
+WALLET_STORE_SUFFIXES = (".db", ".sqlite", ".sqlite3")
+
+# Each record is a row keyed by the record itself: tokens by their genesis outpoint, funding UTXOs by their outpoint,
+# burnt tokens by their serialisation. Rows of a user are returned in insertion order (rowid).
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    name TEXT PRIMARY KEY,
+    position INTEGER NOT NULL,
+    bsv_wallet TEXT NOT NULL,
+    sui_address TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tokens (
+    genesis TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    token TEXT NOT NULL,
+    pegout TEXT,
+    zk_proof_path TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS tokens_by_name ON tokens (name);
+CREATE TABLE IF NOT EXISTS funding_utxos (
+    outpoint TEXT PRIMARY KEY,
+    name TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS funding_utxos_by_name ON funding_utxos (name);
+CREATE TABLE IF NOT EXISTS burnt_tokens (
+    burnt_token TEXT PRIMARY KEY,
+    name TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS burnt_tokens_by_name ON burnt_tokens (name);
+"""
+
+
+def is_wallet_store(path: str | Path) -> bool:
+    """Check whether `path` is the path of a wallet store (as opposed to a JSON wallet), from its suffix."""
+    return Path(path).suffix in WALLET_STORE_SUFFIXES
+
+
+def _to_records(user_data: dict) -> dict:
+    """Split the data of a user, as in `wallet.json`, into records keyed by outpoint."""
+    pegouts = user_data["pegout_utxos"]
+    return {
+        "bsv_wallet": user_data["bsv_wallet"],
+        "sui_address": user_data["sui_address"],
+        "tokens": {
+            genesis: (token, pegouts[i] if i < len(pegouts) else None, zk_proof_path)
+            for (i, (genesis, token, zk_proof_path)) in enumerate(
+                zip(user_data["genesis_utxos"], user_data["token_utxos"], user_data["zk_proof_paths"], strict=True)
+            )
+        },
+        "funding_utxos": dict.fromkeys(user_data["funding_utxos"]),
+        "burnt_tokens": dict.fromkeys(user_data["burnt_tokens"]),
+    }
+
+
+def _to_user_data(records: dict) -> dict:
+    # Tokens without a pegout UTXO go last, so that the pegout UTXOs line up with the other lists
+    tokens = sorted(records["tokens"].items(), key=lambda item: item[1][1] is None)
+    return {
+        "bsv_wallet": records["bsv_wallet"],
+        "sui_address": records["sui_address"],
+        "genesis_utxos": [genesis for (genesis, _) in tokens],
+        "token_utxos": [token for (_, (token, _, _)) in tokens],
+        "pegout_utxos": [pegout for (_, (_, pegout, _)) in tokens if pegout is not None],
+        "zk_proof_paths": [zk_proof_path for (_, (_, _, zk_proof_path)) in tokens],
+        "funding_utxos": list(records["funding_utxos"]),
+        "burnt_tokens": list(records["burnt_tokens"]),
+    }
+
+
+class WalletStore:
+    """Wallet data in a SQLite database in WAL mode.
+
+    The data has the same structure as `wallet.json`: a dict mapping each user name to its keys and to its lists of
+    records. The store remembers the records it last loaded or saved for each user, so `save` only inserts, updates
+    and deletes the records that changed since, and it writes all of them in a single transaction: either every
+    change of an operation is committed, or none is.
+    """
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self.connection = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=FULL")
+        self.connection.executescript(SCHEMA)
+        self.saved = {}
+
+    def close(self):
+        self.connection.close()
+
+    def load(self, names: list[str] | None = None) -> dict:
+        """Return the data of the users `names` in the store (of all the users if None). Users not in the store are
+        left out."""
+        if names is None:
+            rows = self.connection.execute("SELECT name, bsv_wallet, sui_address FROM users ORDER BY position").fetchall()
+        else:
+            rows = [
+                row
+                for name in names
+                for row in self.connection.execute("SELECT name, bsv_wallet, sui_address FROM users WHERE name = ?", (name,))
+            ]
+
+        data = {}
+        for (name, bsv_wallet, sui_address) in rows:
+            records = {"bsv_wallet": bsv_wallet, "sui_address": sui_address}
+            records["tokens"] = {
+                genesis: (token, pegout, zk_proof_path)
+                for (genesis, token, pegout, zk_proof_path) in self.connection.execute(
+                    "SELECT genesis, token, pegout, zk_proof_path FROM tokens WHERE name = ? ORDER BY rowid", (name,)
+                )
+            }
+            records["funding_utxos"] = dict.fromkeys(
+                outpoint for (outpoint,) in self.connection.execute(
+                    "SELECT outpoint FROM funding_utxos WHERE name = ? ORDER BY rowid", (name,)
+                )
+            )
+            records["burnt_tokens"] = dict.fromkeys(
+                burnt_token for (burnt_token,) in self.connection.execute(
+                    "SELECT burnt_token FROM burnt_tokens WHERE name = ? ORDER BY rowid", (name,)
+                )
+            )
+            self.saved[name] = records
+            data[name] = _to_user_data(records)
+
+        return data
+
+    def save(self, data: dict):
+        """Write the records of the users in `data` that changed since they were last loaded or saved, in a single
+        transaction. Users not in `data` are left as they are."""
+        changes = []
+        for (name, user_data) in data.items():
+            records = _to_records(user_data)
+            saved = self.saved.get(name)
+            if saved != records:
+                changes.append((name, saved, records))
+
+        if not changes:
+            return
+
+        with self.connection:
+            self.connection.execute("BEGIN IMMEDIATE")
+            for (name, saved, records) in changes:
+                self.__write_user(name, saved, records)
+
+        for (name, _, records) in changes:
+            self.saved[name] = records
+
+        return
+
+    def remove(self, names: list[str]):
+        """Delete the users `names` and their records."""
+        with self.connection:
+            self.connection.execute("BEGIN IMMEDIATE")
+            for name in names:
+                for table in ("users", "tokens", "funding_utxos", "burnt_tokens"):
+                    self.connection.execute(f"DELETE FROM {table} WHERE name = ?", (name,))
+                self.saved.pop(name, None)
+
+        return
+
+    def __write_user(self, name: str, saved: dict | None, records: dict):
+        if saved is None or (saved["bsv_wallet"], saved["sui_address"]) != (records["bsv_wallet"], records["sui_address"]):
+            # New users go after the existing ones
+            self.connection.execute(
+                "INSERT INTO users (name, position, bsv_wallet, sui_address) "
+                "VALUES (?, (SELECT COALESCE(MAX(position) + 1, 0) FROM users), ?, ?) "
+                "ON CONFLICT (name) DO UPDATE SET bsv_wallet = excluded.bsv_wallet, sui_address = excluded.sui_address",
+                (name, records["bsv_wallet"], records["sui_address"]),
+            )
+        saved_tokens = saved["tokens"] if saved is not None else {}
+        # A token that moved to another user is deleted only if that user has not claimed it yet
+        self.connection.executemany(
+            "DELETE FROM tokens WHERE genesis = ? AND name = ?",
+            [(genesis, name) for genesis in saved_tokens if genesis not in records["tokens"]],
+        )
+        for (genesis, (token, pegout, zk_proof_path)) in records["tokens"].items():
+            if saved_tokens.get(genesis) == (token, pegout, zk_proof_path):
+                continue
+            # A token received from another user is reinserted, so that it comes last among the tokens of `name`
+            self.connection.execute("DELETE FROM tokens WHERE genesis = ? AND name != ?", (genesis, name))
+            self.connection.execute(
+                "INSERT INTO tokens (genesis, name, token, pegout, zk_proof_path) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (genesis) DO UPDATE SET token = excluded.token, pegout = excluded.pegout, zk_proof_path = excluded.zk_proof_path",
+                (genesis, name, token, pegout, zk_proof_path),
+            )
+        for (table, column) in (("funding_utxos", "outpoint"), ("burnt_tokens", "burnt_token")):
+            saved_values = saved[table] if saved is not None else {}
+            self.connection.executemany(
+                f"DELETE FROM {table} WHERE {column} = ? AND name = ?",
+                [(value, name) for value in saved_values if value not in records[table]],
+            )
+            self.connection.executemany(
+                f"INSERT OR REPLACE INTO {table} ({column}, name) VALUES (?, ?)",
+                [(value, name) for value in records[table] if value not in saved_values],
+            )
+
+        return
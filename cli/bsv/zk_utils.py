@@ -1,4 +1,6 @@
+import hashlib
 import sys
+from functools import lru_cache
 from pathlib import Path
 
 sys.path.append(str(Path(__file__).parent.parent.parent / "zkscript_package"))
@@ -6,33 +8,121 @@ sys.path.append(str(Path(__file__).parent.parent.parent / "zkscript_package"))
 from elliptic_curves.data_structures.vk import PreparedVerifyingKey
 from elliptic_curves.data_structures.zkscript import ZkScriptVerifyingKey
 from elliptic_curves.instantiations.mnt4_753.mnt4_753 import MNT4_753, VerifyingKeyMnt4753
-from tx_engine import SIGHASH, Tx, TxOut, Wallet
+from tx_engine import SIGHASH, Script, Tx, TxOut, Wallet
 
 from src.zkscript.groth16.mnt4_753.mnt4_753 import mnt4_753
 from src.zkscript.reftx.reftx import RefTx
 from src.zkscript.script_types.locking_keys.reftx import RefTxLockingKey
 
+from bsv.cache import DiskCache, LRUCache
+
 ScalarFieldMNT4 = MNT4_753.scalar_field
 
+VK_PATH = Path(__file__).parent.parent.parent / "zk_engine/data/pob_engine/keys/vk.bin"
+ZK_CACHE_PATH = Path(__file__).parent.parent / "zk_cache"
+ZK_CACHE_MAX_ENTRIES = 512
 
-def load_and_process_vk(genesis_txid: bytes) -> list[VerifyingKeyMnt4753, PreparedVerifyingKey, ZkScriptVerifyingKey]:
-    genesis_txid_as_input = int.from_bytes(genesis_txid, "little")
-    
-    with open(str(Path(__file__).parent.parent.parent / "zk_engine/data/pob_engine/keys/vk.bin"), "rb") as f:
+# Processed verifying keys and PoB locking scripts, keyed by (hash of vk.bin, genesis txid)
+processed_vk_cache = LRUCache(16)
+pob_locking_script_cache = LRUCache(64)
+processed_vk_disk_cache = DiskCache(ZK_CACHE_PATH / "processed_vk", ZK_CACHE_MAX_ENTRIES)
+pob_locking_script_disk_cache = DiskCache(ZK_CACHE_PATH / "pob_locking_script", ZK_CACHE_MAX_ENTRIES)
+
+
+@lru_cache(maxsize=4)
+def _vk_digest(path: Path, mtime_ns: int, size: int) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def vk_digest() -> str:
+    """Hash of the current `vk.bin`. It is recomputed only if the file changes."""
+    stat = VK_PATH.stat()
+    return _vk_digest(VK_PATH, stat.st_mtime_ns, stat.st_size)
+
+
+@lru_cache(maxsize=1)
+def load_vk(digest: str) -> VerifyingKeyMnt4753:
+    """Deserialise `vk.bin`, whose hash is `digest`. Deserialisation happens once per process."""
+    with open(VK_PATH, "rb") as f:
         vk_bytes = list(f.read())
-        vk = VerifyingKeyMnt4753.deserialise(vk_bytes[8:])
+        return VerifyingKeyMnt4753.deserialise(vk_bytes[8:])
+
+
+def _cache_key(genesis_txid: bytes) -> str:
+    return hashlib.sha256(bytes.fromhex(vk_digest()) + genesis_txid).hexdigest()
+
+
+def _process_vk(genesis_txid: bytes) -> list[VerifyingKeyMnt4753, PreparedVerifyingKey, ZkScriptVerifyingKey]:
+    genesis_txid_as_input = int.from_bytes(genesis_txid, "little")
+    vk = load_vk(vk_digest())
+
+    # Precompute locking data
+    precomputed_l_out = vk.gamma_abc[0] + vk.gamma_abc[1].multiply(genesis_txid_as_input)
+    # Modified gamma_abc
+    gamma_abc_mod = [precomputed_l_out, *vk.gamma_abc[2:]]
+    # Modified vk
+    vk_mod = VerifyingKeyMnt4753(vk.alpha, vk.beta, vk.gamma, vk.delta, gamma_abc_mod)
+    # Prepare the vk
+    cache_vk = vk_mod.prepare()
+    prepared_vk = vk_mod.prepare_for_zkscript(cache_vk)
 
-        # Precompute locking data
-        precomputed_l_out = vk.gamma_abc[0] + vk.gamma_abc[1].multiply(genesis_txid_as_input)
-        # Modified gamma_abc
-        gamma_abc_mod = [precomputed_l_out, *vk.gamma_abc[2:]]
-        # Modified vk
-        vk_mod = VerifyingKeyMnt4753(vk.alpha, vk.beta, vk.gamma, vk.delta, gamma_abc_mod)
-        # Prepare the vk
-        cache_vk = vk_mod.prepare()
-        prepared_vk = vk_mod.prepare_for_zkscript(cache_vk)
+    return vk_mod, cache_vk, prepared_vk
 
-        return vk_mod, cache_vk, prepared_vk
+
+def _serialise_processed_vk(processed_vk: list[VerifyingKeyMnt4753, PreparedVerifyingKey, ZkScriptVerifyingKey]) -> bytes:
+    # Each part is serialised by the curve library, and prefixed with its length as a u32
+    parts = [bytes(part.serialise()) for part in processed_vk]
+    return b"".join(len(part).to_bytes(4, "little") + part for part in parts)
+
+
+def _deserialise_processed_vk(serialised: bytes) -> list[VerifyingKeyMnt4753, PreparedVerifyingKey, ZkScriptVerifyingKey]:
+    parts = []
+    offset = 0
+    while offset < len(serialised):
+        if offset + 4 > len(serialised):
+            raise ValueError("Truncated length prefix")
+        length = int.from_bytes(serialised[offset:offset + 4], "little")
+        offset += 4
+        if offset + length > len(serialised):
+            raise ValueError("Truncated part")
+        parts.append(list(serialised[offset:offset + length]))
+        offset += length
+    if len(parts) != 3:
+        raise ValueError(f"Expected 3 parts, found {len(parts)}")
+    return [
+        VerifyingKeyMnt4753.deserialise(parts[0]),
+        PreparedVerifyingKey.deserialise(parts[1]),
+        ZkScriptVerifyingKey.deserialise(parts[2]),
+    ]
+
+
+def load_and_process_vk(genesis_txid: bytes) -> list[VerifyingKeyMnt4753, PreparedVerifyingKey, ZkScriptVerifyingKey]:
+    """Return the verifying key of the PoB engine with the public input `genesis_txid` precomputed, together with
+    its preparations for proof verification and for zkScript.
+
+    Results are cached in memory and on disk, keyed by the hash of `vk.bin` and by `genesis_txid`.
+    """
+    key = _cache_key(genesis_txid)
+    processed_vk = processed_vk_cache.get(key)
+    if processed_vk is not None:
+        return processed_vk
+
+    serialised = processed_vk_disk_cache.get(key)
+    if serialised is not None:
+        try:
+            processed_vk = _deserialise_processed_vk(serialised)
+        except ValueError as e:
+            print(f"Dropping corrupt processed verifying key {key} from {processed_vk_disk_cache.path}: {e}")
+            processed_vk_disk_cache.delete(key)
+
+    if processed_vk is None:
+        processed_vk = _process_vk(genesis_txid)
+        processed_vk_disk_cache.put(key, _serialise_processed_vk(processed_vk))
+
+    processed_vk_cache.put(key, processed_vk)
+
+    return processed_vk
 
 
 def generate_pob_utxo(
@@ -61,4 +151,24 @@ def generate_pob_utxo(
         check_constant=True,
     )
 
-    return TxOut(amount=1, script_pubkey=lock)
\ No newline at end of file
+    return TxOut(amount=1, script_pubkey=lock)
+
+
+def generate_pob_utxo_for_genesis(genesis_txid: bytes) -> TxOut:
+    """Generate the PoB output for the token created in `genesis_txid`.
+
+    The locking script is cached in memory and on disk, keyed by the hash of `vk.bin` and by `genesis_txid`.
+    """
+    key = _cache_key(genesis_txid)
+    lock = pob_locking_script_cache.get(key)
+    if lock is None:
+        serialised = pob_locking_script_disk_cache.get(key)
+        if serialised is not None:
+            lock = Script.parse(serialised)
+        else:
+            vk, _, prepared_vk = load_and_process_vk(genesis_txid)
+            lock = generate_pob_utxo(vk, prepared_vk).script_pubkey
+            pob_locking_script_disk_cache.put(key, lock.serialize())
+        pob_locking_script_cache.put(key, lock)
+
+    return TxOut(amount=1, script_pubkey=lock)
@@ -1,15 +1,22 @@
 import argparse
+from concurrent.futures import ThreadPoolExecutor
+import json
 from pathlib import Path
-import requests
 import subprocess
-import toml
 import sys
 
 sys.path.append(str(Path(__file__).parent.parent / "zkscript_package"))
                 
+from bsv import handoff
+from bsv.bridge_client import get_bridge_client
 from bsv.wallet import WalletManager
 from bsv.block_header import BlockHeader, MerkleProof
-from bsv.utils import tx_from_id, setup_network_connection
+from bsv.header_store import HeaderStore
+from bsv.merkle_tree import get_merkle_proof_cache
+from bsv.network import get_bulk_tx_data
+from bsv.pipeline import StageTimer
+from bsv.tx_store import get_tx_store
+from bsv.utils import raw_tx_from_id, setup_network_connection
 from tx_engine.interface.interface_factory import WoCInterface, RPCInterface
 
 # TCP
@@ -18,18 +25,34 @@ OUTPUT_INDEX = 0
 
 
 # Commands
-ADD_BRIDGE_ENTRY_COMMAND = "cargo run -- add-bridge-entry"
-PEGIN_COMMAND = "cargo run -- pegin-with-chunks"
-PEGOUT_COMMAND = "cargo run -- pegout-with-chunks"
-
-def get_bulk_tx_data(txid: str, network: WoCInterface | RPCInterface):
-    if isinstance(network, WoCInterface):
-        network_str = "test" if network.is_testnet() else "main"
-    else:
-        network_str = "test"
-    api_request = f"https://api.whatsonchain.com/v1/bsv/{network_str}/txs/hex"
-    payload = { "txids": [txid] }
-    return requests.post(url = api_request, json = payload)
+ADD_BRIDGE_ENTRIES_COMMAND = "add-bridge-entries"
+PEGIN_BATCH_COMMAND = "pegin-with-chunks-batch"
+PEGOUT_COMMAND = "pegout-with-chunks"
+CONFIG_FILES_PATH = Path(__file__).parent / "sui/config_files"
+DEFAULT_WALLET_PATH = "./wallet.json"
+# Proofs generated at the same time during a pegin or a batch of transfers
+MAX_CONCURRENT_PROOFS = 4
+
+def get_block_height(block_hash: str, network_name: str, network: WoCInterface | RPCInterface) -> int:
+    # Look up the local header store first, and fall back to the network for blocks it does not hold
+    block_height = HeaderStore.for_network(network_name).height_of(bytes.fromhex(block_hash)[::-1])
+    if block_height is None:
+        block_height = network.get_block_header(block_hash)["height"]
+    return block_height
+
+def get_merkle_root(block_hash: str, network_name: str, network: WoCInterface | RPCInterface) -> bytes:
+    # Look up the local header store first, and fall back to the network for blocks it does not hold
+    header_store = HeaderStore.for_network(network_name)
+    block_height = header_store.height_of(bytes.fromhex(block_hash)[::-1])
+    if block_height is not None:
+        return header_store.view(block_height).hash_merkle_root
+    return bytes.fromhex(network.get_block_header(block_hash)["merkleroot"])[::-1]
+
+def positive_int(value: str) -> int:
+    number = int(value)
+    if number <= 0:
+        raise argparse.ArgumentTypeError(f"{value} is not a positive integer")
+    return number
 
 def map_user_to_index(user_name: str, wallet_manager: WalletManager) -> int:
     return wallet_manager.names.index(user_name)
@@ -84,178 +107,208 @@ def setup(wallet_manager: WalletManager):
 
     return
     
-def pegin(wallet_manager: WalletManager, user_name: str, pegin_amount: int):
+def pegin(wallet_manager: WalletManager, user_name: str, pegin_amount: int, count: int = 1):
+    """Peg in `pegin_amount` for each of `count` new tokens."""
     user = map_user_to_index(user_name, wallet_manager)
     issuer_index = map_user_to_index("issuer", wallet_manager)
+    timer = StageTimer()
 
-    # Generate genesis
-    print(f"\nGenerating genesis transaction...")
+    # Generate genesis. The TCP circuit requires the token to be output 0 of its genesis transaction, so each token
+    # gets its own genesis transaction, each funded by the change of the previous one
+    print(f"\nGenerating {count} genesis transaction(s)...")
 
-    wallet_manager.generate_genesis_for_pegin(user)
-    wallet_manager.save_wallet("./wallet.json")
+    genesis_txids = [
+        timer.timed("genesis broadcast", wallet_manager.broadcast_genesis_for_pegin, user) for _ in range(count)
+    ]
+    wallet_manager.save_wallet()
+    genesis_utxos = [wallet_manager.tokens.get(genesis_txid).genesis for genesis_txid in genesis_txids]
 
-    print(f"\nGenesis transaction generated at: {wallet_manager.genesis_utxos[user][-1]}")
+    print(f"\nGenesis transaction(s) generated at: {genesis_utxos}")
 
     conditional_generate_block(wallet_manager.network)
 
-    # Generate pegout
-    print(f"\nGenerating pegout UTXO...")
+    # The genesis proofs only depend on the genesis txids: generate them while the pegout UTXOs are created and the
+    # bridge is updated
+    max_workers = wallet_manager.prover.max_concurrent_jobs(min(count, MAX_CONCURRENT_PROOFS))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        genesis_proofs = [
+            executor.submit(timer.timed, "genesis proof", wallet_manager.prove_genesis, genesis_txid)
+            for genesis_txid in genesis_txids
+        ]
+
+        # Generate pegout
+        print(f"\nGenerating pegout UTXO(s)...")
+
+        timer.timed("pegout UTXO", wallet_manager.generate_pegouts, user, issuer_index, genesis_txids)
+        wallet_manager.save_wallet()
+        pegout_utxos = [wallet_manager.tokens.get(genesis_txid).pegout for genesis_txid in genesis_txids]
+
+        print(f"\nPegout UTXO(s) generated at: {pegout_utxos}")
+
+        conditional_generate_block(wallet_manager.network)
+
+        # Save data to file
+        print(f"\nAdd bridge entries...")
+
+        data = {
+            "entries": [
+                {
+                    "genesis_txid" : bytes.fromhex(genesis_utxo.prev_tx),
+                    "genesis_index" : genesis_utxo.prev_index,
+                    "pegout_txid" : bytes.fromhex(pegout_utxo.prev_tx),
+                    "pegout_index" : pegout_utxo.prev_index
+                }
+                for (genesis_utxo, pegout_utxo) in zip(genesis_utxos, pegout_utxos)
+            ]
+        }
+        handoff.dump(data, handoff.BRIDGE_ENTRIES, CONFIG_FILES_PATH / "config_add_bridge_entries")
 
-    wallet_manager.generate_pegout(user, issuer_index, -1)
-    wallet_manager.save_wallet("./wallet.json")
-    
-    print(f"\nPegout UTXO generated at: {wallet_manager.pegout_utxos[user][-1]}")
+        # The bridge entries must be sent by the address that published the bridge contract
+        admin_sui_address = get_sui_address(wallet_manager, "issuer")
 
-    conditional_generate_block(wallet_manager.network)
+        # Add the bridge entries in a single Sui transaction
+        timer.timed("add bridge entries", get_bridge_client().run, ADD_BRIDGE_ENTRIES_COMMAND, sender=admin_sui_address)
+        print(f"Added bridge entries:" + "".join(f"\n\tgenesis: {genesis_utxo}\n\tpegout: {pegout_utxo}" for (genesis_utxo, pegout_utxo) in zip(genesis_utxos, pegout_utxos)))
 
-    # Save data to file
-    print(f"\nAdd bridge entry...")
-
-    data = {
-        "genesis_txid" : wallet_manager.genesis_utxos[user][-1].prev_tx,
-        "genesis_index" : wallet_manager.genesis_utxos[user][-1].prev_index,
-        "pegout_txid" : wallet_manager.pegout_utxos[user][-1].prev_tx,
-        "pegout_index" : wallet_manager.pegout_utxos[user][-1].prev_index
-    }
-    with open(str(Path(__file__).parent / "sui/config_files/config_add_bridge_entry.toml"), "w") as file:
-        toml.dump(data, file)
 
-    #switch to admin to add bridge entry. This address should be the same as the address that is used to publish the bridge contract
-    admin_sui_address = get_sui_address(wallet_manager, "issuer")
-    run_sui_command(["client", "switch", "--address", f"{admin_sui_address}"])
+        # Save data to file
+        print(f"Pegin...")
 
-    # Add bridge entry
-    subprocess.run(
-            f"cd {Path(__file__).parent / "sui"} && {ADD_BRIDGE_ENTRY_COMMAND}",
-            shell=True,
-            check=True,
-            text=True,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE
-        )
-    print(f"Added bridge entry: \n\tgenesis: {wallet_manager.genesis_utxos[user][-1]}\n\tpegout: {wallet_manager.pegout_utxos[user][-1]}")
+        data = {
+            "pegins": [
+                {
+                    "genesis_txid" : bytes.fromhex(genesis_utxo.prev_tx),
+                    "genesis_index" : genesis_utxo.prev_index,
+                    "pegin_amount" : pegin_amount,
+                }
+                for genesis_utxo in genesis_utxos
+            ]
+        }
+        handoff.dump(data, handoff.PEGINS, CONFIG_FILES_PATH / "config_pegin_batch")
 
+        user_sui_address = get_sui_address(wallet_manager, user_name)
 
-    # Save data to file
-    print(f"Pegin...")
+        # Pegin, in a single Sui transaction
+        timer.timed("pegin", get_bridge_client().run, PEGIN_BATCH_COMMAND, sender=user_sui_address)
+        print(f"\nSuccessfully pegged in for" + "".join(f"\n\tgenesis: {genesis_utxo}" for genesis_utxo in genesis_utxos))
 
-    data = {
-        "genesis_txid" : wallet_manager.genesis_utxos[user][-1].prev_tx,
-        "genesis_index" : wallet_manager.genesis_utxos[user][-1].prev_index,
-        "pegin_amount" : pegin_amount,
-    }
-    with open(str(Path(__file__).parent / "sui/config_files/config_pegin.toml"), "w") as file:
-        toml.dump(data, file)
+        # Wait for the proofs: the tokens cannot be transferred without them
+        for genesis_proof in genesis_proofs:
+            genesis_proof.result()
 
-    user_sui_address = get_sui_address(wallet_manager, user_name)
-    run_sui_command(["client", "switch", "--address", f"{user_sui_address}"])
-
-    # Pegin
-    subprocess.run(
-            f"cd {Path(__file__).parent / "sui"} && {PEGIN_COMMAND}",
-            shell=True,
-            check=True,
-            text=True,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE
-        )
-    print(f"\nSuccessfully pegged in for \n\tgenesis: {wallet_manager.genesis_utxos[user][-1]}")
+    print(f"\n{timer.report()}")
 
     return
 
-def pegout_for_regtest(wallet_manager: WalletManager, user_name: str, token_index: int, blockhash: str, block_height: int):
+def pegout_for_regtest(wallet_manager: WalletManager, user_name: str, token_id: str, blockhash: str, block_height: int, network_name: str):
     user = map_user_to_index(user_name, wallet_manager)
-    burnt_token = wallet_manager.burnt_tokens[user][token_index]
-    burning_tx = tx_from_id(burnt_token.burning_txid, wallet_manager.network)
-    merkle_proof = MerkleProof.get_merkle_proof(blockhash, burnt_token.burning_txid, wallet_manager.network)
+    burnt_token = wallet_manager.get_burnt_token(user, token_id)
+    # The serialised tx is forwarded as is: there is no need to parse it
+    raw_burning_tx = raw_tx_from_id(burnt_token.burning_txid, wallet_manager.network)
+    merkle_proof = get_merkle_proof_cache().get_merkle_proof(blockhash, burnt_token.burning_txid, wallet_manager.network)
+    merkle_root = get_merkle_root(blockhash, network_name, wallet_manager.network)
+    assert MerkleProof.validate_many([merkle_proof], [burnt_token.burning_txid], [merkle_root])[0], f"Invalid Merkle proof for transaction {burnt_token.burning_txid}"
 
     # Pegout
     print(f"\nPegout...")
 
     data = {
-        "genesis_txid" : burnt_token.genesis_txid,
+        "genesis_txid" : bytes.fromhex(burnt_token.genesis_txid),
         "genesis_index" : OUTPUT_INDEX,
-        "burning_tx" : burning_tx.serialize().hex(),
+        "burning_tx" : raw_burning_tx,
         "block_height" : block_height,
         "merkle_proof" : {
             "positions" : merkle_proof.positions(),
-            "hashes" : [node.hex() for node in merkle_proof.nodes],
+            "hashes" : merkle_proof.nodes,
         }
     }
-    with open(str(Path(__file__).parent / "sui/config_files/config_pegout.toml"), "w") as file:
-        toml.dump(data, file)
+    handoff.dump(data, handoff.PEGOUT, CONFIG_FILES_PATH / "config_pegout")
 
-    subprocess.run(
-            f"cd {Path(__file__).parent / "sui"} && {PEGOUT_COMMAND}",
-            shell=True,
-            check=True,
-            text=True,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE
-        )
+    get_bridge_client().run(PEGOUT_COMMAND, sender=get_sui_address(wallet_manager, user_name))
     print(f"\nSuccessfully pegged out for \n\tgenesis: {burnt_token.genesis_txid}")
 
     return
 
-def pegout(wallet_manager: WalletManager, user_name: str, token_index: int):  
+def pegout(wallet_manager: WalletManager, user_name: str, token_id: str, network_name: str):  
     user = map_user_to_index(user_name, wallet_manager)
-    burnt_token = wallet_manager.burnt_tokens[user][token_index]
-    burning_tx = tx_from_id(burnt_token.burning_txid, wallet_manager.network)
-    bulk_tx_data = get_bulk_tx_data(burnt_token.burning_txid, wallet_manager.network).json()
+    burnt_token = wallet_manager.get_burnt_token(user, token_id)
+    bulk_tx_data = get_bulk_tx_data([burnt_token.burning_txid], wallet_manager.network).json()
+    # The bulk data already contains the burning transaction, which is forwarded as is
+    raw_burning_tx = bytes.fromhex(bulk_tx_data[0]["hex"])
+    get_tx_store().put_raw(raw_burning_tx, burnt_token.burning_txid)
     block_height = bulk_tx_data[0]["blockheight"]
-    merkle_proof = MerkleProof.get_merkle_proof(bulk_tx_data[0]["blockhash"], burnt_token.burning_txid, wallet_manager.network)
+    merkle_proof = get_merkle_proof_cache().get_merkle_proof(bulk_tx_data[0]["blockhash"], burnt_token.burning_txid, wallet_manager.network)
+    merkle_root = get_merkle_root(bulk_tx_data[0]["blockhash"], network_name, wallet_manager.network)
+    assert MerkleProof.validate_many([merkle_proof], [burnt_token.burning_txid], [merkle_root])[0], f"Invalid Merkle proof for transaction {burnt_token.burning_txid}"
 
     # Pegout
     print(f"\nPegout...")
 
     data = {
-        "genesis_txid" : burnt_token.genesis_txid,
+        "genesis_txid" : bytes.fromhex(burnt_token.genesis_txid),
         "genesis_index" : OUTPUT_INDEX,
-        "burning_tx" : burning_tx.serialize().hex(),
+        "burning_tx" : raw_burning_tx,
         "block_height" : block_height,
         "merkle_proof" : {
             "positions" : merkle_proof.positions(),
-            "hashes" : [node.hex() for node in merkle_proof.nodes],
+            "hashes" : merkle_proof.nodes,
         }
     }
-    with open(str(Path(__file__).parent / "sui/config_files/config_pegout.toml"), "w") as file:
-        toml.dump(data, file)
+    handoff.dump(data, handoff.PEGOUT, CONFIG_FILES_PATH / "config_pegout")
 
-    subprocess.run(
-            f"cd {Path(__file__).parent / "sui"} && {PEGOUT_COMMAND}",
-            shell=True,
-            check=True,
-            text=True,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE
-        )
+    get_bridge_client().run(PEGOUT_COMMAND, sender=get_sui_address(wallet_manager, user_name))
     print(f"\nSuccessfully pegged out for \n\tgenesis: {burnt_token.genesis_txid}")
 
     return
     
-def transfer(wallet_manager: WalletManager, sender_name: str, receiver_name: str, token_index: int):
+def transfer(wallet_manager: WalletManager, sender_name: str, receiver_name: str, token_id: str):
     sender = map_user_to_index(sender_name, wallet_manager)
     receiver = map_user_to_index(receiver_name, wallet_manager)
 
     print(f"Transferring from {sender_name} to {receiver_name}")
-    wallet_manager.transfer_token(sender, receiver, token_index)
-    wallet_manager.save_wallet("./wallet.json")
-    print(f"Successfully transferred token in {wallet_manager.token_utxos[receiver][-1].prev_tx}")
+    wallet_manager.transfer_token(sender, receiver, token_id)
+    wallet_manager.save_wallet()
+    print(f"Successfully transferred token in {wallet_manager.tokens.get(token_id).token.prev_tx}")
 
     return
 
-def burn(wallet_manager: WalletManager, user_name: str, token_index: int):
+def transfer_batch(wallet_manager: WalletManager, moves_path: str, max_proofs: int):
+    """Perform the moves in the JSON file `moves_path`, a list of {"sender": str, "receiver": str, "token_id": str}."""
+    with open(moves_path, "r") as f:
+        moves = json.load(f)
+
+    print(f"Transferring {len(moves)} token(s)")
+    (txids, proof_errors) = wallet_manager.transfer_tokens(
+        [
+            (map_user_to_index(move["sender"], wallet_manager), map_user_to_index(move["receiver"], wallet_manager), move["token_id"])
+            for move in moves
+        ],
+        max_proofs,
+    )
+    for (move, txid) in zip(moves, txids):
+        status = f"transferred in {txid}" if txid is not None else "rejected"
+        print(f"\t{move['token_id']}: {move['sender']} -> {move['receiver']}: {status}")
+    for (token_id, error) in proof_errors.items():
+        print(f"\t{token_id}: transferred, but its proof failed: {error}")
+
+    rejected = txids.count(None)
+    assert rejected == 0, f"{rejected} transfer(s) rejected"
+    assert len(proof_errors) == 0, f"Proof failed for {len(proof_errors)} token(s)"
+    print(f"Successfully transferred {len(txids)} token(s)")
+
+    return
+
+def burn(wallet_manager: WalletManager, user_name: str, token_id: str, network_name: str):
     user = map_user_to_index(user_name, wallet_manager)
 
-    print(f"\nBurning token generated at {wallet_manager.genesis_utxos[user][token_index].prev_tx}")
+    print(f"\nBurning token generated at {token_id}")
 
-    wallet_manager.burn_token(user, token_index)
-    wallet_manager.save_wallet("./wallet.json")
+    wallet_manager.burn_token(user, token_id)
+    wallet_manager.save_wallet()
 
     conditional_generate_block(wallet_manager.network)
     blockhash = wallet_manager.network.get_best_block_hash()
-    blockheader = wallet_manager.network.get_block_header(blockhash)
-    blockheight = blockheader.get("height")
+    blockheight = get_block_height(blockhash, network_name, wallet_manager.network)
 
     print(f"\nToken successfully burned at transaction {wallet_manager.burnt_tokens[user][-1].burning_txid} \nblock height {blockheight} \nblock hash {blockhash}")
 
@@ -277,6 +330,7 @@ def get_sui_address(wallet_manager: WalletManager, user_name: str):
 
 def main():
     parser = argparse.ArgumentParser(description="CLI for tcpBridge")
+    parser.add_argument("--wallet", type=str, default=DEFAULT_WALLET_PATH, help=f"The wallet: a JSON file, or a wallet store if it ends in .db, .sqlite or .sqlite3 (default: {DEFAULT_WALLET_PATH})")
     subparsers = parser.add_subparsers(dest="command", required=True, help="Available commands")
 
     # Setup command
@@ -288,26 +342,33 @@ def main():
     pegin_parser.add_argument("--user", type=str, required=True, help="The user name")
     pegin_parser.add_argument("--pegin-amount", type=int, required=True, help="The pegin amount")
     pegin_parser.add_argument("--network", type=str, required=True, help="The network")
+    pegin_parser.add_argument("--count", type=positive_int, default=1, help="The number of tokens to peg in (default: 1)")
 
     # Pegout command
     pegout_parser = subparsers.add_parser("pegout", help="Execute the pegout command")
     pegout_parser.add_argument("--user", type=str, required=True, help="The user name")
-    pegout_parser.add_argument("--token-index", type=int, required=True, help="The token index")
+    pegout_parser.add_argument("--token-id", type=str, required=True, help="The token id (the genesis txid)")
     pegout_parser.add_argument("--network", type=str, required=True, help="The network")
     pegout_parser.add_argument("--blockhash", type=str, required=False, help="The blockhash")
-    pegout_parser.add_argument("--block_height", type=int, required=False, help="The blockheight")
+    pegout_parser.add_argument("--block_height", type=int, required=False, help="The blockheight (looked up from the blockhash if omitted)")
 
     # Transfer command
     transfer_parser = subparsers.add_parser("transfer", help="Execute the transfer command")
     transfer_parser.add_argument("--sender", type=str, required=True, help="The sender name")
     transfer_parser.add_argument("--receiver", type=str, required=True, help="The receiver name")
-    transfer_parser.add_argument("--token-index", type=int, required=True, help="The token index")
+    transfer_parser.add_argument("--token-id", type=str, required=True, help="The token id (the genesis txid)")
     transfer_parser.add_argument("--network", type=str, required=True, help="The network")
 
+    # Transfer batch command
+    transfer_batch_parser = subparsers.add_parser("transfer-batch", help="Execute many transfers in one pass")
+    transfer_batch_parser.add_argument("--moves", type=str, required=True, help="JSON file with the list of moves: {\"sender\": ..., \"receiver\": ..., \"token_id\": ...}")
+    transfer_batch_parser.add_argument("--max-proofs", type=positive_int, default=MAX_CONCURRENT_PROOFS, help=f"The number of proofs generated at the same time (default: {MAX_CONCURRENT_PROOFS})")
+    transfer_batch_parser.add_argument("--network", type=str, required=True, help="The network")
+
     # Burn command
     burn_parser = subparsers.add_parser("burn", help="Execute the burn command")
     burn_parser.add_argument("--user", type=str, required=True, help="The user name")
-    burn_parser.add_argument("--token-index", type=int, required=True, help="The token index")
+    burn_parser.add_argument("--token-id", type=str, required=True, help="The token id (the genesis txid)")
     burn_parser.add_argument("--network", type=str, required=True, help="The network")
 
     # Update command
@@ -315,12 +376,18 @@ def main():
     update_parser.add_argument("--genesis_height", type=int, required=True, help="The genesis block height in Oracle contract")
     update_parser.add_argument("--network", type=str, required=True, help="The network")
 
+    # Export wallet command
+    export_parser = subparsers.add_parser("export-wallet", help="Copy the wallet to another file, e.g., to convert between JSON and a wallet store")
+    export_parser.add_argument("--output", type=str, required=True, help="The path of the copy: a JSON file, or a wallet store if it ends in .db, .sqlite or .sqlite3")
+    export_parser.add_argument("--network", type=str, required=True, help="The network")
+
     # Parse arguments
     args = parser.parse_args()
 
     # Load wallet
     network = setup_network_connection(args.network)
-    wallet_manager = WalletManager.load_wallet("./wallet.json", network)
+    wallet_manager = WalletManager.load_wallet(args.wallet, network)
+    assert wallet_manager is not None, f"Could not load wallet {args.wallet}"
 
     # Dispatch commands
     if args.command == "setup":
@@ -328,24 +395,28 @@ def main():
             print("WARNING: Setup outside regtest requires getting funding from a faucet.")
         setup(wallet_manager)
     elif args.command == "pegin":
-        pegin(wallet_manager, args.user, args.pegin_amount)
+        pegin(wallet_manager, args.user, args.pegin_amount, args.count)
     elif args.command == "pegout":
-        sui_address = get_sui_address(wallet_manager, args.user)
-        run_sui_command(["client", "switch", "--address", f"{sui_address}"])
         if args.network == "regtest":
             assert args.blockhash is not None, "Pegout for regtest requires blockhash"
-            assert args.block_height is not None, "Pegout for regtest requires block height"
-            pegout_for_regtest(wallet_manager, args.user, args.token_index, args.blockhash, args.block_height)
+            block_height = args.block_height if args.block_height is not None else get_block_height(args.blockhash, args.network, network)
+            pegout_for_regtest(wallet_manager, args.user, args.token_id, args.blockhash, block_height, args.network)
         else:
-            pegout(wallet_manager, args.user, args.token_index)
+            pegout(wallet_manager, args.user, args.token_id, args.network)
     elif args.command == "transfer":
-        transfer(wallet_manager, args.sender, args.receiver, args.token_index)
+        transfer(wallet_manager, args.sender, args.receiver, args.token_id)
+    elif args.command == "transfer-batch":
+        transfer_batch(wallet_manager, args.moves, args.max_proofs)
     elif args.command == "burn":
-        burn(wallet_manager, args.user, args.token_index)
+        burn(wallet_manager, args.user, args.token_id, args.network)
     elif args.command == "update":
         update_oracle(args.genesis_height, args.network)
+    elif args.command == "export-wallet":
+        wallet_manager.save_wallet(args.output)
+        print(f"Wallet exported to {args.output}")
+        return
 
-    wallet_manager.save_wallet("./wallet.json")
+    wallet_manager.save_wallet()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
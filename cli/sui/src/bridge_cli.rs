@@ -5,6 +5,7 @@ use sui_sdk::{
     SuiClient,
     types::{
         Identifier, SUI_CLOCK_OBJECT_ID, SUI_CLOCK_OBJECT_SHARED_VERSION, TypeTag,
+        base_types::SuiAddress,
         programmable_transaction_builder::ProgrammableTransactionBuilder,
         transaction::{ObjectArg, TransactionKind::ProgrammableTransaction},
     },
@@ -13,7 +14,7 @@ use sui_sdk::{
 
 use crate::{
     cli::{BridgeEntry, ElapsedBridgeEntry, Pegin, Pegout},
-    configs::{oracle_config, wallet_config},
+    configs::oracle_config,
     utils::{execute_transaction, get_coin},
 };
 
@@ -21,12 +22,12 @@ const BRIDGE_IDENTIFIER: &str = "tcpbridge";
 
 pub(crate) async fn add(
     client: SuiClient,
+    wallet: &WalletContext,
+    active_address: SuiAddress,
     new_bridge_entry: BridgeEntry,
 ) -> Result<(), anyhow::Error> {
     let (bridge_admin_ref, bridge_obj_arg, bridge_package_id) =
         crate::configs::bridge_config(&client, true).await;
-    let mut wallet = WalletContext::new(wallet_config(), None, None)?;
-    let active_address = wallet.active_address()?;
 
     // Call add
     let mut builder = ProgrammableTransactionBuilder::new();
@@ -35,10 +36,10 @@ pub(crate) async fn add(
     let bridge_admin = builder.obj(ObjectArg::ImmOrOwnedObject(bridge_admin_ref))?;
     let bridge = builder.obj(bridge_obj_arg)?;
 
-    let genesis_txid = builder.pure(hex::decode(new_bridge_entry.genesis_txid)?)?;
+    let genesis_txid = builder.pure(new_bridge_entry.genesis_txid)?;
     let genesis_index = builder.pure(new_bridge_entry.genesis_index)?;
 
-    let pegout_txid = builder.pure(hex::decode(new_bridge_entry.pegout_txid)?)?;
+    let pegout_txid = builder.pure(new_bridge_entry.pegout_txid)?;
     let pegout_index = builder.pure(new_bridge_entry.pegout_index)?;
 
     let clock = builder.obj(ObjectArg::SharedObject {
@@ -67,7 +68,7 @@ pub(crate) async fn add(
     let tx_kind =
         sui_sdk::types::transaction::TransactionKind::ProgrammableTransaction(builder.finish());
     let _response =
-        crate::utils::execute_transaction(client, &wallet, active_address, vec![], tx_kind).await?;
+        crate::utils::execute_transaction(client, wallet, active_address, vec![], tx_kind).await?;
 
     // Print transaction response
     //println!("Transaction executed successfully: {:?}", response);
@@ -75,13 +76,66 @@ pub(crate) async fn add(
     Ok(())
 }
 
+pub(crate) async fn add_batch(
+    client: SuiClient,
+    wallet: &WalletContext,
+    active_address: SuiAddress,
+    new_bridge_entries: Vec<BridgeEntry>,
+) -> Result<(), anyhow::Error> {
+    let (bridge_admin_ref, bridge_obj_arg, bridge_package_id) =
+        crate::configs::bridge_config(&client, true).await;
+
+    // Call add once per entry, all in the same programmable transaction
+    let mut builder = ProgrammableTransactionBuilder::new();
+
+    // Arguments shared by all the calls
+    let bridge_admin = builder.obj(ObjectArg::ImmOrOwnedObject(bridge_admin_ref))?;
+    let bridge = builder.obj(bridge_obj_arg)?;
+
+    let clock = builder.obj(ObjectArg::SharedObject {
+        id: SUI_CLOCK_OBJECT_ID,
+        initial_shared_version: SUI_CLOCK_OBJECT_SHARED_VERSION,
+        mutable: false,
+    })?;
+
+    for new_bridge_entry in new_bridge_entries {
+        let genesis_txid = builder.pure(new_bridge_entry.genesis_txid)?;
+        let genesis_index = builder.pure(new_bridge_entry.genesis_index)?;
+
+        let pegout_txid = builder.pure(new_bridge_entry.pegout_txid)?;
+        let pegout_index = builder.pure(new_bridge_entry.pegout_index)?;
+
+        builder.programmable_move_call(
+            bridge_package_id,
+            Identifier::from_str(BRIDGE_IDENTIFIER)?,
+            Identifier::from_str("add")?,
+            vec![TypeTag::from_str(SUI_COIN_TYPE)?],
+            vec![
+                bridge_admin,
+                bridge,
+                genesis_txid,
+                genesis_index,
+                pegout_txid,
+                pegout_index,
+                clock,
+            ],
+        );
+    }
+
+    // Execute the transaction
+    let tx_kind = ProgrammableTransaction(builder.finish());
+    let _response = execute_transaction(client, wallet, active_address, vec![], tx_kind).await?;
+
+    Ok(())
+}
+
 pub(crate) async fn is_valid_for_pegin(
     client: SuiClient,
+    wallet: &WalletContext,
+    active_address: SuiAddress,
     new_bridge_entry: BridgeEntry,
 ) -> Result<bool, anyhow::Error> {
     let (_, bridge_obj_arg, bridge_package_id) = crate::configs::bridge_config(&client, true).await;
-    let mut wallet = WalletContext::new(wallet_config(), None, None)?;
-    let active_address = wallet.active_address()?;
 
     // Call is_valid_for_pegin
     let mut builder = ProgrammableTransactionBuilder::new();
@@ -89,10 +143,10 @@ pub(crate) async fn is_valid_for_pegin(
     // Arguments
     let bridge = builder.obj(bridge_obj_arg)?;
 
-    let genesis_txid = builder.pure(hex::decode(new_bridge_entry.genesis_txid)?)?;
+    let genesis_txid = builder.pure(new_bridge_entry.genesis_txid)?;
     let genesis_index = builder.pure(new_bridge_entry.genesis_index)?;
 
-    let pegout_txid = builder.pure(hex::decode(new_bridge_entry.pegout_txid)?)?;
+    let pegout_txid = builder.pure(new_bridge_entry.pegout_txid)?;
     let pegout_index = builder.pure(new_bridge_entry.pegout_index)?;
 
     let clock = builder.obj(ObjectArg::SharedObject {
@@ -120,7 +174,7 @@ pub(crate) async fn is_valid_for_pegin(
     let tx_kind =
         sui_sdk::types::transaction::TransactionKind::ProgrammableTransaction(builder.finish());
     let response =
-        crate::utils::execute_transaction(client, &wallet, active_address, vec![], tx_kind).await?;
+        crate::utils::execute_transaction(client, wallet, active_address, vec![], tx_kind).await?;
 
     Ok(response.events.unwrap().data[0].parsed_json["is_valid"]
         .as_bool()
@@ -129,11 +183,11 @@ pub(crate) async fn is_valid_for_pegin(
 
 pub(crate) async fn is_valid_for_pegout(
     client: SuiClient,
+    wallet: &WalletContext,
+    active_address: SuiAddress,
     new_bridge_entry: BridgeEntry,
 ) -> Result<bool, anyhow::Error> {
     let (_, bridge_obj_arg, bridge_package_id) = crate::configs::bridge_config(&client, true).await;
-    let mut wallet = WalletContext::new(wallet_config(), None, None)?;
-    let active_address = wallet.active_address()?;
 
     // Call is_valid_for_pegout
     let mut builder = ProgrammableTransactionBuilder::new();
@@ -141,10 +195,10 @@ pub(crate) async fn is_valid_for_pegout(
     // Arguments
     let bridge = builder.obj(bridge_obj_arg)?;
 
-    let genesis_txid = builder.pure(hex::decode(new_bridge_entry.genesis_txid)?)?;
+    let genesis_txid = builder.pure(new_bridge_entry.genesis_txid)?;
     let genesis_index = builder.pure(new_bridge_entry.genesis_index)?;
 
-    let pegout_txid = builder.pure(hex::decode(new_bridge_entry.pegout_txid)?)?;
+    let pegout_txid = builder.pure(new_bridge_entry.pegout_txid)?;
     let pegout_index = builder.pure(new_bridge_entry.pegout_index)?;
 
     builder.programmable_move_call(
@@ -165,7 +219,7 @@ pub(crate) async fn is_valid_for_pegout(
     let tx_kind =
         sui_sdk::types::transaction::TransactionKind::ProgrammableTransaction(builder.finish());
     let response =
-        crate::utils::execute_transaction(client, &wallet, active_address, vec![], tx_kind).await?;
+        crate::utils::execute_transaction(client, wallet, active_address, vec![], tx_kind).await?;
 
     Ok(response.events.unwrap().data[0].parsed_json["is_valid"]
         .as_bool()
@@ -174,12 +228,12 @@ pub(crate) async fn is_valid_for_pegout(
 
 pub(crate) async fn drop_elapsed(
     client: SuiClient,
+    wallet: &WalletContext,
+    active_address: SuiAddress,
     elapsed_bridge_entry: ElapsedBridgeEntry,
 ) -> Result<(), anyhow::Error> {
     let (bridge_admin_ref, bridge_obj_arg, bridge_package_id) =
         crate::configs::bridge_config(&client, true).await;
-    let mut wallet = WalletContext::new(wallet_config(), None, None)?;
-    let active_address = wallet.active_address()?;
 
     // Call drop_elapsed
     let mut builder = ProgrammableTransactionBuilder::new();
@@ -188,7 +242,7 @@ pub(crate) async fn drop_elapsed(
     let bridge_admin = builder.obj(ObjectArg::ImmOrOwnedObject(bridge_admin_ref))?;
     let bridge = builder.obj(bridge_obj_arg)?;
 
-    let genesis_txid = builder.pure(hex::decode(elapsed_bridge_entry.genesis_txid)?)?;
+    let genesis_txid = builder.pure(elapsed_bridge_entry.genesis_txid)?;
     let genesis_index = builder.pure(elapsed_bridge_entry.genesis_index)?;
 
     let clock = builder.obj(ObjectArg::SharedObject {
@@ -209,15 +263,17 @@ pub(crate) async fn drop_elapsed(
     let tx_kind =
         sui_sdk::types::transaction::TransactionKind::ProgrammableTransaction(builder.finish());
     let _response =
-        crate::utils::execute_transaction(client, &wallet, active_address, vec![], tx_kind).await?;
+        crate::utils::execute_transaction(client, wallet, active_address, vec![], tx_kind).await?;
 
     Ok(())
 }
 
-pub(crate) async fn pegin(client: SuiClient, pegin: Pegin) -> Result<(), anyhow::Error> {
+pub(crate) async fn pegin(
+    client: SuiClient,
+    wallet: &WalletContext,
+    active_address: SuiAddress,
+    pegin: Pegin) -> Result<(), anyhow::Error> {
     let (_, bridge_obj_arg, bridge_package_id) = crate::configs::bridge_config(&client, true).await;
-    let mut wallet = WalletContext::new(wallet_config(), None, None)?;
-    let active_address = wallet.active_address()?;
 
     // Call pegout
     let mut builder = ProgrammableTransactionBuilder::new();
@@ -225,11 +281,11 @@ pub(crate) async fn pegin(client: SuiClient, pegin: Pegin) -> Result<(), anyhow:
     // Arguments
     let bridge = builder.obj(bridge_obj_arg)?;
 
-    let genesis_txid = builder.pure(hex::decode(pegin.genesis_txid)?)?;
+    let genesis_txid = builder.pure(pegin.genesis_txid)?;
     let genesis_index = builder.pure(pegin.genesis_index)?;
 
     let pegin_amount = builder.pure(pegin.pegin_amount)?;
-    let coin = get_coin(&wallet, &active_address, pegin.pegin_amount).await?;
+    let coin = get_coin(wallet, &active_address, pegin.pegin_amount).await?;
     let coin_arg = builder.obj(ObjectArg::ImmOrOwnedObject(coin))?;
 
     let clock = builder.obj(ObjectArg::SharedObject {
@@ -256,16 +312,18 @@ pub(crate) async fn pegin(client: SuiClient, pegin: Pegin) -> Result<(), anyhow:
     // Execute the transaction
     let tx_kind = ProgrammableTransaction(builder.finish());
     let _response =
-        execute_transaction(client, &wallet, active_address, vec![coin.0], tx_kind).await?;
+        execute_transaction(client, wallet, active_address, vec![coin.0], tx_kind).await?;
 
     Ok(())
 }
 
-pub(crate) async fn pegout(client: SuiClient, pegout: Pegout) -> Result<(), anyhow::Error> {
+pub(crate) async fn pegout(
+    client: SuiClient,
+    wallet: &WalletContext,
+    active_address: SuiAddress,
+    pegout: Pegout) -> Result<(), anyhow::Error> {
     let (header_chain_arg, _) = oracle_config(false);
     let (_, bridge_obj_arg, bridge_package_id) = crate::configs::bridge_config(&client, true).await;
-    let mut wallet = WalletContext::new(wallet_config(), None, None)?;
-    let active_address = wallet.active_address()?;
 
     // Call pegin
     let mut builder = ProgrammableTransactionBuilder::new();
@@ -273,9 +331,9 @@ pub(crate) async fn pegout(client: SuiClient, pegout: Pegout) -> Result<(), anyh
     // Arguments
     let bridge = builder.obj(bridge_obj_arg)?;
 
-    let genesis_txid = builder.pure(hex::decode(pegout.genesis_txid)?)?;
+    let genesis_txid = builder.pure(pegout.genesis_txid)?;
     let genesis_index = builder.pure(pegout.genesis_index)?;
-    let burning_tx = builder.pure(hex::decode(pegout.burning_tx)?)?;
+    let burning_tx = builder.pure(pegout.burning_tx)?;
 
     let header_chain_obj = builder.obj(header_chain_arg)?;
 
@@ -287,14 +345,7 @@ pub(crate) async fn pegout(client: SuiClient, pegout: Pegout) -> Result<(), anyh
             .map(|el| *el == 1)
             .collect::<Vec<bool>>(),
     )?;
-    let merkle_proof_hashes = builder.pure(
-        pegout
-            .merkle_proof
-            .hashes
-            .iter()
-            .map(|hash| hex::decode(hash).unwrap())
-            .collect::<Vec<Vec<u8>>>(),
-    )?;
+    let merkle_proof_hashes = builder.pure(&pegout.merkle_proof.hashes)?;
     let block_height = builder.pure(pegout.block_height)?;
 
     builder.programmable_move_call(
@@ -316,18 +367,18 @@ pub(crate) async fn pegout(client: SuiClient, pegout: Pegout) -> Result<(), anyh
 
     // Execute the transaction
     let tx_kind = ProgrammableTransaction(builder.finish());
-    let _response = execute_transaction(client, &wallet, active_address, vec![], tx_kind).await?;
+    let _response = execute_transaction(client, wallet, active_address, vec![], tx_kind).await?;
 
     Ok(())
 }
 
 pub(crate) async fn pegin_with_chunks(
     client: SuiClient,
+    wallet: &WalletContext,
+    active_address: SuiAddress,
     pegin: Pegin,
 ) -> Result<(), anyhow::Error> {
     let (_, bridge_obj_arg, bridge_package_id) = crate::configs::bridge_config(&client, true).await;
-    let mut wallet = WalletContext::new(wallet_config(), None, None)?;
-    let active_address = wallet.active_address()?;
 
     // Call pegin
     let mut builder = ProgrammableTransactionBuilder::new();
@@ -335,11 +386,11 @@ pub(crate) async fn pegin_with_chunks(
     // Arguments
     let bridge = builder.obj(bridge_obj_arg)?;
 
-    let genesis_txid = builder.pure(hex::decode(pegin.genesis_txid)?)?;
+    let genesis_txid = builder.pure(pegin.genesis_txid)?;
     let genesis_index = builder.pure(pegin.genesis_index)?;
 
     let pegin_amount = builder.pure(pegin.pegin_amount)?;
-    let coin = get_coin(&wallet, &active_address, pegin.pegin_amount).await?;
+    let coin = get_coin(wallet, &active_address, pegin.pegin_amount).await?;
     let coin_arg = builder.obj(ObjectArg::ImmOrOwnedObject(coin))?;
 
     let clock = builder.obj(ObjectArg::SharedObject {
@@ -366,21 +417,74 @@ pub(crate) async fn pegin_with_chunks(
     // Execute the transaction
     let tx_kind = ProgrammableTransaction(builder.finish());
     let _response =
-        execute_transaction(client, &wallet, active_address, vec![coin.0], tx_kind).await?;
+        execute_transaction(client, wallet, active_address, vec![coin.0], tx_kind).await?;
+
+    Ok(())
+}
+
+pub(crate) async fn pegin_with_chunks_batch(
+    client: SuiClient,
+    wallet: &WalletContext,
+    active_address: SuiAddress,
+    pegins: Vec<Pegin>,
+) -> Result<(), anyhow::Error> {
+    let (_, bridge_obj_arg, bridge_package_id) = crate::configs::bridge_config(&client, true).await;
+
+    // Call pegin_with_chunks once per genesis, all in the same programmable transaction
+    let mut builder = ProgrammableTransactionBuilder::new();
+
+    // Arguments shared by all the calls: each call splits its pegin amount from the same coin
+    let bridge = builder.obj(bridge_obj_arg)?;
+
+    let total_amount = pegins.iter().map(|pegin| pegin.pegin_amount).sum();
+    let coin = get_coin(wallet, &active_address, total_amount).await?;
+    let coin_arg = builder.obj(ObjectArg::ImmOrOwnedObject(coin))?;
+
+    let clock = builder.obj(ObjectArg::SharedObject {
+        id: SUI_CLOCK_OBJECT_ID,
+        initial_shared_version: SUI_CLOCK_OBJECT_SHARED_VERSION,
+        mutable: false,
+    })?;
+
+    for pegin in pegins {
+        let genesis_txid = builder.pure(pegin.genesis_txid)?;
+        let genesis_index = builder.pure(pegin.genesis_index)?;
+        let pegin_amount = builder.pure(pegin.pegin_amount)?;
+
+        builder.programmable_move_call(
+            bridge_package_id,
+            Identifier::from_str(BRIDGE_IDENTIFIER)?,
+            Identifier::from_str("pegin_with_chunks")?,
+            vec![TypeTag::from_str(SUI_COIN_TYPE)?],
+            vec![
+                bridge,
+                genesis_txid,
+                genesis_index,
+                coin_arg,
+                pegin_amount,
+                clock,
+            ],
+        );
+    }
+
+    // Execute the transaction
+    let tx_kind = ProgrammableTransaction(builder.finish());
+    let _response =
+        execute_transaction(client, wallet, active_address, vec![coin.0], tx_kind).await?;
 
     Ok(())
 }
 
 pub(crate) async fn update_chunks(
     client: SuiClient,
-    genesis_txid: String,
+    wallet: &WalletContext,
+    active_address: SuiAddress,
+    genesis_txid: Vec<u8>,
     genesis_index: u32,
     new_chunks: Vec<Vec<u8>>,
     chunks_index: u64,
 ) -> Result<(), anyhow::Error> {
     let (_, bridge_obj_arg, bridge_package_id) = crate::configs::bridge_config(&client, true).await;
-    let mut wallet = WalletContext::new(wallet_config(), None, None)?;
-    let active_address = wallet.active_address()?;
 
     // Call pegin
     let mut builder = ProgrammableTransactionBuilder::new();
@@ -388,18 +492,18 @@ pub(crate) async fn update_chunks(
     // Arguments
     let bridge = builder.obj(bridge_obj_arg)?;
 
-    let genesis_txid = builder.pure(hex::decode(genesis_txid)?)?;
+    let genesis_txid = builder.pure(genesis_txid)?;
     let genesis_index = builder.pure(genesis_index)?;
-    let chunks_one = builder.pure(new_chunks[0].clone())?;
-    let chunks_two = builder.pure(new_chunks[1].clone())?;
-    let chunks_three = builder.pure(new_chunks[2].clone())?;
-    let chunks_four = builder.pure(new_chunks[3].clone())?;
-    let chunks_five = builder.pure(new_chunks[4].clone())?;
-    let chunks_six = builder.pure(new_chunks[5].clone())?;
-    let chunks_seven = builder.pure(new_chunks[6].clone())?;
-    let chunks_eight = builder.pure(new_chunks[7].clone())?;
-    let chunks_nine = builder.pure(new_chunks[8].clone())?;
-    let chunks_ten = builder.pure(new_chunks[9].clone())?;
+    let chunks_one = builder.pure(&new_chunks[0])?;
+    let chunks_two = builder.pure(&new_chunks[1])?;
+    let chunks_three = builder.pure(&new_chunks[2])?;
+    let chunks_four = builder.pure(&new_chunks[3])?;
+    let chunks_five = builder.pure(&new_chunks[4])?;
+    let chunks_six = builder.pure(&new_chunks[5])?;
+    let chunks_seven = builder.pure(&new_chunks[6])?;
+    let chunks_eight = builder.pure(&new_chunks[7])?;
+    let chunks_nine = builder.pure(&new_chunks[8])?;
+    let chunks_ten = builder.pure(&new_chunks[9])?;
     let chunks_index = builder.pure(chunks_index)?;
 
     builder.programmable_move_call(
@@ -427,24 +531,24 @@ pub(crate) async fn update_chunks(
 
     // Execute the transaction
     let tx_kind = ProgrammableTransaction(builder.finish());
-    let _response = execute_transaction(client, &wallet, active_address, vec![], tx_kind).await?;
+    let _response = execute_transaction(client, wallet, active_address, vec![], tx_kind).await?;
 
     Ok(())
 }
 
 pub(crate) async fn pegout_with_chunks(
     client: SuiClient,
+    wallet: &WalletContext,
+    active_address: SuiAddress,
     pegout: Pegout,
 ) -> Result<(), anyhow::Error> {
     let (header_chain_arg, _) = oracle_config(false);
     let (_, bridge_obj_arg, bridge_package_id) = crate::configs::bridge_config(&client, true).await;
-    let mut wallet = WalletContext::new(wallet_config(), None, None)?;
-    let active_address = wallet.active_address()?;
 
     // Create chunks
     // burning_tx is ~ 130, we split it in four chunks: 40KB, 40KB, 40KB, remaining (max tx size is 128KB)
     // and then we split the chunks into parts of 4KB (16KB is max pure argument size)
-    let burning_tx_bytes = hex::decode(pegout.burning_tx)?;
+    let burning_tx_bytes = pegout.burning_tx;
     let chunck_size = 40000;
     let argument_size = 4000;
     let mut burning_tx_chunks: Vec<Vec<Vec<u8>>> = vec![];
@@ -465,40 +569,23 @@ pub(crate) async fn pegout_with_chunks(
     for _i in 0..7 {
         last_chunk.push(vec![]);
     }
-
-    // Update chunks
-    update_chunks(
-        client.clone(),
-        pegout.genesis_txid.clone(),
-        pegout.genesis_index,
-        burning_tx_chunks[0].clone(),
-        0,
-    )
-    .await?;
-    update_chunks(
-        client.clone(),
-        pegout.genesis_txid.clone(),
-        pegout.genesis_index,
-        burning_tx_chunks[1].clone(),
-        1,
-    )
-    .await?;
-    update_chunks(
-        client.clone(),
-        pegout.genesis_txid.clone(),
-        pegout.genesis_index,
-        burning_tx_chunks[2].clone(),
-        2,
-    )
-    .await?;
-    update_chunks(
-        client.clone(),
-        pegout.genesis_txid.clone(),
-        pegout.genesis_index,
-        last_chunk,
-        3,
-    )
-    .await?;
+    burning_tx_chunks.push(last_chunk);
+    // The chunks are only needed by `update_chunks`: drop the full serialisation before uploading them
+    drop(burning_tx_bytes);
+
+    // Update chunks, moving each group of chunks into its call
+    for (chunks_index, chunks) in burning_tx_chunks.into_iter().enumerate() {
+        update_chunks(
+            client.clone(),
+            wallet,
+            active_address,
+            pegout.genesis_txid.clone(),
+            pegout.genesis_index,
+            chunks,
+            chunks_index as u64,
+        )
+        .await?;
+    }
 
     // Call pegout
     let mut builder = ProgrammableTransactionBuilder::new();
@@ -506,7 +593,7 @@ pub(crate) async fn pegout_with_chunks(
     // Arguments
     let bridge = builder.obj(bridge_obj_arg)?;
 
-    let genesis_txid = builder.pure(hex::decode(pegout.genesis_txid)?)?;
+    let genesis_txid = builder.pure(pegout.genesis_txid)?;
     let genesis_index = builder.pure(pegout.genesis_index)?;
 
     let header_chain_obj = builder.obj(header_chain_arg)?;
@@ -519,14 +606,7 @@ pub(crate) async fn pegout_with_chunks(
             .map(|el| *el == 1)
             .collect::<Vec<bool>>(),
     )?;
-    let merkle_proof_hashes = builder.pure(
-        pegout
-            .merkle_proof
-            .hashes
-            .iter()
-            .map(|hash| hex::decode(hash).unwrap())
-            .collect::<Vec<Vec<u8>>>(),
-    )?;
+    let merkle_proof_hashes = builder.pure(&pegout.merkle_proof.hashes)?;
     let block_height = builder.pure(pegout.block_height)?;
 
     builder.programmable_move_call(
@@ -547,7 +627,7 @@ pub(crate) async fn pegout_with_chunks(
 
     // Execute the transaction
     let tx_kind = ProgrammableTransaction(builder.finish());
-    let _response = execute_transaction(client, &wallet, active_address, vec![], tx_kind).await?;
+    let _response = execute_transaction(client, wallet, active_address, vec![], tx_kind).await?;
 
     Ok(())
 }
\ No newline at end of file
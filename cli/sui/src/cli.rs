@@ -1,11 +1,16 @@
 use clap::{Parser, Subcommand};
-use serde::Deserialize;
+use serde::{Deserialize, Deserializer};
+
+use crate::handoff::Format;
 
 /// Command-line interface for the application
 #[derive(Parser)]
 #[command(name = "sui_playground")]
 #[command(about = "A CLI for managing Sui Playground", long_about = None)]
 pub struct Cli {
+    /// Format of the config file read by the command
+    #[arg(long, value_enum, default_value_t = Format::Toml, global = true)]
+    pub format: Format,
     #[command(subcommand)]
     pub command: Commands,
 }
@@ -14,8 +19,14 @@ pub struct Cli {
 pub enum Commands {
     /// Update the chain configuration
     UpdateChain,
+    /// Update the chain with a batch of block headers in a single transaction
+    UpdateChainBatch,
+    /// Reorganise the chain after a fork
+    ReorgChain,
     /// Add a new bridge entry
     AddBridgeEntry,
+    /// Add several bridge entries in a single transaction
+    AddBridgeEntries,
     /// Check if a couple (genesis, pegout) is valid for pegin
     IsValidForPegin,
     /// Check if a couple (genesis, pegout) is valid for pegout
@@ -28,41 +39,75 @@ pub enum Commands {
     Pegout,
     /// PeginWithChunks
     PeginWithChunks,
+    /// PeginWithChunks for several genesis in a single transaction
+    PeginWithChunksBatch,
     /// PegoutWithChunks
     PegoutWithChunks,
+    /// Serve commands read from stdin, one JSON request per line, reporting the result of each on stdout
+    Serve,
 }
 
 #[derive(Clone, Deserialize)]
 pub struct BlockHeaderSerialisation {
-    pub ser: String,
+    #[serde(deserialize_with = "from_hex")]
+    pub ser: Vec<u8>,
+}
+
+#[derive(Clone, Deserialize)]
+pub struct BlockHeaderSerialisations {
+    #[serde(deserialize_with = "from_hex_list")]
+    pub sers: Vec<Vec<u8>>,
+}
+
+#[derive(Clone, Deserialize)]
+pub struct ForkedChain {
+    pub fork_index: u64,
+    #[serde(deserialize_with = "from_hex_list")]
+    pub sers: Vec<Vec<u8>>,
 }
 
 #[derive(Clone, Deserialize)]
 pub struct BridgeEntry {
-    pub genesis_txid: String,
+    #[serde(deserialize_with = "from_hex")]
+    pub genesis_txid: Vec<u8>,
     pub genesis_index: u32,
-    pub pegout_txid: String,
+    #[serde(deserialize_with = "from_hex")]
+    pub pegout_txid: Vec<u8>,
     pub pegout_index: u32,
 }
 
+#[derive(Clone, Deserialize)]
+pub struct BridgeEntries {
+    pub entries: Vec<BridgeEntry>,
+}
+
 #[derive(Clone, Deserialize)]
 pub struct ElapsedBridgeEntry {
-    pub genesis_txid: String,
+    #[serde(deserialize_with = "from_hex")]
+    pub genesis_txid: Vec<u8>,
     pub genesis_index: u32,
 }
 
 #[derive(Clone, Deserialize)]
 pub struct Pegin {
-    pub genesis_txid: String,
+    #[serde(deserialize_with = "from_hex")]
+    pub genesis_txid: Vec<u8>,
     pub genesis_index: u32,
     pub pegin_amount: u64,
 }
 
+#[derive(Clone, Deserialize)]
+pub struct Pegins {
+    pub pegins: Vec<Pegin>,
+}
+
 #[derive(Clone, Deserialize)]
 pub struct Pegout {
-    pub genesis_txid: String,
+    #[serde(deserialize_with = "from_hex")]
+    pub genesis_txid: Vec<u8>,
     pub genesis_index: u32,
-    pub burning_tx: String,
+    #[serde(deserialize_with = "from_hex")]
+    pub burning_tx: Vec<u8>,
     pub merkle_proof: MerkleProof,
     pub block_height: u64,
 }
@@ -70,5 +115,18 @@ pub struct Pegout {
 #[derive(Clone, Deserialize)]
 pub struct MerkleProof {
     pub positions: Vec<u32>,
-    pub hashes: Vec<String>,
+    #[serde(deserialize_with = "from_hex_list")]
+    pub hashes: Vec<Vec<u8>>,
+}
+
+fn from_hex<'de, D: Deserializer<'de>>(deserializer: D) -> Result<Vec<u8>, D::Error> {
+    hex::decode(String::deserialize(deserializer)?).map_err(serde::de::Error::custom)
+}
+
+fn from_hex_list<'de, D: Deserializer<'de>>(deserializer: D) -> Result<Vec<Vec<u8>>, D::Error> {
+    Vec::<String>::deserialize(deserializer)?
+        .iter()
+        .map(hex::decode)
+        .collect::<Result<_, _>>()
+        .map_err(serde::de::Error::custom)
 }
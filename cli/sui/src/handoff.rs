@@ -0,0 +1,202 @@
+//! Binary handoff format for the payloads written by the Python CLI.
+//!
+//! A handoff file starts with the magic `TCPB` and a version byte, followed by the fields of the payload in order:
+//! - integers are little-endian (`u32` or `u64`),
+//! - byte strings are a `u32` length followed by the raw bytes,
+//! - lists (of integers, byte strings or payloads) are a `u32` number of elements followed by the elements.
+//!
+//! Byte strings are stored raw, so large payloads (e.g., the burning transaction) are neither hex-encoded nor parsed.
+
+use std::path::Path;
+
+use anyhow::{Context, anyhow};
+use clap::ValueEnum;
+use serde::de::DeserializeOwned;
+
+use crate::cli::{
+    BlockHeaderSerialisation, BlockHeaderSerialisations, BridgeEntries, BridgeEntry, ElapsedBridgeEntry,
+    ForkedChain, MerkleProof, Pegin, Pegins, Pegout,
+};
+
+const MAGIC: &[u8; 4] = b"TCPB";
+const VERSION: u8 = 1;
+
+/// Format of the config files
+#[derive(Clone, Copy, PartialEq, Eq, ValueEnum)]
+pub enum Format {
+    /// TOML file, with byte strings encoded in hex
+    Toml,
+    /// Length-prefixed binary file
+    Binary,
+}
+
+pub struct Reader<'a> {
+    data: &'a [u8],
+}
+
+impl<'a> Reader<'a> {
+    pub fn new(data: &'a [u8]) -> Result<Self, anyhow::Error> {
+        if data.len() < MAGIC.len() + 1 || &data[..MAGIC.len()] != MAGIC {
+            return Err(anyhow!("Not a handoff file"));
+        }
+        if data[MAGIC.len()] != VERSION {
+            return Err(anyhow!("Unsupported handoff version {}", data[MAGIC.len()]));
+        }
+        Ok(Self {
+            data: &data[MAGIC.len() + 1..],
+        })
+    }
+
+    fn take(&mut self, n: usize) -> Result<&'a [u8], anyhow::Error> {
+        if self.data.len() < n {
+            return Err(anyhow!("Truncated handoff file"));
+        }
+        let (head, tail) = self.data.split_at(n);
+        self.data = tail;
+        Ok(head)
+    }
+
+    pub fn u32(&mut self) -> Result<u32, anyhow::Error> {
+        Ok(u32::from_le_bytes(self.take(4)?.try_into()?))
+    }
+
+    pub fn u64(&mut self) -> Result<u64, anyhow::Error> {
+        Ok(u64::from_le_bytes(self.take(8)?.try_into()?))
+    }
+
+    pub fn bytes(&mut self) -> Result<Vec<u8>, anyhow::Error> {
+        let len = self.u32()? as usize;
+        Ok(self.take(len)?.to_vec())
+    }
+
+    pub fn u32_list(&mut self) -> Result<Vec<u32>, anyhow::Error> {
+        let n = self.u32()?;
+        (0..n).map(|_| self.u32()).collect()
+    }
+
+    pub fn bytes_list(&mut self) -> Result<Vec<Vec<u8>>, anyhow::Error> {
+        let n = self.u32()?;
+        (0..n).map(|_| self.bytes()).collect()
+    }
+
+    pub fn list<T: FromHandoff>(&mut self) -> Result<Vec<T>, anyhow::Error> {
+        let n = self.u32()?;
+        (0..n).map(|_| T::read(self)).collect()
+    }
+
+    pub fn finish(self) -> Result<(), anyhow::Error> {
+        if !self.data.is_empty() {
+            return Err(anyhow!("{} trailing bytes in handoff file", self.data.len()));
+        }
+        Ok(())
+    }
+}
+
+/// Payloads that can be read from a handoff file
+pub trait FromHandoff: Sized {
+    fn read(reader: &mut Reader) -> Result<Self, anyhow::Error>;
+}
+
+impl FromHandoff for BlockHeaderSerialisation {
+    fn read(reader: &mut Reader) -> Result<Self, anyhow::Error> {
+        Ok(Self { ser: reader.bytes()? })
+    }
+}
+
+impl FromHandoff for BlockHeaderSerialisations {
+    fn read(reader: &mut Reader) -> Result<Self, anyhow::Error> {
+        Ok(Self {
+            sers: reader.bytes_list()?,
+        })
+    }
+}
+
+impl FromHandoff for ForkedChain {
+    fn read(reader: &mut Reader) -> Result<Self, anyhow::Error> {
+        Ok(Self {
+            fork_index: reader.u64()?,
+            sers: reader.bytes_list()?,
+        })
+    }
+}
+
+impl FromHandoff for BridgeEntry {
+    fn read(reader: &mut Reader) -> Result<Self, anyhow::Error> {
+        Ok(Self {
+            genesis_txid: reader.bytes()?,
+            genesis_index: reader.u32()?,
+            pegout_txid: reader.bytes()?,
+            pegout_index: reader.u32()?,
+        })
+    }
+}
+
+impl FromHandoff for BridgeEntries {
+    fn read(reader: &mut Reader) -> Result<Self, anyhow::Error> {
+        Ok(Self {
+            entries: reader.list()?,
+        })
+    }
+}
+
+impl FromHandoff for ElapsedBridgeEntry {
+    fn read(reader: &mut Reader) -> Result<Self, anyhow::Error> {
+        Ok(Self {
+            genesis_txid: reader.bytes()?,
+            genesis_index: reader.u32()?,
+        })
+    }
+}
+
+impl FromHandoff for Pegin {
+    fn read(reader: &mut Reader) -> Result<Self, anyhow::Error> {
+        Ok(Self {
+            genesis_txid: reader.bytes()?,
+            genesis_index: reader.u32()?,
+            pegin_amount: reader.u64()?,
+        })
+    }
+}
+
+impl FromHandoff for Pegins {
+    fn read(reader: &mut Reader) -> Result<Self, anyhow::Error> {
+        Ok(Self {
+            pegins: reader.list()?,
+        })
+    }
+}
+
+impl FromHandoff for Pegout {
+    fn read(reader: &mut Reader) -> Result<Self, anyhow::Error> {
+        Ok(Self {
+            genesis_txid: reader.bytes()?,
+            genesis_index: reader.u32()?,
+            burning_tx: reader.bytes()?,
+            block_height: reader.u64()?,
+            merkle_proof: MerkleProof {
+                positions: reader.u32_list()?,
+                hashes: reader.bytes_list()?,
+            },
+        })
+    }
+}
+
+/// Read the payload in `<path>.toml` or `<path>.bin`, depending on `format`
+pub fn load<T: DeserializeOwned + FromHandoff>(path: &str, format: Format) -> Result<T, anyhow::Error> {
+    match format {
+        Format::Toml => {
+            let path = format!("{path}.toml");
+            Ok(toml::from_str::<T>(
+                &std::fs::read_to_string(Path::new(&path)).with_context(|| format!("Failed to read {path}"))?,
+            )?)
+        }
+        Format::Binary => {
+            let path = format!("{path}.bin");
+            let data = std::fs::read(Path::new(&path)).with_context(|| format!("Failed to read {path}"))?;
+            let mut reader = Reader::new(&data)?;
+            let payload = T::read(&mut reader)?;
+            reader.finish()?;
+            Ok(payload)
+        }
+    }
+}
@@ -1,21 +1,30 @@
 use std::path::Path;
 
 use clap::Parser;
-use cli::{BlockHeaderSerialisation, Pegin, Pegout};
-use sui_sdk::SuiClientBuilder;
+use cli::{BlockHeaderSerialisation, BlockHeaderSerialisations, ForkedChain, Pegin, Pegout};
+use configs::wallet_config;
+use handoff::Format;
+use sui_sdk::{SuiClient, SuiClientBuilder, types::base_types::SuiAddress, wallet_context::WalletContext};
 
 pub mod bridge_cli;
 pub mod cli;
 pub mod configs;
+pub mod handoff;
 pub mod oracle_cli;
+pub mod serve;
 pub mod utils;
 
-const CONFIG_PATH_UPDATE_CHAIN: &str = "config_files/config_update_chain.toml";
-const CONFIG_PATH_ADD_BRIDGE_ENTRY: &str = "config_files/config_add_bridge_entry.toml";
-const CONFIG_PATH_CHECK_BRIDGE_ENTRY: &str = "config_files/config_check_bridge_entry.toml";
-const CONFIG_PATH_DROP_ELAPSED: &str = "config_files/config_drop_elapsed.toml";
-const CONFIG_PATH_PEGIN: &str = "config_files/config_pegin.toml";
-const CONFIG_PATH_PEGOUT: &str = "config_files/config_pegout.toml";
+// Paths of the config files, without extension: `.toml` or `.bin` is appended depending on `--format`
+const CONFIG_PATH_UPDATE_CHAIN: &str = "config_files/config_update_chain";
+const CONFIG_PATH_UPDATE_CHAIN_BATCH: &str = "config_files/config_update_chain_batch";
+const CONFIG_PATH_REORG_CHAIN: &str = "config_files/config_reorg_chain";
+const CONFIG_PATH_ADD_BRIDGE_ENTRY: &str = "config_files/config_add_bridge_entry";
+const CONFIG_PATH_ADD_BRIDGE_ENTRIES: &str = "config_files/config_add_bridge_entries";
+const CONFIG_PATH_CHECK_BRIDGE_ENTRY: &str = "config_files/config_check_bridge_entry";
+const CONFIG_PATH_DROP_ELAPSED: &str = "config_files/config_drop_elapsed";
+const CONFIG_PATH_PEGIN: &str = "config_files/config_pegin";
+const CONFIG_PATH_PEGIN_BATCH: &str = "config_files/config_pegin_batch";
+const CONFIG_PATH_PEGOUT: &str = "config_files/config_pegout";
 
 fn get_config_files_path() -> String {
     let relative_path = file!();
@@ -32,90 +41,126 @@ fn get_config_files_path() -> String {
         .to_owned()
 }
 
-#[tokio::main]
-async fn main() -> Result<(), anyhow::Error> {
-    let cli = cli::Cli::parse();
-
-    let localnet_client = SuiClientBuilder::default().build_localnet().await?;
-    //let devnet_client = SuiClientBuilder::default().build_devnet().await?;
-    //let testnet_client = SuiClientBuilder::default().build_testnet().await?;
-    //let mainnet_client = SuiClientBuilder::default().build_mainnet().await?;
-
-    let client = localnet_client;
+/// Run `command`, reading its data from the config files in `config_file_path_as_str` and sending transactions
+/// from `sender`. Returns the message to report, if any.
+pub(crate) async fn run(
+    client: SuiClient,
+    wallet: &WalletContext,
+    sender: SuiAddress,
+    command: cli::Commands,
+    format: Format,
+    config_file_path_as_str: &str,
+) -> Result<Option<String>, anyhow::Error> {
+    let config_path = |name: &str| format!("{config_file_path_as_str}/{name}");
 
-    let config_file_path_as_str = get_config_files_path();
-
-    match cli.command {
+    match command {
         cli::Commands::UpdateChain => {
             let block_header_serialisation =
-                toml::from_str::<BlockHeaderSerialisation>(&std::fs::read_to_string(format!(
-                    "{config_file_path_as_str}/{CONFIG_PATH_UPDATE_CHAIN}"
-                ))?)?;
-            oracle_cli::update_chain(client, hex::decode(block_header_serialisation.ser)?).await?;
+                handoff::load::<BlockHeaderSerialisation>(&config_path(CONFIG_PATH_UPDATE_CHAIN), format)?;
+            oracle_cli::update_chain(client, wallet, sender, block_header_serialisation.ser).await?;
+        }
+        cli::Commands::UpdateChainBatch => {
+            let block_header_serialisations =
+                handoff::load::<BlockHeaderSerialisations>(&config_path(CONFIG_PATH_UPDATE_CHAIN_BATCH), format)?;
+            oracle_cli::update_chain_batch(client, wallet, sender, block_header_serialisations.sers).await?;
+        }
+        cli::Commands::ReorgChain => {
+            let forked_chain = handoff::load::<ForkedChain>(&config_path(CONFIG_PATH_REORG_CHAIN), format)?;
+            oracle_cli::reorg_chain(client, wallet, sender, forked_chain.fork_index, forked_chain.sers).await?;
         }
         cli::Commands::AddBridgeEntry => {
-            println!(
-                "{}",
-                format!("{config_file_path_as_str}/{CONFIG_PATH_UPDATE_CHAIN}")
-            );
-            let bridge_entry = toml::from_str::<cli::BridgeEntry>(&std::fs::read_to_string(
-                format!("{config_file_path_as_str}/{CONFIG_PATH_ADD_BRIDGE_ENTRY}"),
-            )?)?;
-            bridge_cli::add(client, bridge_entry).await?;
+            let bridge_entry =
+                handoff::load::<cli::BridgeEntry>(&config_path(CONFIG_PATH_ADD_BRIDGE_ENTRY), format)?;
+            bridge_cli::add(client, wallet, sender, bridge_entry).await?;
+        }
+        cli::Commands::AddBridgeEntries => {
+            let bridge_entries =
+                handoff::load::<cli::BridgeEntries>(&config_path(CONFIG_PATH_ADD_BRIDGE_ENTRIES), format)?;
+            bridge_cli::add_batch(client, wallet, sender, bridge_entries.entries).await?;
         }
         cli::Commands::IsValidForPegin => {
-            let bridge_entry = toml::from_str::<cli::BridgeEntry>(&std::fs::read_to_string(
-                format!("{config_file_path_as_str}/{CONFIG_PATH_CHECK_BRIDGE_ENTRY}"),
-            )?)?;
-            let is_valid = bridge_cli::is_valid_for_pegin(client, bridge_entry).await?;
-            if is_valid {
-                println!("Couple is valid");
-            } else {
-                println!("Couple is not valid");
-            }
+            let bridge_entry =
+                handoff::load::<cli::BridgeEntry>(&config_path(CONFIG_PATH_CHECK_BRIDGE_ENTRY), format)?;
+            let is_valid = bridge_cli::is_valid_for_pegin(client, wallet, sender, bridge_entry).await?;
+            return Ok(Some(couple_validity(is_valid)));
         }
         cli::Commands::IsValidForPegout => {
-            let bridge_entry = toml::from_str::<cli::BridgeEntry>(&std::fs::read_to_string(
-                format!("{config_file_path_as_str}/{CONFIG_PATH_CHECK_BRIDGE_ENTRY}"),
-            )?)?;
-            let is_valid = bridge_cli::is_valid_for_pegout(client, bridge_entry).await?;
-            if is_valid {
-                println!("Couple is valid");
-            } else {
-                println!("Couple is not valid");
-            }
+            let bridge_entry =
+                handoff::load::<cli::BridgeEntry>(&config_path(CONFIG_PATH_CHECK_BRIDGE_ENTRY), format)?;
+            let is_valid = bridge_cli::is_valid_for_pegout(client, wallet, sender, bridge_entry).await?;
+            return Ok(Some(couple_validity(is_valid)));
         }
         cli::Commands::DropElapsed => {
             let elapsed_bridge_entry =
-                toml::from_str::<cli::ElapsedBridgeEntry>(&std::fs::read_to_string(format!(
-                    "{config_file_path_as_str}/{CONFIG_PATH_DROP_ELAPSED}"
-                ))?)?;
-            bridge_cli::drop_elapsed(client, elapsed_bridge_entry).await?;
+                handoff::load::<cli::ElapsedBridgeEntry>(&config_path(CONFIG_PATH_DROP_ELAPSED), format)?;
+            bridge_cli::drop_elapsed(client, wallet, sender, elapsed_bridge_entry).await?;
         }
         cli::Commands::Pegin => {
-            let pegin = toml::from_str::<Pegin>(&std::fs::read_to_string(format!(
-                "{config_file_path_as_str}/{CONFIG_PATH_PEGIN}"
-            ))?)?;
-            bridge_cli::pegin(client, pegin).await?;
+            let pegin = handoff::load::<Pegin>(&config_path(CONFIG_PATH_PEGIN), format)?;
+            bridge_cli::pegin(client, wallet, sender, pegin).await?;
         }
         cli::Commands::Pegout => {
-            let pegout = toml::from_str::<Pegout>(&std::fs::read_to_string(format!(
-                "{config_file_path_as_str}/{CONFIG_PATH_PEGOUT}"
-            ))?)?;
-            bridge_cli::pegout(client, pegout).await?;
+            let pegout = handoff::load::<Pegout>(&config_path(CONFIG_PATH_PEGOUT), format)?;
+            bridge_cli::pegout(client, wallet, sender, pegout).await?;
         }
         cli::Commands::PeginWithChunks => {
-            let pegin = toml::from_str::<Pegin>(&std::fs::read_to_string(format!(
-                "{config_file_path_as_str}/{CONFIG_PATH_PEGIN}"
-            ))?)?;
-            bridge_cli::pegin_with_chunks(client, pegin).await?;
+            let pegin = handoff::load::<Pegin>(&config_path(CONFIG_PATH_PEGIN), format)?;
+            bridge_cli::pegin_with_chunks(client, wallet, sender, pegin).await?;
+        }
+        cli::Commands::PeginWithChunksBatch => {
+            let pegins = handoff::load::<cli::Pegins>(&config_path(CONFIG_PATH_PEGIN_BATCH), format)?;
+            bridge_cli::pegin_with_chunks_batch(client, wallet, sender, pegins.pegins).await?;
         }
         cli::Commands::PegoutWithChunks => {
-            let pegout = toml::from_str::<Pegout>(&std::fs::read_to_string(format!(
-                "{config_file_path_as_str}/{CONFIG_PATH_PEGOUT}"
-            ))?)?;
-            bridge_cli::pegout_with_chunks(client, pegout).await?;
+            let pegout = handoff::load::<Pegout>(&config_path(CONFIG_PATH_PEGOUT), format)?;
+            bridge_cli::pegout_with_chunks(client, wallet, sender, pegout).await?;
         }
+        cli::Commands::Serve => return Err(anyhow::anyhow!("Cannot serve from within serve mode")),
+    }
+
+    Ok(None)
+}
+
+fn couple_validity(is_valid: bool) -> String {
+    if is_valid {
+        "Couple is valid".to_owned()
+    } else {
+        "Couple is not valid".to_owned()
+    }
+}
+
+#[tokio::main]
+async fn main() -> Result<(), anyhow::Error> {
+    let cli = cli::Cli::parse();
+
+    let localnet_client = SuiClientBuilder::default().build_localnet().await?;
+    //let devnet_client = SuiClientBuilder::default().build_devnet().await?;
+    //let testnet_client = SuiClientBuilder::default().build_testnet().await?;
+    //let mainnet_client = SuiClientBuilder::default().build_mainnet().await?;
+
+    let client = localnet_client;
+
+    let config_file_path_as_str = get_config_files_path();
+
+    // The wallet (and its keystore) is loaded once, and shared by all the commands in serve mode
+    let mut wallet = WalletContext::new(wallet_config(), None, None)?;
+    let active_address = wallet.active_address()?;
+
+    if let cli::Commands::Serve = cli.command {
+        return serve::serve(client, &wallet, active_address, &config_file_path_as_str).await;
+    }
+
+    if let Some(message) = run(
+        client,
+        &wallet,
+        active_address,
+        cli.command,
+        cli.format,
+        &config_file_path_as_str,
+    )
+    .await?
+    {
+        println!("{message}");
     }
 
     Ok(())
@@ -0,0 +1,88 @@
+//! Serve mode: a long-lived process executing the commands read from stdin.
+//!
+//! Each line of stdin is a JSON request
+//! `{"id": <int>, "command": <str>, "format": "binary"|"toml", "sender": <str>}`, where `command` is the name of a
+//! command of the CLI (e.g., `pegin-with-chunks`) and `format` (default: `toml`) and `sender` (default: the active
+//! address) are optional. Each request is answered with a JSON line on stdout
+//! `{"id": <int>, "ok": <bool>, "result": <str|null>, "error": <str|null>}`.
+//! Other lines on stdout (e.g., logs of the commands) are not JSON objects with an `id` and should be skipped.
+//!
+//! The Sui client and the wallet are created once, so commands do not pay for new RPC connections nor for reloading
+//! the keystore, and each command selects its sender without switching the active address.
+
+use std::str::FromStr;
+
+use clap::Parser;
+use serde::{Deserialize, Serialize};
+use sui_sdk::{SuiClient, types::base_types::SuiAddress, wallet_context::WalletContext};
+use tokio::io::{AsyncBufReadExt, AsyncWriteExt, BufReader};
+
+use crate::cli::Cli;
+
+#[derive(Deserialize)]
+struct Request {
+    id: u64,
+    command: String,
+    #[serde(default)]
+    format: Option<String>,
+    #[serde(default)]
+    sender: Option<String>,
+}
+
+#[derive(Serialize)]
+struct Response {
+    id: u64,
+    ok: bool,
+    result: Option<String>,
+    error: Option<String>,
+}
+
+async fn handle(
+    client: &SuiClient,
+    wallet: &WalletContext,
+    active_address: SuiAddress,
+    config_file_path_as_str: &str,
+    request: Request,
+) -> Result<Option<String>, anyhow::Error> {
+    let sender = match request.sender {
+        Some(sender) => SuiAddress::from_str(&sender)?,
+        None => active_address,
+    };
+    let format = request.format.unwrap_or_else(|| "toml".to_owned());
+    let cli = Cli::try_parse_from(["sui_cli", "--format", &format, &request.command])?;
+
+    crate::run(client.clone(), wallet, sender, cli.command, cli.format, config_file_path_as_str).await
+}
+
+pub(crate) async fn serve(
+    client: SuiClient,
+    wallet: &WalletContext,
+    active_address: SuiAddress,
+    config_file_path_as_str: &str,
+) -> Result<(), anyhow::Error> {
+    let mut lines = BufReader::new(tokio::io::stdin()).lines();
+    let mut stdout = tokio::io::stdout();
+
+    // Requests are executed one at a time, so that the transactions of a sender do not compete for its gas coins
+    while let Some(line) = lines.next_line().await? {
+        if line.trim().is_empty() {
+            continue;
+        }
+        let response = match serde_json::from_str::<Request>(&line) {
+            Ok(request) => {
+                let id = request.id;
+                match handle(&client, wallet, active_address, config_file_path_as_str, request).await {
+                    Ok(result) => Response { id, ok: true, result, error: None },
+                    Err(error) => Response { id, ok: false, result: None, error: Some(format!("{error:#}")) },
+                }
+            }
+            Err(error) => Response { id: 0, ok: false, result: None, error: Some(format!("Invalid request: {error}")) },
+        };
+        let mut response = serde_json::to_vec(&response)?;
+        response.push(b'\n');
+        stdout.write_all(&response).await?;
+        stdout.flush().await?;
+    }
+
+    Ok(())
+}
@@ -16,12 +16,11 @@ def display_wallet_info(wallet_manager: WalletManager):
         print(f"User: {user_name}")
         print(f"  BSV Address: {wallet_manager.bsv_wallets[index].get_address()}")
         print(f"  SUI Address: {wallet_manager.sui_addresses[index].hex()}")
-        print(f"  Genesis UTXOs:")
-        for utxo in wallet_manager.genesis_utxos[index]:
-            print(f"    - {utxo}")
-        print(f"  Token UTXOs:")
-        for utxo in wallet_manager.token_utxos[index]:
-            print(f"    - {utxo}")
+        print(f"  Tokens:")
+        for record in wallet_manager.tokens.owned_by(index):
+            print(f"    - id: {record.token_id}")
+            print(f"      token UTXO: {record.token}")
+            print(f"      pegout UTXO: {record.pegout}")
         print(f"  Burnt tokens:")
         for burnt_token in wallet_manager.burnt_tokens[index]:
             print(f"    - {burnt_token}")
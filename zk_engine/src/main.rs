@@ -1,6 +1,7 @@
 use clap::{Parser, Subcommand};
 
 pub mod pob_engine;
+pub mod prover_service;
 pub mod tcp_engine;
 pub mod utils;
 
@@ -34,6 +35,12 @@ enum Commands {
         #[command(subcommand)]
         subcommand: PobEngineCommands,
     },
+    /// Keep the proving keys in memory and serve proving jobs over a Unix socket
+    Serve {
+        /// Path of the Unix socket
+        #[arg(long, default_value = prover_service::DEFAULT_SOCKET_PATH)]
+        socket: String,
+    },
 }
 
 #[derive(Subcommand)]
@@ -118,5 +125,8 @@ fn main() {
                 println!("\nValid proof.\n")
             }
         },
+        Commands::Serve { socket } => {
+            prover_service::serve(&socket).unwrap();
+        }
     }
 }
@@ -81,7 +81,7 @@ const POB_SYSTEM_KEYS: &str = "data/pob_engine/keys/";
 const POB_SYSTEM_PROOFS: &str = "data/pob_engine/proofs/";
 const POB_DATA: &str = "data/pob_engine/configs/";
 
-fn generate_pob_predicate() -> PoB {
+fn load_pob_parameters() -> (VariableLengthPedersenParameters, VerifyingKey<MNT6_753>, usize) {
     // Load the key of the TCP System
     let crh_pp_seed_bytes = read_from_file(&(TCP_SYSTEM_KEYS.to_owned() + "crh_pp_seed.bin"))
         .map_err(|e| anyhow!("Failed to read crh_pp. Error: {}", e))
@@ -100,8 +100,48 @@ fn generate_pob_predicate() -> PoB {
     // Setup data
     let setup_data = SetupData::load(POB_DATA.to_owned() + "setup.toml").unwrap();
 
+    (crh_pp, help_vk, setup_data.index)
+}
+
+fn generate_pob_predicate() -> PoB {
+    let (crh_pp, help_vk, index) = load_pob_parameters();
+
     // PoB
-    PoB::new(&crh_pp, &help_vk, setup_data.index)
+    PoB::new(&crh_pp, &help_vk, index)
+}
+
+/// Keys and parameters of the PoB engine, loaded once and kept in memory
+pub struct PoBProver {
+    crh_pp: VariableLengthPedersenParameters,
+    help_vk: VerifyingKey<MNT6_753>,
+    index: usize,
+    pk: ProvingKey<MNT4_753>,
+}
+
+impl PoBProver {
+    /// Load the parameters of the PoB predicate and the proving key of RefTx
+    pub fn load() -> Self {
+        let (crh_pp, help_vk, index) = load_pob_parameters();
+
+        // Load key of RefTx
+        let pk_serialised = read_from_file(&(POB_SYSTEM_KEYS.to_owned() + "pk.bin"))
+            .map_err(|e: std::io::Error| anyhow!("Failed to read pk. Error: {}", e))
+            .unwrap();
+        let pk = ProvingKey::<MNT4_753>::deserialize_unchecked(pk_serialised.as_slice())
+            .map_err(|e| anyhow!("Failed to deserialize pk. Error: {}", e))
+            .unwrap();
+
+        Self {
+            crh_pp,
+            help_vk,
+            index,
+            pk,
+        }
+    }
+
+    fn predicate(&self) -> PoB {
+        PoB::new(&self.crh_pp, &self.help_vk, self.index)
+    }
 }
 
 pub fn setup() {
@@ -140,6 +180,11 @@ pub fn setup() {
 
 pub fn prove() {
     let proving_data = ProvingData::load(&(POB_DATA.to_owned() + "prove.toml")).unwrap();
+    prove_with(&PoBProver::load(), proving_data);
+}
+
+/// Generate a proof of burn for `proving_data` with the keys held by `prover`
+pub fn prove_with(prover: &PoBProver, proving_data: ProvingData) {
     let genesis_txid =
         FieldArray::<1, ScalarFieldMNT4, Config>::new([ScalarFieldMNT4::from_le_bytes_mod_order(
             &Hash256::decode(&proving_data.genesis_txid).unwrap().0,
@@ -161,7 +206,7 @@ pub fn prove() {
     .unwrap();
 
     // PoB
-    let pob = generate_pob_predicate();
+    let pob = prover.predicate();
 
     // Tag
     let tag = TransactionIntegrityScheme::<Config>::commit(
@@ -184,14 +229,6 @@ pub fn prove() {
         predicate: pob,
     };
 
-    // Load key of RefTx
-    let pk_serialised = read_from_file(&(POB_SYSTEM_KEYS.to_owned() + "pk.bin"))
-        .map_err(|e: std::io::Error| anyhow!("Failed to read pk. Error: {}", e))
-        .unwrap();
-    let pk = ProvingKey::<MNT4_753>::deserialize_unchecked(pk_serialised.as_slice())
-        .map_err(|e| anyhow!("Failed to deserialize pk. Error: {}", e))
-        .unwrap();
-
     // Save the public input
     save_to_file(
         data_to_serialisation(&reftx.public_input()).as_slice(),
@@ -201,7 +238,7 @@ pub fn prove() {
 
     // Proof
     let mut rng = ChaChaRng::from_entropy();
-    let proof = Groth16::<MNT4_753>::prove(&pk, reftx, &mut rng).unwrap();
+    let proof = Groth16::<MNT4_753>::prove(&prover.pk, reftx, &mut rng).unwrap();
 
     // Save the proof
     save_to_file(
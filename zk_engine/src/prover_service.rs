@@ -0,0 +1,122 @@
+use std::fs;
+use std::io::{BufRead, BufReader, Write};
+use std::os::unix::net::{UnixListener, UnixStream};
+use std::panic::{AssertUnwindSafe, catch_unwind};
+use std::path::Path;
+use std::sync::{Arc, Mutex};
+use std::thread;
+
+use anyhow::{Result, anyhow};
+use serde::Deserialize;
+use serde_json::json;
+
+use crate::pob_engine::pob::{PoBProver, prove_with};
+use crate::pob_engine::proving_data::ProvingData as ProvingDataPoB;
+use crate::tcp_engine::{
+    data_structures::proving_data::ProvingData as ProvingDataTCP,
+    tcp_system::{TCPSystem, groth16_tcp::UniversalTCPSnark},
+};
+
+pub const DEFAULT_SOCKET_PATH: &str = "data/prover.sock";
+
+/// A proving job, sent to the service as a single JSON line
+/// `{"engine": "tcp" | "pob", "data": <proving data>}`
+/// where `<proving data>` has the same structure as the `prove.toml` file of the engine
+#[derive(Deserialize)]
+#[serde(tag = "engine", content = "data", rename_all = "snake_case")]
+pub enum ProveJob {
+    Tcp(ProvingDataTCP),
+    Pob(ProvingDataPoB),
+}
+
+/// Proving keys of both engines, kept in memory for the lifetime of the service
+struct ProverKeys {
+    tcp_pk: <UniversalTCPSnark as TCPSystem>::ProvingKey,
+    pob: PoBProver,
+    // The PoB engine always writes to the same proof files, so PoB jobs are serialised
+    pob_lock: Mutex<()>,
+}
+
+impl ProverKeys {
+    fn load() -> Result<Self> {
+        let tcp_pk = <UniversalTCPSnark as TCPSystem>::load_pk()
+            .map_err(|e| anyhow!("Failed to load TCP pk. Error: {}", e))?;
+        let pob = catch_unwind(PoBProver::load)
+            .map_err(|_| anyhow!("Failed to load PoB keys"))?;
+        Ok(Self {
+            tcp_pk,
+            pob,
+            pob_lock: Mutex::new(()),
+        })
+    }
+
+    fn run(&self, job: ProveJob) -> Result<()> {
+        match job {
+            ProveJob::Tcp(proving_data) => {
+                <UniversalTCPSnark as TCPSystem>::prove_with_pk(&self.tcp_pk, proving_data)
+            }
+            ProveJob::Pob(proving_data) => {
+                let _guard = self.pob_lock.lock().unwrap_or_else(|e| e.into_inner());
+                catch_unwind(AssertUnwindSafe(|| prove_with(&self.pob, proving_data)))
+                    .map_err(|_| anyhow!("Failed to generate proof of burn"))
+            }
+        }
+    }
+}
+
+/// Answer the jobs sent over `stream`, one response line per job:
+/// `{"ok": true}` or `{"ok": false, "error": <message>}`
+fn handle_connection(keys: &ProverKeys, stream: UnixStream) -> Result<()> {
+    let mut writer = stream.try_clone()?;
+    for line in BufReader::new(stream).lines() {
+        let line = line?;
+        if line.trim().is_empty() {
+            continue;
+        }
+        let outcome = serde_json::from_str::<ProveJob>(&line)
+            .map_err(|e| anyhow!("Failed to parse job. Error: {}", e))
+            .and_then(|job| {
+                catch_unwind(AssertUnwindSafe(|| keys.run(job)))
+                    .unwrap_or_else(|_| Err(anyhow!("Prover panicked")))
+            });
+        let response = match outcome {
+            Ok(()) => json!({ "ok": true }),
+            Err(e) => json!({ "ok": false, "error": e.to_string() }),
+        };
+        writeln!(writer, "{}", response)?;
+        writer.flush()?;
+    }
+    Ok(())
+}
+
+/// Load the proving keys once and serve proving jobs over the Unix socket at `socket_path`
+///
+/// Each connection is served by its own thread, so independent TCP jobs are proven in parallel
+pub fn serve(socket_path: &str) -> Result<()> {
+    println!("Loading proving keys...");
+    let keys = Arc::new(ProverKeys::load()?);
+
+    let path = Path::new(socket_path);
+    if path.exists() {
+        fs::remove_file(path)?;
+    }
+    let listener = UnixListener::bind(path)
+        .map_err(|e| anyhow!("Failed to bind {}. Error: {}", socket_path, e))?;
+    println!("Prover service listening on {}", socket_path);
+
+    for stream in listener.incoming() {
+        match stream {
+            Ok(stream) => {
+                let keys = Arc::clone(&keys);
+                thread::spawn(move || {
+                    if let Err(e) = handle_connection(&keys, stream) {
+                        eprintln!("Connection error: {}", e);
+                    }
+                });
+            }
+            Err(e) => eprintln!("Failed to accept connection: {}", e),
+        }
+    }
+
+    Ok(())
+}
@@ -110,7 +110,11 @@ impl TCPSystem for UniversalTCPSnark {
     /// Generate a proof for the provided `ProvingData`
     fn prove(proving_data: ProvingData) -> Result<()> {
         let pk = Self::load_pk().map_err(|e| anyhow!("Failed to load pk. Error: {}", e))?;
+        Self::prove_with_pk(&pk, proving_data)
+    }
 
+    /// Generate a proof for the provided `ProvingData` with the proving key `pk`
+    fn prove_with_pk(pk: &Self::ProvingKey, proving_data: ProvingData) -> Result<()> {
         // Proving data
         let input_index = proving_data.chain_parameters.input_index;
         let output_index = proving_data.chain_parameters.output_index;
@@ -140,7 +144,7 @@ impl TCPSystem for UniversalTCPSnark {
         // Proof generation
         let public_input: UniversalTransactionChainProofPublicInput = proving_data.clone().into();
         let witness = UniversalTransactionChainProofWitness::<Self::Proof> { tx, prior_proof };
-        let proof = Self::prove(input_index, output_index, &pk, &public_input, &witness).unwrap();
+        let proof = Self::prove(input_index, output_index, pk, &public_input, &witness).unwrap();
 
         // Save proof to file
         let proof_path = Self::PROOFS_PATH.to_owned() + &proving_data.proof_name + ".bin";
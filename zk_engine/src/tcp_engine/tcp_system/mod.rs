@@ -25,6 +25,9 @@ pub trait TCPSystem {
     // Prove that an input is in a transaction chain
     fn prove(proving_data: ProvingData) -> Result<()>;
 
+    // Prove that an input is in a transaction chain using an already loaded proving key
+    fn prove_with_pk(pk: &Self::ProvingKey, proving_data: ProvingData) -> Result<()>;
+
     // Verify that an input is in a transaction chain
     fn verify(verifying_data: VerifyingData) -> Result<bool>;
 